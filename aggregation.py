@@ -0,0 +1,125 @@
+import glob
+import os
+import stat
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from config import model_configs, prompt_strategies
+
+KEY_COLUMNS = ["Strategy", "Config"]
+STRATEGY_ORDER = list(prompt_strategies)
+CONFIG_ORDER = list(model_configs)
+PERCENTILES = {"p25": 0.25, "p75": 0.75, "p95": 0.95}
+
+
+def load_csv_tree(base_folder, filename, columns=None, stories=None, workers=None):
+    """
+    concatenates row_story_*/<filename> into one frame with a story column.
+    columns, when given, limits parsing to those columns (missing ones are skipped), stories
+    limits loading to those story numbers, and workers > 1 reads the files in parallel.
+    """
+    if stories is None:
+        file_paths = glob.glob(os.path.join(base_folder, "row_story_*", filename))
+    else:
+        file_paths = [os.path.join(base_folder, f"row_story_{story}", filename) for story in stories]
+        file_paths = [file_path for file_path in file_paths if os.path.exists(file_path)]
+
+    def read(file_path):
+        try:
+            usecols = (lambda col: col in columns) if columns is not None else None
+            df = pd.read_csv(file_path, usecols=usecols)
+        except Exception as e:
+            print(f"Error processing file {file_path}: {e}")
+            return None
+        df["story"] = int(os.path.basename(os.path.dirname(file_path)).rsplit("_", 1)[-1])
+        return df
+
+    if workers and workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            frames = list(executor.map(read, file_paths))
+    else:
+        frames = [read(file_path) for file_path in file_paths]
+    frames = [df for df in frames if df is not None]
+
+    if not frames:
+        return pd.DataFrame(columns=["story"] + KEY_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+# mkstemp creates files readable by the owner only, rewritten files get the usual permissions back
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+def line_terminator(file_path):
+    # csv.writer ends lines with \r\n, pandas with \n; a rewrite keeps whichever the file has
+    if not os.path.exists(file_path):
+        return "\n"
+    with open(file_path, 'rb') as f:
+        return "\r\n" if f.readline().endswith(b"\r\n") else "\n"
+
+
+def write_csv_atomically(df, file_path):
+    # write next to the target and rename over it, so readers never see a half-written file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', newline='') as f:
+            df.to_csv(f, index=False, lineterminator=line_terminator(file_path))
+        mode = stat.S_IMODE(os.stat(file_path).st_mode) if os.path.exists(file_path) else 0o666 & ~UMASK
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def select_cells(df, strategies=None, configs=None):
+    # keeps the rows of the requested strategies and configs, all of them when None
+    if strategies is not None:
+        df = df[df["Strategy"].isin(strategies)]
+    if configs is not None:
+        df = df[df["Config"].isin(configs)]
+    return df
+
+
+def order_keys(df):
+    # strategies and configs sort in config.py order, unknown ones after in order of appearance
+    ordered = df.copy()
+    for col, order in (("Strategy", STRATEGY_ORDER), ("Config", CONFIG_ORDER)):
+        extras = [value for value in ordered[col].dropna().unique() if value not in order]
+        ordered[col] = pd.Categorical(ordered[col], categories=order + extras, ordered=True)
+    return ordered
+
+
+def aggregate_metrics(df, value_columns, stats=("mean", "std", "median", *PERCENTILES)):
+    """
+    aggregates value_columns per strategy/config in a single groupby. returns one row per
+    combination, ordered like config.py, with (column, stat) column pairs.
+    """
+    df = order_keys(df.dropna(subset=KEY_COLUMNS))
+    values = df[value_columns].apply(pd.to_numeric, errors="coerce")
+    grouped = values.groupby([df["Strategy"], df["Config"]], observed=True, sort=True)
+
+    basic = [stat for stat in stats if stat not in PERCENTILES]
+    parts = [grouped.agg(basic)] if basic else []
+
+    quantiles = [PERCENTILES[stat] for stat in stats if stat in PERCENTILES]
+    if quantiles:
+        q = grouped.quantile(quantiles).unstack()
+        q.columns = q.columns.set_levels(
+            [{value: name for name, value in PERCENTILES.items()}[value] for value in q.columns.levels[1]], level=1)
+        parts.append(q)
+
+    result = pd.concat(parts, axis=1)
+    result = result[[(col, stat) for col in value_columns for stat in stats]]
+    result.index = result.index.set_levels([level.astype(str) for level in result.index.levels])
+    return result
+
+
+def flatten_stats(stats_df):
+    # "Latency (seconds) std" style column names, keeping Strategy/Config as columns
+    flat = stats_df.copy()
+    flat.columns = [f"{col} {stat}" for col, stat in flat.columns]
+    return flat.reset_index()
@@ -1,104 +1,90 @@
 import os
 import pandas as pd
-import numpy as np
-from collections import defaultdict
 
-# Define the input directory and create output directory
-base_dir = "prompt_engineering_results"
+from aggregation import (CONFIG_ORDER, KEY_COLUMNS, STRATEGY_ORDER, aggregate_metrics, flatten_stats, load_csv_tree,
+                         select_cells)
 
+# Define the input directory
+base_dir = "prompt_engineering_results"
+store_dir = "results_store"
 
 # Define expected strategies and configs for validation
-strategies = ["Zero-shot", "Few-shot", "Chain-of-Thought", "Self-Consistency",
-              "System Prompt", "Role Prompt", "Contextual", "Tree of Thoughts", "ReAct"]
-configs = ["precise", "default", "creative"]
-
-# Use nested defaultdict to make aggregation easier
-results = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
-
-print(f"Starting to process folders in {base_dir}")
-
-# Track progress
-folders_processed = 0
-rows_processed = 0
-
-# Loop through all folders
-for i in range(1, 258):
-    folder_name = f"row_story_{i}"
-    folder_path = os.path.join(base_dir, folder_name)
-
-    if not os.path.exists(folder_path):
-        print(f"Warning: Folder {folder_path} does not exist")
-        continue
-
-    file_path = os.path.join(folder_path, "complete_results.csv")
-
-    if not os.path.exists(file_path):
-        print(f"Warning: File {file_path} does not exist")
-        continue
-
-    try:
-        # Read the CSV file - each file might contain multiple rows
-        df = pd.read_csv(file_path)
-
-        # Check if file is empty
-        if df.empty:
-            print(f"Warning: Empty CSV file at {file_path}")
-            continue
-
-        # Process each row in the file
-        for idx, row in df.iterrows():
-            try:
-                strategy = row['Strategy']
-                config = row['Config']
-
-                # Skip if strategy or config is not valid
-                if pd.isna(strategy) or pd.isna(config) or strategy not in strategies or config not in configs:
-                    continue
-
-                # Extract metrics
-                for metric in ['ai-specificity', 'ai-measurability', 'ai-accuracy', 'ai-completeness']:
-                    if metric in row and not pd.isna(row[metric]):
-                        try:
-                            value = float(row[metric])
-                            results[strategy][config][metric].append(value)
-                        except (ValueError, TypeError):
-                            pass
-
-                rows_processed += 1
-
-            except Exception as e:
-                print(f"Error processing row {idx} in {file_path}: {e}")
-
-    except Exception as e:
-        print(f"Error processing file {file_path}: {e}")
-
-print(f"\nProcessed {folders_processed} folders with {rows_processed} total rows")
-
-# Calculate averages for each strategy-config combination
-avg_results = []
-
-for strategy in strategies:
-    for config in configs:
-        metrics = results[strategy][config]
-
-        # Only add a row if we have data for this combination
-        if any(metrics.values()):
-            avg_results.append({
-                'Strategy': strategy,
-                'Config': config,
-                'avg_ai_specificity': round(np.mean(metrics['ai-specificity']), 2) if metrics[
-                    'ai-specificity'] else None,
-                'avg_ai_measurability': round(np.mean(metrics['ai-measurability']), 2) if metrics[
-                    'ai-measurability'] else None,
-                'avg_ai_accuracy': round(np.mean(metrics['ai-accuracy']), 2) if metrics['ai-accuracy'] else None,
-                'avg_ai_completeness': round(np.mean(metrics['ai-completeness']), 2) if metrics[
-                    'ai-completeness'] else None,
-            })
-
-# Convert to DataFrame and save to CSV
-output_df = pd.DataFrame(avg_results)
-output_path = os.path.join("", "strategy_config_averages.csv")
-output_df.to_csv(output_path, index=False)
-
-print(f"\nAnalysis complete! Results saved to {output_path}")
-print(f"Found {len(avg_results)} strategy-config combinations out of expected 27")
\ No newline at end of file
+strategies = STRATEGY_ORDER
+configs = CONFIG_ORDER
+ai_metrics = ['ai-specificity', 'ai-measurability', 'ai-accuracy', 'ai-completeness']
+# "surrogate" or "llm" for rows scored in a pass with the surrogate judge, empty for older llm-only passes
+source_column = 'ai-source'
+judge_sources = ["llm", "surrogate"]
+
+
+def load_ai_scores(stories=None, workers=None, results_dir=base_dir, store_dir=store_dir):
+    # only the key and judge columns are needed, never the prompt/output text
+    if store_dir and os.path.isdir(store_dir):
+        from results_store import load_results, store_is_current
+
+        if store_is_current(store_dir, results_dir, stories):
+            return load_results(store_dir, ["story"] + KEY_COLUMNS + ai_metrics + [source_column], stories)
+        print(f"{store_dir} is older than the csv files in {results_dir}, reading those instead "
+              f"(python results_store.py import refreshes it)")
+
+    return load_csv_tree(results_dir, "complete_results.csv", columns=KEY_COLUMNS + ai_metrics + [source_column],
+                         stories=stories, workers=workers)
+
+
+def select_judge_source(df, judge_source=None):
+    """
+    reports how many rows each judge scored and keeps only those of judge_source ("llm" or
+    "surrogate"), all of them when None. rows without a source were judged by the llm.
+    """
+    sources = pd.Series("llm", index=df.index)
+    if source_column in df:
+        sources = sources.mask(df[source_column] == "surrogate", "surrogate")
+    counts = sources.value_counts()
+    print("Judge sources: " + ", ".join(f"{counts.get(source, 0)} rows scored by the {source}"
+                                        for source in judge_sources))
+    if judge_source is None:
+        return df
+    return df[sources == judge_source]
+
+
+def compute_ai_averages(df):
+    # Skip rows whose strategy or config is not valid, and scores that are not numbers
+    df = df[df["Strategy"].isin(strategies) & df["Config"].isin(configs)].copy()
+    for metric in ai_metrics:
+        df[metric] = pd.to_numeric(df[metric], errors="coerce") if metric in df else float("nan")
+
+    stats = aggregate_metrics(df, ai_metrics)
+    means = stats.xs("mean", axis=1, level=1)
+
+    # Only add a row if we have data for this combination
+    means = means.dropna(how="all").round(2)
+    avg_results = means.rename(columns={metric: f"avg_{metric.replace('-', '_')}" for metric in ai_metrics})
+    avg_results = avg_results.astype(object).where(avg_results.notna(), None).reset_index()
+
+    return avg_results, flatten_stats(stats.loc[means.index])
+
+
+def main(stories=None, strategies=None, configs=None, workers=None, output_dir=".", results_dir=base_dir,
+         results_store_dir=store_dir, judge_source=None):
+    print(f"Starting to process folders in {results_dir}")
+
+    df = select_cells(load_ai_scores(stories, workers, results_dir, results_store_dir), strategies, configs)
+    df = select_judge_source(df, judge_source)
+    print(f"\nProcessed {df['story'].nunique()} folders with {len(df)} total rows")
+
+    avg_results, stats = compute_ai_averages(df)
+
+    # Save to CSV
+    output_path = os.path.join(output_dir, "strategy_config_averages.csv")
+    avg_results.to_csv(output_path, index=False)
+    stats_path = os.path.join(output_dir, "strategy_config_statistics.csv")
+    stats.to_csv(stats_path, index=False)
+
+    print(f"\nAnalysis complete! Results saved to {output_path}")
+    print(f"Mean, std, median and percentiles saved to {stats_path}")
+    expected = len(strategies or STRATEGY_ORDER) * len(configs or CONFIG_ORDER)
+    print(f"Found {len(avg_results)} strategy-config combinations out of expected {expected}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,148 @@
 import os
 import pandas as pd
-import time
 import json
 import ast
 import shutil
-from dotenv import load_dotenv
-from vertexai.generative_models import GenerativeModel
-from vertexai import init
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from backends import get_backend
+from config import judge_batch_size, judge_max_retries, judge_tokens_per_item, max_concurrent_requests, \
+    surrogate_judge as surrogate_config
+from hedging import get_hedger
+from model_pool import get_model, get_model_pool
+from response_cache import get_response_cache
+from rate_limiter import estimate_tokens, get_rate_limiter
+from aggregation import write_csv_atomically
 
-load_dotenv()
-init(project=os.getenv("PROJECT_ID"), location=os.getenv("LOCATION"))
-model = GenerativeModel("gemini-2.0-flash-001")
+JUDGE_MODEL_NAME = "gemini-2.0-flash-001"
+AI_COLUMNS = ["ai-specificity", "ai-measurability", "ai-accuracy", "ai-completeness"]
+JUDGE_CRITERIA = ["specificity", "measurability", "accuracy", "completeness"]
+# the single writer also saves files that are still being judged this often
+FLUSH_SECONDS = 30
+# "surrogate" or "llm" for the rows scored in a pass with the surrogate judge (see surrogate_judge.py)
+SOURCE_COLUMN = "ai-source"
+ERROR_PREFIX = "Error generating requirements"
 
-def evaluate_requirements(user_story_data, requirements):
-    if isinstance(user_story_data, str):
+judge_stats = {"judge_calls": 0, "batched_calls": 0, "batched_items": 0, "fallback_items": 0, "parse_failures": 0,
+               "retries": 0, "unresolved_items": 0, "error_rows": 0}
+_stats_lock = threading.Lock()
+
+SCORE_PROPERTIES = {criterion: {"type": "integer", "minimum": 1, "maximum": 5} for criterion in JUDGE_CRITERIA}
+SCORE_SCHEMA = {"type": "object", "properties": SCORE_PROPERTIES, "required": JUDGE_CRITERIA}
+
+
+def batch_schema(item_ids):
+    # one object per requested set, the id limited to the names that were sent
+    return {"type": "array", "items": {"type": "object",
+                                       "properties": {"id": {"type": "string", "enum": sorted(item_ids)},
+                                                      **SCORE_PROPERTIES},
+                                       "required": ["id"] + JUDGE_CRITERIA}}
+
+
+def missing_scores():
+    # an unresolved cell stays empty, so it neither skews the averages nor counts as judged
+    return {k: None for k in AI_COLUMNS}
+
+
+def count_judge_stat(name, amount=1):
+    # judge calls run on several threads when files are judged in parallel
+    with _stats_lock:
+        judge_stats[name] += amount
+
+
+def is_error_output(output):
+    # failed generations keep the error message as their output, there is nothing to judge
+    return not isinstance(output, str) or not output.strip() or output.startswith(ERROR_PREFIX)
+
+
+def strip_fences(response_text):
+    # schema-constrained answers come without them, older cached answers may still have them
+    response_text = response_text.strip()
+    if response_text.startswith("```json"):
+        response_text = response_text.replace("```json", "", 1)
+    if response_text.endswith("```"):
+        response_text = response_text[:-3]
+    return response_text.strip()
+
+
+def check_judge_backend():
+    """
+    builds the judge model and a schema config once before judging starts. the calls below catch
+    errors per cell, so a backend that cannot be built (e.g. vertexai not installed) would
+    otherwise leave every cell unscored without stopping the run.
+    """
+    get_model(JUDGE_MODEL_NAME)
+    get_backend().structured_config(SCORE_SCHEMA, judge_tokens_per_item)
+
+
+def judge_call(prompt, schema, items, parse):
+    """
+    one judge request through the shared cache, model pool, rate limiter and hedger, constrained
+    to json matching schema with room for items scores. parse(text) validates the answer and
+    raises ValueError when it does not fit; only answers that parse are cached.
+    """
+    max_output_tokens = judge_tokens_per_item * items
+    cache = get_response_cache()
+    cache_key = cache.make_key(prompt, JUDGE_MODEL_NAME, max_output_tokens=max_output_tokens)
+    cached = cache.get(cache_key)
+    if cached is not None:
         try:
-            user_story_data = ast.literal_eval(user_story_data)
-        except (SyntaxError, ValueError):
-            return {k: 3 for k in ["ai-specificity", "ai-measurability", "ai-accuracy", "ai-completeness"]}
+            return parse(strip_fences(cached["text"]))
+        except ValueError:
+            pass
+
+    model = get_model(JUDGE_MODEL_NAME)
+    generation_config = get_backend().structured_config(schema, max_output_tokens)
+    limiter = get_rate_limiter()
+    hedger = get_hedger()
+    estimated_tokens = estimate_tokens(prompt)
+    # batched calls and single-cell retries take very different times, so each item count keeps its own latencies
+    hedge_key = f"{JUDGE_MODEL_NAME}/judge x{items}"
+    response = limiter.call(lambda: hedger.call(
+        hedge_key, lambda cancel: model.generate_content(prompt, generation_config=generation_config),
+        estimated_tokens), estimated_tokens=estimated_tokens)
+    count_judge_stat("judge_calls")
+    usage = getattr(response, "usage_metadata", None)
+    limiter.record_usage(estimated_tokens, getattr(usage, "total_token_count", None))
+
+    try:
+        result = parse(strip_fences(response.text))
+    except ValueError:
+        count_judge_stat("parse_failures")
+        raise
+    cache.put(cache_key, response.text)
+    return result
+
+
+def parse_user_story(user_story_data):
+    if isinstance(user_story_data, str):
+        user_story_data = ast.literal_eval(user_story_data)
+    return user_story_data.get('text', ''), user_story_data.get('context', '')
 
-    user_story = user_story_data.get('text', '')
-    context = user_story_data.get('context', '')
+
+def valid_scores(entry):
+    # the four criteria as integers 1-5, or None when any of them is missing or out of range
+    values = [entry.get(criterion) for criterion in JUDGE_CRITERIA]
+    if all(isinstance(value, int) and not isinstance(value, bool) and 1 <= value <= 5 for value in values):
+        return dict(zip(AI_COLUMNS, values))
+    return None
+
+
+def parse_scores(response_text):
+    result = json.loads(response_text)
+    scores = valid_scores(result) if isinstance(result, dict) else None
+    if scores is None:
+        raise ValueError("judge response does not match the score schema")
+    return scores
+
+
+def evaluate_requirements(user_story_data, requirements):
+    try:
+        user_story, context = parse_user_story(user_story_data)
+    except (SyntaxError, ValueError):
+        count_judge_stat("unresolved_items")
+        return missing_scores()
 
     prompt = f"""
     You are an expert in requirements engineering. You will evaluate a set of requirements based on four criteria.
@@ -49,26 +171,101 @@ def evaluate_requirements(user_story_data, requirements):
     Only return the JSON object with no additional text.
     """
 
+    # only this cell is asked again, told why its answer was rejected, up to judge_max_retries times
+    attempt_prompt = prompt
+    for attempt in range(judge_max_retries + 1):
+        if attempt:
+            count_judge_stat("retries")
+        try:
+            return judge_call(attempt_prompt, SCORE_SCHEMA, 1, parse_scores)
+        except ValueError as e:
+            print(f"Invalid judge response in evaluate_requirements: {e}")
+            attempt_prompt = f"{prompt}\n    Your previous answer was rejected ({e}). Return only the JSON object.\n"
+        except Exception as e:
+            print(f"Error in evaluate_requirements: {e}")
+            break
+
+    count_judge_stat("unresolved_items")
+    return missing_scores()
+
+
+def parse_batch_scores(response_text, item_ids):
+    """
+    validates a batched judge response: a json array with one object per requested id and an
+    integer 1-5 for every criterion. returns {id: scores} for the entries that are valid.
+    """
+    result = json.loads(response_text)
+    if not isinstance(result, list):
+        raise ValueError("batched judge response is not a JSON array")
+
+    scores = {}
+    for entry in result:
+        if not isinstance(entry, dict) or entry.get("id") not in item_ids:
+            continue
+        entry_scores = valid_scores(entry)
+        if entry_scores is not None:
+            scores[entry["id"]] = entry_scores
+    return scores
+
+
+def evaluate_requirements_batch(user_story_data, items, chunk_size=27):
+    """
+    judges several requirement sets for the same user story in one call per chunk, sending the
+    story and context once. items is a list of (id, requirements) pairs, e.g. ids like
+    "Zero-shot/precise". ids the batch answer misses or gets wrong fall back to per-item calls.
+    """
     try:
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
-
-        if response_text.startswith("```json"):
-            response_text = response_text.replace("```json", "", 1)
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-
-        result = json.loads(response_text.strip())
-
-        return {
-            "ai-specificity": result.get("specificity", 3),
-            "ai-measurability": result.get("measurability", 3),
-            "ai-accuracy": result.get("accuracy", 3),
-            "ai-completeness": result.get("completeness", 3)
-        }
-    except Exception as e:
-        print(f"Error in evaluate_requirements: {e}")
-        return {k: 3 for k in ["ai-specificity", "ai-measurability", "ai-accuracy", "ai-completeness"]}
+        user_story, context = parse_user_story(user_story_data)
+    except (SyntaxError, ValueError):
+        count_judge_stat("unresolved_items", len(items))
+        return {item_id: missing_scores() for item_id, _ in items}
+
+    scores = {}
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start:start + chunk_size]
+        item_ids = {item_id for item_id, _ in chunk}
+        sets = "\n".join(f"""
+    REQUIREMENTS SET "{item_id}":
+    {requirements}
+""" for item_id, requirements in chunk)
+
+        prompt = f"""
+    You are an expert in requirements engineering. You will evaluate {len(chunk)} sets of requirements, all written for the same user story, based on four criteria.
+
+    USER STORY: {user_story}
+    CONTEXT: {context}
+{sets}
+    Please evaluate each set of requirements independently on a Likert scale from 1-5 (where 1 is strongly disagree and 5 is strongly agree) for each of the following criteria:
+
+    1. SPECIFICITY: The requirements are specific and unambiguous.
+    2. MEASURABILITY: The fulfillment of the requirements can be objectively measured.
+    3. ACCURACY: The requirements accurately reflect the information and intent of the source User Story.
+    4. COMPLETENESS: The requirements cover all essential functional and non-functional aspects described in the User Story.
+
+    Provide your evaluation as a JSON array with exactly one object per requirements set, using the set's name as its id:
+    [
+        {{"id": "<set name>", "specificity": 1-5, "measurability": 1-5, "accuracy": 1-5, "completeness": 1-5}}
+    ]
+
+    Only return the JSON array with no additional text.
+    """
+
+        try:
+            chunk_scores = judge_call(prompt, batch_schema(item_ids), len(chunk),
+                                      lambda response_text: parse_batch_scores(response_text, item_ids))
+        except Exception as e:
+            print(f"Error in evaluate_requirements_batch: {e}")
+            chunk_scores = {}
+        count_judge_stat("batched_calls")
+        count_judge_stat("batched_items", len(chunk_scores))
+        scores.update(chunk_scores)
+
+        for item_id, requirements in chunk:
+            if item_id not in chunk_scores:
+                count_judge_stat("fallback_items")
+                scores[item_id] = evaluate_requirements(user_story_data, requirements)
+
+    return scores
 
 
 def create_backup(file_path):
@@ -90,72 +287,300 @@ def create_backup(file_path):
         return None
 
 
-def process_csv(input_file, output_file):
-    try:
-        df = pd.read_csv(input_file)
-    except Exception as e:
-        print(f"Error loading CSV: {e}")
-        return
+def story_numbers(base_dir):
+    # every row_story_N folder under base_dir, in story order
+    return sorted(int(name.rsplit("_", 1)[-1]) for name in os.listdir(base_dir)
+                  if name.startswith("row_story_") and name.rsplit("_", 1)[-1].isdigit())
 
-    columns = ["ai-specificity", "ai-measurability", "ai-accuracy", "ai-completeness"]
-    for col in columns:
-        if col not in df.columns:
-            df[col] = None
 
-    for idx, row in df.iterrows():
-        if all(pd.notna(row[col]) for col in columns):
+def build_score_index(base_dir="prompt_engineering_results", stories=None, strategies=None, configs=None):
+    """
+    maps every existing complete_results.csv to the rows that still miss an ai-* score, for the
+    given stories, strategies and configs (all of them by default). rows whose generation failed
+    are left out, so a file with nothing but failed generations is never reloaded or backed up.
+    only the Strategy, Config, Output and ai-* columns are parsed, never the prompt text.
+    """
+    index = {}
+    for row_num in stories if stories is not None else story_numbers(base_dir):
+        csv_file = os.path.join(base_dir, f"row_story_{row_num}", "complete_results.csv")
+        if not os.path.exists(csv_file):
+            continue
+
+        try:
+            scores = pd.read_csv(csv_file, usecols=lambda col: col in ["Strategy", "Config", "Output"] + AI_COLUMNS)
+        except Exception as e:
+            print(f"Error loading CSV: {e}")
             continue
 
+        for col in AI_COLUMNS:
+            if col not in scores.columns:
+                scores[col] = None
+        missing = scores[AI_COLUMNS].isna().any(axis=1)
+        if strategies is not None:
+            missing &= scores["Strategy"].isin(strategies)
+        if configs is not None:
+            missing &= scores["Config"].isin(configs)
+        failed = missing & scores["Output"].map(is_error_output)
+        count_judge_stat("error_rows", int(failed.sum()))
+        missing &= ~failed
+        index[csv_file] = [
+            (int(idx), row_num, scores.at[idx, "Strategy"], scores.at[idx, "Config"])
+            for idx in scores.index[missing]
+        ]
+    return index
+
+
+def build_work_queue(index):
+    # only the gaps: one (csv_file, row indices) entry per file that still has missing cells
+    return [(csv_file, [cell[0] for cell in cells]) for csv_file, cells in index.items() if cells]
+
+
+def judge_rows(df, pending_rows, output_file):
+    columns = AI_COLUMNS
+    for judged, idx in enumerate(pending_rows, start=1):
+        row = df.loc[idx]
         try:
-            print(f"Processing row {idx + 1}/{len(df)} in {os.path.basename(input_file)}...")
+            print(f"Processing row {idx + 1}/{len(df)}...")
             scores = evaluate_requirements(row["User Story"], row["Output"])
             for col, score in scores.items():
                 df.at[idx, col] = score
 
-            if idx % 5 == 0:
+            if judged % 5 == 0:
                 df.to_csv(output_file, index=False)
                 print(f"Intermediate save after row {idx + 1}")
-
-            time.sleep(1)
         except Exception as e:
             print(f"Error processing row {idx + 1}: {e}")
             for col in columns:
-                df.at[idx, col] = 3
+                df.at[idx, col] = None
 
-    df.to_csv(output_file, index=False)
-    print(f"Completed processing {os.path.basename(input_file)}")
 
+def judge_chunks(df, pending_rows, batch_size):
+    """
+    groups pending rows by user story into chunks of at most batch_size rows, which share one
+    judge call. yields (user_story, rows, {row: item id}) with ids like "Zero-shot/precise".
+    """
+    by_story = {}
+    for idx in pending_rows:
+        by_story.setdefault(df.at[idx, "User Story"], []).append(idx)
+
+    for user_story, rows in by_story.items():
+        for start in range(0, len(rows), batch_size):
+            chunk = rows[start:start + batch_size]
+            item_ids = {}
+            for idx in chunk:
+                item_id = f"{df.at[idx, 'Strategy']}/{df.at[idx, 'Config']}"
+                item_ids[idx] = item_id if item_id not in item_ids.values() else f"{item_id}#{idx}"
+            yield user_story, chunk, item_ids
+
+
+def judge_items(user_story, items, batch_size):
+    # one batched call per chunk, or the plain per-row prompt when batching is off
+    if batch_size > 1:
+        return evaluate_requirements_batch(user_story, items, chunk_size=batch_size)
+    return {item_id: evaluate_requirements(user_story, requirements) for item_id, requirements in items}
+
+
+def judge_rows_batched(df, pending_rows, batch_size, output_file):
+    # rows of the same user story share one judge call per chunk of batch_size outputs
+    for user_story, chunk, item_ids in judge_chunks(df, pending_rows, batch_size):
+        print(f"Processing rows {', '.join(str(idx + 1) for idx in chunk)} of {len(df)} in one batch...")
+        scores = evaluate_requirements_batch(
+            user_story, [(item_ids[idx], df.at[idx, "Output"]) for idx in chunk], chunk_size=batch_size)
+        for idx in chunk:
+            for col, score in scores[item_ids[idx]].items():
+                df.at[idx, col] = score
 
-def process_all_rows():
-    base_dir = "prompt_engineering_results"
+        df.to_csv(output_file, index=False)
+        print(f"Intermediate save after batch of {len(chunk)} rows")
 
-    os.makedirs(base_dir, exist_ok=True)
 
-    for row_num in range(3, 258):
-        row_dir = os.path.join(base_dir, f"row_story_{row_num}")
-        csv_file = os.path.join(row_dir, "complete_results.csv")
+def process_csv(input_file, output_file, pending_rows=None, batch_size=judge_batch_size):
+    try:
+        df = pd.read_csv(input_file)
+    except Exception as e:
+        print(f"Error loading CSV: {e}")
+        return
 
-        if not os.path.exists(row_dir):
-            print(f"Directory {row_dir} does not exist. Skipping.")
-            continue
+    columns = AI_COLUMNS
+    for col in columns:
+        if col not in df.columns:
+            df[col] = None
 
-        if not os.path.exists(csv_file):
-            print(f"CSV file {csv_file} does not exist. Skipping.")
-            continue
+    if pending_rows is None:
+        pending_rows = [idx for idx in df.index if df.loc[idx, columns].isna().any()]
 
-        print(f"\n{'=' * 50}")
-        print(f"STARTING PROCESSING: row_story_{row_num}")
-        print(f"{'=' * 50}")
+    check_judge_backend()
+    if batch_size > 1:
+        judge_rows_batched(df, pending_rows, batch_size, output_file)
+    else:
+        judge_rows(df, pending_rows, output_file)
+
+    df.to_csv(output_file, index=False)
+    print(f"Completed processing {os.path.basename(input_file)}")
 
-        backup = create_backup(csv_file)
+
+def judge_concurrently(queue, max_workers=max_concurrent_requests, batch_size=judge_batch_size, backup=True,
+                       surrogate=None):
+    """
+    judges every pending row of every file in queue (see build_work_queue) through one pool of at
+    most max_workers judge calls in flight, so a handful of rows left in each of many files keeps
+    the pool as busy as one big file. files are read as the pool drains, about two chunks per
+    worker ahead, so only the files with chunks in flight are held in memory. the calling thread
+    is the only writer: it merges each finished chunk into its file's dataframe, writes the file
+    atomically once all of its rows are scored, and saves the files still in progress every
+    FLUSH_SECONDS. a chunk whose call raised stays unscored for the next run. rows whose
+    generation failed are never sent. with a surrogate (see surrogate_judge.py) the rows it is
+    confident about are scored locally, apart from a sample that is judged anyway to track agreement.
+    returns the number of rows the judge gave all four scores.
+    """
+    from tqdm import tqdm
+
+    queue = list(queue)
+    if queue:
+        check_judge_backend()
+    frames = {}
+    remaining = {}
+    dirty = set()
+    audits = {}
+    judged = 0
+    pending_files = iter(queue)
+    max_in_flight = 2 * max(1, max_workers)
+    progress = tqdm(total=sum(len(pending_rows) for _, pending_rows in queue), desc="Judging rows")
+
+    def save(csv_file):
+        write_csv_atomically(frames[csv_file], csv_file)
+        dirty.discard(csv_file)
+
+    def finish(csv_file):
+        if csv_file in dirty:
+            save(csv_file)
+        del frames[csv_file]
+        del remaining[csv_file]
+
+    def load_next(executor, futures):
+        # reads the next queued file and submits its chunks, False once the queue is empty
+        csv_file, pending_rows = next(pending_files, (None, None))
+        if csv_file is None:
+            return False
+        try:
+            df = pd.read_csv(csv_file)
+        except Exception as e:
+            print(f"Error loading CSV: {e}")
+            progress.update(len(pending_rows))
+            return True
         if backup:
-            print(f"Created backup before processing row_story_{row_num}")
+            create_backup(csv_file)
+        for col in AI_COLUMNS:
+            if col not in df.columns:
+                df[col] = None
+
+        frames[csv_file] = df
+        remaining[csv_file] = 0
+        # a queue built from a score index holds no failed generations, others may
+        error_rows = [idx for idx in pending_rows if is_error_output(df.at[idx, "Output"])]
+        count_judge_stat("error_rows", len(error_rows))
+        progress.update(len(error_rows))
+        pending_rows = [idx for idx in pending_rows if idx not in error_rows]
+        if surrogate is not None:
+            if SOURCE_COLUMN not in df.columns:
+                df[SOURCE_COLUMN] = None
+            kept, file_audits = surrogate.triage(df.loc[pending_rows])
+            for idx, scores in kept.items():
+                for col, score in scores.items():
+                    df.at[idx, col] = score
+                df.at[idx, SOURCE_COLUMN] = "surrogate"
+            audits.update({(csv_file, idx): scores for idx, scores in file_audits.items()})
+            progress.update(len(kept))
+            pending_rows = [idx for idx in pending_rows if idx not in kept]
+            dirty.update([csv_file] if kept else [])
+
+        for user_story, chunk, item_ids in judge_chunks(df, pending_rows, batch_size):
+            items = [(item_ids[idx], df.at[idx, "Output"]) for idx in chunk]
+            future = executor.submit(judge_items, user_story, items, batch_size)
+            futures[future] = (csv_file, chunk, item_ids)
+            remaining[csv_file] += 1
+        if remaining[csv_file] == 0:
+            finish(csv_file)
+        return True
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {}
+        while len(futures) < max_in_flight and load_next(executor, futures):
+            pass
+
+        last_flush = time.time()
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                csv_file, chunk, item_ids = futures.pop(future)
+                df = frames[csv_file]
+                try:
+                    scores = future.result()
+                    for idx in chunk:
+                        for col, score in scores[item_ids[idx]].items():
+                            df.at[idx, col] = score
+                        judged += all(score is not None for score in scores[item_ids[idx]].values())
+                        if surrogate is not None:
+                            df.at[idx, SOURCE_COLUMN] = "llm"
+                            if (csv_file, idx) in audits:
+                                surrogate.record_audit(audits.pop((csv_file, idx)), scores[item_ids[idx]])
+                    dirty.add(csv_file)
+                except Exception as e:
+                    print(f"Error judging rows {', '.join(str(idx + 1) for idx in chunk)} of {csv_file}: {e}")
+                progress.update(len(chunk))
+
+                remaining[csv_file] -= 1
+                if remaining[csv_file] == 0:
+                    finish(csv_file)
+
+            if time.time() - last_flush >= FLUSH_SECONDS:
+                for dirty_file in list(dirty):
+                    save(dirty_file)
+                last_flush = time.time()
+            while len(futures) < max_in_flight and load_next(executor, futures):
+                pass
+
+    progress.close()
+    return judged
+
+
+def process_all_rows(stories=None, base_dir="prompt_engineering_results", strategies=None, configs=None,
+                     workers=max_concurrent_requests, batch_size=judge_batch_size, use_surrogate=None):
 
-        process_csv(csv_file, csv_file)
+    os.makedirs(base_dir, exist_ok=True)
 
-        print(f"{'=' * 50}")
-        print(f"COMPLETED: row_story_{row_num}")
-        print(f"{'=' * 50}\n")
+    # finished files are never backed up, reloaded or rewritten
+    index = build_score_index(base_dir, stories, strategies, configs)
+    queue = build_work_queue(index)
+    missing_cells = sum(len(rows) for _, rows in queue)
+    print(f"Indexed {len(index)} files: {missing_cells} cells missing ai scores in {len(queue)} files")
+
+    # use_surrogate None follows config surrogate_judge
+    surrogate = None
+    if use_surrogate is None:
+        use_surrogate = surrogate_config["enabled"]
+    if use_surrogate and missing_cells:
+        from surrogate_judge import train_surrogate
+
+        surrogate = train_surrogate(surrogate_config["training_dir"] or base_dir)
+
+    start_time = time.time()
+    judged = judge_concurrently(queue, workers, batch_size, surrogate=surrogate)
+    elapsed = time.time() - start_time
+    print(f"Judged {judged} rows in {elapsed:.1f}s ({judged / max(elapsed, 1e-9):.1f} rows/s, {workers} workers)")
+
+    print(f"judge: {judge_stats['judge_calls']} calls, {judge_stats['batched_calls']} batched calls scoring "
+          f"{judge_stats['batched_items']} outputs, {judge_stats['fallback_items']} per-item fallbacks")
+    failure_rate = judge_stats["parse_failures"] / judge_stats["judge_calls"] if judge_stats["judge_calls"] else 0.0
+    print(f"judge responses: {judge_stats['parse_failures']} of {judge_stats['judge_calls']} failed validation "
+          f"({failure_rate:.1%}), {judge_stats['retries']} single-cell retries, "
+          f"{judge_stats['unresolved_items']} cells left missing for the next run, "
+          f"{judge_stats['error_rows']} failed generations not sent")
+    if surrogate is not None:
+        print(surrogate.report())
+    print(get_hedger().report())
+    print(get_response_cache().summary())
+    print(get_model_pool().summary())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,112 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+
+from config import model_backend as model_backend_config
+
+
+class ModelBackend(ABC):
+    """
+    what the pipeline needs from a model provider. make_model returns an object with
+    generate_content(prompt, generation_config=None, stream=False) whose responses carry .text and
+    .usage_metadata, and prefix_cache_backend returns the matching PrefixCacheBackend.
+    structured_config builds the generation_config that asks for json matching a schema.
+    """
+
+    name = None
+
+    def init(self):
+        pass
+
+    @abstractmethod
+    def make_model(self, model_name, generation_config=None):
+        pass
+
+    @abstractmethod
+    def prefix_cache_backend(self, min_prefix_tokens):
+        pass
+
+    def structured_config(self, schema, max_output_tokens):
+        return {"response_mime_type": "application/json", "response_schema": schema,
+                "max_output_tokens": max_output_tokens}
+
+
+class VertexBackend(ModelBackend):
+    name = "vertex"
+
+    def __init__(self):
+        self._initialized = False
+        self._lock = threading.Lock()
+
+    def init(self):
+        # vertexai.init runs once, on the first model built rather than at import time
+        with self._lock:
+            if self._initialized:
+                return
+            from dotenv import load_dotenv
+            from vertexai import init
+
+            load_dotenv()
+            init(project=os.getenv("PROJECT_ID"), location=os.getenv("LOCATION"))
+            self._initialized = True
+
+    def make_model(self, model_name, generation_config=None):
+        from vertexai.generative_models import GenerativeModel
+
+        self.init()
+        if generation_config:
+            return GenerativeModel(model_name, generation_config=generation_config)
+        return GenerativeModel(model_name)
+
+    def prefix_cache_backend(self, min_prefix_tokens):
+        from prefix_cache import VertexPrefixCacheBackend
+
+        return VertexPrefixCacheBackend(min_prefix_tokens)
+
+    def structured_config(self, schema, max_output_tokens):
+        # GenerationConfig converts the openapi style schema dict into the api's Schema message
+        from vertexai.generative_models import GenerationConfig
+
+        return GenerationConfig(response_mime_type="application/json", response_schema=schema,
+                                max_output_tokens=max_output_tokens)
+
+
+class SimulatedBackend(ModelBackend):
+    name = "simulated"
+
+    def __init__(self, min_prefix_tokens=0, **model_settings):
+        self.min_prefix_tokens = min_prefix_tokens
+        self.model_settings = model_settings
+
+    def make_model(self, model_name, generation_config=None):
+        from fake_model import SimulatedGenerativeModel
+
+        return SimulatedGenerativeModel(model_name, generation_config, **self.model_settings)
+
+    def prefix_cache_backend(self, min_prefix_tokens):
+        from fake_model import FakePrefixCacheBackend
+
+        backend = FakePrefixCacheBackend()
+        backend.min_prefix_tokens = self.min_prefix_tokens
+        return backend
+
+
+def make_backend(name=None):
+    name = name or os.getenv("MODEL_BACKEND") or model_backend_config["name"]
+    if name == "vertex":
+        return VertexBackend()
+    if name == "simulated":
+        return SimulatedBackend(**model_backend_config["simulated"])
+    raise ValueError(f"Unknown model backend: {name}")
+
+
+_shared_backend = None
+_shared_lock = threading.Lock()
+
+
+def get_backend():
+    global _shared_backend
+    with _shared_lock:
+        if _shared_backend is None:
+            _shared_backend = make_backend()
+        return _shared_backend
@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aggregation import CONFIG_ORDER, STRATEGY_ORDER, aggregate_metrics
+from process_results import SUMMARY_COLUMNS
+
+AI_METRICS = ['ai-specificity', 'ai-measurability', 'ai-accuracy', 'ai-completeness']
+
+
+def synthetic_results(num_rows=100000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "story": rng.integers(1, 5000, num_rows),
+        "Strategy": rng.choice(STRATEGY_ORDER, num_rows),
+        "Config": rng.choice(CONFIG_ORDER, num_rows)
+    })
+    for col in SUMMARY_COLUMNS[2:]:
+        df[col] = rng.gamma(2.0, 200.0, num_rows).round(2)
+    for col in AI_METRICS:
+        df[col] = rng.integers(1, 6, num_rows)
+    return df
+
+
+def legacy_means(df, value_columns):
+    # the original per-row accumulation from process_results
+    aggregated_data = {}
+    counters = {}
+    for _, row in df.iterrows():
+        key = (row['Strategy'], row['Config'])
+        if key not in aggregated_data:
+            aggregated_data[key] = {col: 0 for col in value_columns}
+            counters[key] = 0
+        for col in value_columns:
+            aggregated_data[key][col] += row[col]
+        counters[key] += 1
+    return {key: {col: value / counters[key] for col, value in data.items()} for key, data in aggregated_data.items()}
+
+
+def main(num_rows=100000):
+    df = synthetic_results(num_rows)
+    value_columns = SUMMARY_COLUMNS[2:] + AI_METRICS
+    print(f"Synthetic results: {len(df)} rows, {len(value_columns)} metric columns")
+
+    start = time.perf_counter()
+    stats = aggregate_metrics(df, value_columns)
+    vectorized = time.perf_counter() - start
+    print(f"groupby mean/std/median/p25/p75/p95: {vectorized * 1000:.0f}ms ({len(stats)} combinations)")
+
+    start = time.perf_counter()
+    legacy = legacy_means(df, value_columns)
+    legacy_seconds = time.perf_counter() - start
+    print(f"legacy iterrows means only:          {legacy_seconds * 1000:.0f}ms")
+
+    means = stats.xs("mean", axis=1, level=1)
+    max_diff = max(abs(means.loc[key, col] - value) for key, data in legacy.items() for col, value in data.items())
+    print(f"max difference in means: {max_diff:.2e}")
+    print(f"speedup: {legacy_seconds / vectorized:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
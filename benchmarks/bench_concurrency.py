@@ -0,0 +1,38 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# every call should reach the fake model, not the response cache
+os.environ["RESPONSE_CACHE_BYPASS"] = "1"
+
+from concurrent_runner import run_evaluations_concurrently
+from fake_model import FakeGenerativeModel
+from main import load_user_stories_from_csv, run_evaluation
+
+
+def main(num_stories=4, max_workers=16, min_latency=0.05, max_latency=0.3):
+    stories = load_user_stories_from_csv("user_stories.csv")
+    stories = dict(list(stories.items())[:num_stories])
+    model = FakeGenerativeModel(min_latency=min_latency, max_latency=max_latency, seed=0)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        start = time.time()
+        for story_id, story_data in stories.items():
+            run_evaluation(story_data, story_id, model=model, results_dir=os.path.join(tmp_dir, "sequential"))
+        sequential = time.time() - start
+
+        start = time.time()
+        run_evaluations_concurrently(stories, max_workers=max_workers, model=model,
+                                     results_dir=os.path.join(tmp_dir, "concurrent"))
+        concurrent = time.time() - start
+
+    print(f"\n{num_stories} stories, fake latency {min_latency}-{max_latency}s")
+    print(f"sequential: {sequential:.2f}s")
+    print(f"concurrent ({max_workers} workers): {concurrent:.2f}s")
+    print(f"speedup: {sequential / concurrent:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import csv
+import glob
+import os
+import sys
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import early_stop
+from evaluation import count_requirements
+from stop_policy import make_stop_policy
+
+csv.field_size_limit(sys.maxsize)
+
+
+def replay(output, stop_policy, chunk_chars=60):
+    # feed a stored output through the stop policy as if it were streamed
+    for start in range(0, len(output), chunk_chars):
+        if stop_policy.update(output[start:start + chunk_chars]):
+            return stop_policy.text(), True
+    return output, False
+
+
+def main(base_folder="prompt_engineering_results"):
+    # measures the policy as it would run once enabled
+    early_stop.update(enabled=True)
+    totals = defaultdict(lambda: {"rows": 0, "truncated": 0, "lost": 0, "chars": 0, "saved": 0})
+    for file_path in glob.glob(os.path.join(base_folder, "row_story_*", "complete_results.csv")):
+        with open(file_path, newline='') as f:
+            for row in csv.DictReader(f):
+                stats = totals[row["Strategy"]]
+                output = row["Output"]
+                stop_policy = make_stop_policy(row["Strategy"])
+                text, truncated = replay(output, stop_policy) if stop_policy else (output, False)
+
+                stats["rows"] += 1
+                stats["chars"] += len(output)
+                if truncated:
+                    stats["truncated"] += 1
+                    stats["saved"] += len(output) - len(text)
+                    stats["lost"] += count_requirements(text) != count_requirements(output)
+
+    print(f"{'Strategy':20s} {'rows':>6s} {'truncated':>10s} {'lost reqs':>10s} {'chars saved':>12s}")
+    for strategy, stats in totals.items():
+        saved = stats["saved"] / stats["chars"] * 100 if stats["chars"] else 0
+        print(f"{strategy:20s} {stats['rows']:6d} {stats['truncated']:10d} {stats['lost']:10d} {saved:11.1f}%")
+
+
+if __name__ == "__main__":
+    main()
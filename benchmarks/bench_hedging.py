@@ -0,0 +1,53 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import rate_limits
+
+
+def run(hedger, model, prompts, max_workers):
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(lambda prompt: hedger.call("simulated", lambda cancel: model.generate_content(prompt),
+                                                     len(prompt) // 4), prompts))
+    return time.time() - start
+
+
+def main(num_calls=2000, max_workers=32, time_scale=0.01, latency_sigma=0.8, hedge_percentile=95):
+    # simulated time runs 1 / time_scale faster, so the quota scales with it
+    rate_limits.update(requests_per_minute=rate_limits["requests_per_minute"] / time_scale,
+                       tokens_per_minute=rate_limits["tokens_per_minute"] / time_scale)
+
+    from fake_model import SimulatedGenerativeModel
+    from hedging import Hedger
+
+    # a wide lognormal spread gives the long tail seen in the recorded latency columns
+    model = SimulatedGenerativeModel("simulated", seed=0, latency_sigma=latency_sigma, time_scale=time_scale)
+    # judge-style prompts: short json answers, so the latency is mostly the lognormal overhead
+    prompts = [f"Score requirements set {i} and answer with a JSON object." for i in range(num_calls)]
+
+    plain = Hedger(deadline_seconds=60)
+    plain_seconds = run(plain, model, prompts, max_workers)
+    hedged = Hedger(deadline_seconds=60, enabled=True, percentile=hedge_percentile)
+    hedged_seconds = run(hedged, model, prompts, max_workers)
+
+    print(f"\n{num_calls} calls, time scale {time_scale}, latency sigma {latency_sigma}, {max_workers} workers")
+    print(f"without hedging ({plain_seconds:.1f}s):")
+    print(plain.report())
+    print(f"\nhedging at p{hedge_percentile} ({hedged_seconds:.1f}s):")
+    print(hedged.report())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tail latency with and without hedged requests.")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--time-scale", type=float, default=0.01)
+    parser.add_argument("--latency-sigma", type=float, default=0.8)
+    parser.add_argument("--percentile", type=float, default=95)
+    args = parser.parse_args()
+    main(args.calls, args.workers, args.time_scale, args.latency_sigma, args.percentile)
@@ -0,0 +1,42 @@
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["config", "evaluation", "rescore", "prompt_templates", "backends", "model_pool", "main",
+           "concurrent_runner", "ai_metrics_evaluation", "aggregation", "process_results", "ai_metrics"]
+HEAVY = ["vertexai", "google.cloud", "pandas", "pyarrow", "numpy", "tqdm", "dotenv"]
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def import_profile(module):
+    # cumulative import time of the module in a fresh interpreter, plus which heavy packages it pulls in
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True)
+    cumulative = None
+    loaded = set()
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        name = match.group(4)
+        if name == module and not match.group(3):
+            cumulative = int(match.group(2)) / 1000
+        loaded.update(heavy for heavy in HEAVY if name == heavy or name.startswith(heavy + "."))
+    return cumulative, sorted(loaded), result.returncode
+
+
+def main(repeats=5):
+    print(f"{'Module':24s} {'import (ms)':>12s}  heavy dependencies loaded")
+    for module in MODULES:
+        profiles = [import_profile(module) for _ in range(repeats)]
+        cumulative, loaded, returncode = min(profiles, key=lambda profile: profile[0] or float("inf"))
+        if returncode or cumulative is None:
+            print(f"{module:24s} {'failed':>12s}")
+            continue
+        print(f"{module:24s} {cumulative:12.1f}  {', '.join(loaded) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# every call should reach the fake judge, not the response cache
+os.environ["RESPONSE_CACHE_BYPASS"] = "1"
+os.environ["MODEL_BACKEND"] = "simulated"
+
+import pandas as pd
+
+from config import rate_limits
+
+RESULTS_DIR = "prompt_engineering_results"
+
+
+def copy_unscored(stories, target_dir):
+    # the stored outputs with every ai-* score blanked, so every row is pending
+    from ai_metrics_evaluation import AI_COLUMNS
+
+    rows = 0
+    for story in stories:
+        run_dir = os.path.join(target_dir, f"row_story_{story}")
+        os.makedirs(run_dir)
+        df = pd.read_csv(os.path.join(RESULTS_DIR, f"row_story_{story}", "complete_results.csv"))
+        df[AI_COLUMNS] = None
+        df.to_csv(os.path.join(run_dir, "complete_results.csv"), index=False)
+        rows += len(df)
+    return rows
+
+
+def main(num_stories=40, legacy_stories=4, max_workers=16, time_scale=0.05):
+    # the fake judge runs 1 / time_scale faster than the real one, so the quota scales with it
+    rate_limits.update(requests_per_minute=rate_limits["requests_per_minute"] / time_scale,
+                       tokens_per_minute=rate_limits["tokens_per_minute"] / time_scale)
+
+    from ai_metrics_evaluation import JUDGE_MODEL_NAME, build_score_index, build_work_queue, judge_concurrently, \
+        process_csv
+    from fake_model import SimulatedGenerativeModel
+    from model_pool import get_model_pool
+
+    judge = SimulatedGenerativeModel(JUDGE_MODEL_NAME, time_scale=time_scale)
+    get_model_pool().factory = lambda model_name, **kwargs: judge
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # the old path: one file after another, one row per call
+        legacy_dir = os.path.join(tmp_dir, "legacy")
+        rows = copy_unscored(range(1, legacy_stories + 1), legacy_dir)
+        start = time.time()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for story in range(1, legacy_stories + 1):
+                csv_file = os.path.join(legacy_dir, f"row_story_{story}", "complete_results.csv")
+                process_csv(csv_file, csv_file, batch_size=1)
+        results["sequential, 1 row per call"] = (rows, time.time() - start)
+
+        for batch_size in (1, 27):
+            engine_dir = os.path.join(tmp_dir, f"engine_{batch_size}")
+            copy_unscored(range(1, num_stories + 1), engine_dir)
+            queue = build_work_queue(build_score_index(engine_dir))
+            start = time.time()
+            with contextlib.redirect_stdout(io.StringIO()):
+                judged = judge_concurrently(queue, max_workers, batch_size, backup=False)
+            results[f"engine, {max_workers} workers, batch {batch_size}"] = (judged, time.time() - start)
+
+            left = sum(len(cells) for cells in build_score_index(engine_dir).values())
+            assert left == 0, f"{left} rows left unscored"
+
+    print(f"\nfake judge at time scale {time_scale}")
+    for name, (rows, elapsed) in results.items():
+        print(f"{name}: {rows} rows in {elapsed:.2f}s ({rows / elapsed:.1f} rows/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Judged rows per second of the concurrent judge engine.")
+    parser.add_argument("--stories", type=int, default=40)
+    parser.add_argument("--legacy-stories", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--time-scale", type=float, default=0.05)
+    args = parser.parse_args()
+    main(args.stories, args.legacy_stories, args.workers, args.time_scale)
@@ -0,0 +1,30 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# every call should reach the fake model, not the response cache
+os.environ["RESPONSE_CACHE_BYPASS"] = "1"
+
+from concurrent_runner import run_evaluations_concurrently
+from fake_model import FakeGenerativeModel, FakePrefixCacheBackend
+from main import load_user_stories_from_csv
+from prefix_cache import PrefixCache
+
+
+def main(num_stories=10, max_workers=16):
+    stories = load_user_stories_from_csv("user_stories.csv")
+    stories = dict(list(stories.items())[:num_stories])
+    model = FakeGenerativeModel(min_latency=0.0, max_latency=0.01, seed=0)
+    prefix_cache = PrefixCache(FakePrefixCacheBackend())
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        run_evaluations_concurrently(stories, max_workers=max_workers, model=model, results_dir=tmp_dir,
+                                     prefix_cache=prefix_cache)
+
+    print(f"\n{num_stories} stories, every static preamble cached")
+    print(prefix_cache.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import csv
+import glob
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evaluation import evaluate_requirements_quality, measurability_patterns, specificity_terms, \
+    testability_terms
+
+csv.field_size_limit(sys.maxsize)
+
+
+def legacy_evaluate_requirements_quality(text):
+    # the original per-term implementation, kept here as the reference for parity and speed
+    text_lower = text.lower()
+    sentences = re.split(r'[.!?]+', text_lower)
+    sentences = [s.strip() for s in sentences if s.strip()]
+
+    if not sentences:
+        return {"specificity_score": 1, "measurability_score": 1, "testability_score": 1}
+
+    specificity_sentence_count = 0
+    for sentence in sentences:
+        high_matches = sum(
+            1 for term in specificity_terms['high_value'] if re.search(r'\b{}\b'.format(re.escape(term)), sentence))
+        medium_matches = sum(
+            1 for term in specificity_terms['medium_value'] if re.search(r'\b{}\b'.format(re.escape(term)), sentence))
+        low_matches = sum(
+            1 for term in specificity_terms['low_value'] if re.search(r'\b{}\b'.format(re.escape(term)), sentence))
+        specificity_sentence_count += (
+                high_matches * 1.0 +
+                medium_matches * 0.6 +
+                low_matches * 0.3
+        )
+
+    measurable_sentence_count = 0
+    for sentence in sentences:
+        for pattern in measurability_patterns:
+            if re.search(pattern, sentence):
+                measurable_sentence_count += 1
+                break
+
+    testable_sentence_count = 0
+    for sentence in sentences:
+        strong_matches = sum(
+            1 for term in testability_terms['strong_verbs'] if re.search(r'\b{}\b'.format(re.escape(term)), sentence))
+        action_matches = sum(
+            1 for term in testability_terms['action_verbs'] if re.search(r'\b{}\b'.format(re.escape(term)), sentence))
+        if strong_matches > 0:
+            testable_sentence_count += 1.0
+        elif action_matches > 0:
+            testable_sentence_count += 0.7
+
+    total_sentences = len(sentences)
+    specificity_percentage = (specificity_sentence_count / total_sentences) * 100
+    measurability_percentage = (measurable_sentence_count / total_sentences) * 100
+    testability_percentage = (testable_sentence_count / total_sentences) * 100
+
+    def percentage_to_score(percentage):
+        if percentage < 15:
+            return 1
+        elif percentage < 30:
+            return 2
+        elif percentage < 50:
+            return 3
+        elif percentage < 70:
+            return 4
+        else:
+            return 5
+
+    return {
+        "specificity_score": percentage_to_score(specificity_percentage),
+        "measurability_score": percentage_to_score(measurability_percentage),
+        "testability_score": percentage_to_score(testability_percentage)
+    }
+
+
+def load_outputs(base_folder="prompt_engineering_results"):
+    outputs = []
+    for file_path in sorted(glob.glob(os.path.join(base_folder, "row_story_*", "complete_results.csv"))):
+        with open(file_path, newline='') as f:
+            outputs.extend(row["Output"] for row in csv.DictReader(f))
+    return outputs
+
+
+def time_scorer(scorer, outputs):
+    start = time.perf_counter()
+    scores = [scorer(output) for output in outputs]
+    return time.perf_counter() - start, scores
+
+
+def main():
+    outputs = load_outputs()
+    print(f"Scoring {len(outputs)} outputs from complete_results.csv files")
+
+    legacy_seconds, legacy_scores = time_scorer(legacy_evaluate_requirements_quality, outputs)
+    new_seconds, new_scores = time_scorer(evaluate_requirements_quality, outputs)
+
+    mismatches = sum(1 for old, new in zip(legacy_scores, new_scores) if old != new)
+    print(f"legacy per-term regex: {legacy_seconds:.2f}s")
+    print(f"precompiled scorer:    {new_seconds:.2f}s")
+    print(f"speedup: {legacy_seconds / new_seconds:.1f}x")
+    print(f"mismatched scores: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
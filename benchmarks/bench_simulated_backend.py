@@ -0,0 +1,58 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# every call should reach the simulated model, not the response cache
+os.environ["RESPONSE_CACHE_BYPASS"] = "1"
+os.environ["MODEL_BACKEND"] = "simulated"
+
+from config import model_backend, rate_limits
+
+
+def main(num_stories=257, max_workers=64, time_scale=0.01, error_rate=0.01):
+    # simulated time runs 1 / time_scale faster, so the quota and backoff scale with it
+    model_backend["simulated"].update(time_scale=time_scale, error_rate=error_rate)
+    rate_limits.update(requests_per_minute=rate_limits["requests_per_minute"] / time_scale,
+                       tokens_per_minute=rate_limits["tokens_per_minute"] / time_scale,
+                       base_delay=rate_limits["base_delay"] * time_scale,
+                       max_delay=rate_limits["max_delay"] * time_scale)
+
+    from ai_metrics_evaluation import judge_stats, process_all_rows
+    from concurrent_runner import run_evaluations_concurrently
+    from main import load_user_stories_from_csv
+    from rate_limiter import get_rate_limiter
+
+    stories = load_user_stories_from_csv("user_stories.csv")
+    stories = dict(list(stories.items())[:num_stories])
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        start = time.time()
+        run_evaluations_concurrently(stories, max_workers=max_workers, results_dir=tmp_dir)
+        generation = time.time() - start
+        generation_stats = dict(get_rate_limiter().stats)
+
+        start = time.time()
+        process_all_rows(stories=range(1, num_stories + 1), base_dir=tmp_dir)
+        judging = time.time() - start
+
+    cells = num_stories * 27
+    print(f"\n{num_stories} stories, time scale {time_scale}, error rate {error_rate}, {max_workers} workers")
+    print(f"generation: {cells} cells in {generation:.1f}s ({cells / generation:.0f} cells/s), "
+          f"~{generation / time_scale / 60:.0f} min at real latency")
+    print(f"  {generation_stats['calls']} attempts, {generation_stats['retries']} retries, "
+          f"{generation_stats['failures']} failures")
+    print(f"judging: {judge_stats['judge_calls']} calls in {judging:.1f}s, "
+          f"~{judging / time_scale / 60:.0f} min at real latency")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the pipeline against the simulated backend.")
+    parser.add_argument("--stories", type=int, default=257)
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--time-scale", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    args = parser.parse_args()
+    main(args.stories, args.workers, args.time_scale, args.error_rate)
@@ -0,0 +1,69 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# every call should reach the simulated model, not the response cache
+os.environ["RESPONSE_CACHE_BYPASS"] = "1"
+os.environ["MODEL_BACKEND"] = "simulated"
+
+from config import model_backend, rate_limits
+
+
+def main(num_stories=40, stories_per_call=4, max_workers=32, time_scale=0.01):
+    """
+    the same stories swept unpacked and packed against the simulated backend: requests, tokens
+    and wall time of both, then the parity report of the packed results against the unpacked
+    ones. the simulated model answers packed prompts with independent per-story blocks, so this
+    measures the savings and the fallback path; quality parity needs a packed sweep on vertex,
+    checked with python story_packing.py <packed dir>.
+    """
+    # simulated time runs 1 / time_scale faster, so the quota and backoff scale with it
+    model_backend["simulated"].update(time_scale=time_scale)
+    rate_limits.update(requests_per_minute=rate_limits["requests_per_minute"] / time_scale,
+                       tokens_per_minute=rate_limits["tokens_per_minute"] / time_scale,
+                       base_delay=rate_limits["base_delay"] * time_scale,
+                       max_delay=rate_limits["max_delay"] * time_scale)
+
+    from concurrent_runner import run_evaluations_concurrently
+    from main import load_user_stories_from_csv
+    from rate_limiter import get_rate_limiter
+    from story_packing import get_packing_stats, parity_report
+
+    stories = load_user_stories_from_csv("user_stories.csv")
+    stories = dict(list(stories.items())[:num_stories])
+    limiter = get_rate_limiter()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, per_call in (("unpacked", 1), (f"packed x{stories_per_call}", stories_per_call)):
+            results_dir = os.path.join(tmp_dir, name.split()[0])
+            calls = limiter.stats["calls"]
+            start = time.time()
+            with contextlib.redirect_stdout(io.StringIO()):
+                run_evaluations_concurrently(stories, max_workers=max_workers, results_dir=results_dir,
+                                             stories_per_call=per_call)
+            results[name] = (limiter.stats["calls"] - calls, time.time() - start)
+        report = parity_report(os.path.join(tmp_dir, "packed"), os.path.join(tmp_dir, "unpacked"))
+
+    cells = num_stories * 27
+    print(f"\n{num_stories} stories, time scale {time_scale}, {max_workers} workers")
+    for name, (attempts, elapsed) in results.items():
+        print(f"{name}: {cells} cells, {attempts} request attempts in {elapsed:.1f}s "
+              f"({cells / elapsed:.0f} cells/s)")
+    print(get_packing_stats().report())
+    print(f"\n{report}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Requests, tokens and quality of packed against unpacked generation.")
+    parser.add_argument("--stories", type=int, default=40)
+    parser.add_argument("--stories-per-call", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--time-scale", type=float, default=0.01)
+    args = parser.parse_args()
+    main(args.stories, args.stories_per_call, args.workers, args.time_scale)
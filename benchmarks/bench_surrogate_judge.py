@@ -0,0 +1,69 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RESULTS_DIR = "prompt_engineering_results"
+
+
+def main(train_stories=200, workers=8):
+    """
+    trains the surrogate on the first train_stories stories and replays a judge pass over the
+    rest, whose real judge scores are known: how many rows and batched calls it would skip, how
+    often the skipped rows agree with the judge, and how far the per-strategy averages move.
+    """
+    from ai_metrics_evaluation import AI_COLUMNS, SOURCE_COLUMN, story_numbers
+    from aggregation import load_csv_tree
+    from config import surrogate_judge as surrogate_config
+    from surrogate_judge import FEATURE_COLUMNS, SurrogateJudge, training_labels
+
+    stories = story_numbers(RESULTS_DIR)
+    columns = ["Strategy", "Config", "Output", *FEATURE_COLUMNS, *AI_COLUMNS, SOURCE_COLUMN]
+    train = load_csv_tree(RESULTS_DIR, "complete_results.csv", columns, stories[:train_stories], workers)
+    test = load_csv_tree(RESULTS_DIR, "complete_results.csv", columns, stories[train_stories:], workers)
+
+    start = time.time()
+    surrogate = SurrogateJudge(surrogate_config["target_agreement"], audit_share=0.0)
+    surrogate.fit(train, surrogate_config["holdout_share"])
+    training = time.time() - start
+
+    labels = training_labels(test)
+    test = test.loc[labels.index]
+    start = time.time()
+    kept, _ = surrogate.triage(test)
+    triage = time.time() - start
+
+    kept_rows = list(kept)
+    agreed = sum(kept[idx][col] == labels.at[idx, col] for idx in kept_rows for col in AI_COLUMNS)
+    rows_agreed = sum(all(kept[idx][col] == labels.at[idx, col] for col in AI_COLUMNS) for idx in kept_rows)
+    # a story needs no batched call at all once every one of its rows is kept
+    kept_per_story = test.loc[kept_rows].groupby("story").size() if kept_rows else None
+    rows_per_story = test.groupby("story").size()
+    skipped_calls = 0 if kept_per_story is None else \
+        int((kept_per_story.reindex(rows_per_story.index, fill_value=0) == rows_per_story).sum())
+
+    filled = labels.copy()
+    for idx in kept_rows:
+        for col in AI_COLUMNS:
+            filled.at[idx, col] = kept[idx][col]
+    shift = (filled.groupby(test["Strategy"]).mean() - labels.groupby(test["Strategy"]).mean()).abs()
+
+    print(f"\n{surrogate.summary()}")
+    print(f"trained on {len(training_labels(train))} rows of {train_stories} stories in {training:.2f}s")
+    print(f"replayed {len(test)} judged rows of {len(rows_per_story)} unseen stories in {triage:.3f}s")
+    print(f"kept locally: {len(kept_rows)} rows ({len(kept_rows) / len(test):.1%}), "
+          f"{skipped_calls} of {len(rows_per_story)} batched story calls skipped entirely")
+    if kept_rows:
+        print(f"agreement with the judge on the kept rows: {agreed / (4 * len(kept_rows)):.1%} of cells, "
+              f"{rows_agreed / len(kept_rows):.1%} of rows")
+    print(f"largest shift of a per-strategy ai-* average: {shift.to_numpy().max():.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Judge calls saved and agreement of the surrogate judge.")
+    parser.add_argument("--train-stories", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+    main(args.train_stories, args.workers)
@@ -0,0 +1,179 @@
+import threading
+from collections import defaultdict
+
+from config import model_configs, token_budget
+from rate_limiter import estimate_tokens
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+def max_output_tokens(strategy_name, config_name):
+    config_limit = model_configs[config_name].get("max_output_tokens")
+    strategy_limit = token_budget["strategy_max_output_tokens"].get(strategy_name)
+    limits = [limit for limit in (config_limit, strategy_limit) if limit]
+    return min(limits) if limits else None
+
+
+def estimate_cost(model_name, prompt_tokens, completion_tokens):
+    prices = token_budget["prices"].get(model_name)
+    if prices is None:
+        return None
+    return ((prompt_tokens or 0) * prices["prompt"] + (completion_tokens or 0) * prices["completion"]) / 1e6
+
+
+class TokenBudget:
+    """
+    enforces the per-run and per-sweep token caps. every call reserves its worst case (prompt
+    estimate + max_output_tokens) before it is sent and is settled with the real usage afterwards,
+    so concurrent calls can never push the totals past a cap. calls answered from the response
+    cache send nothing and are only counted.
+    """
+
+    def __init__(self, max_tokens_per_run=None, max_tokens_per_sweep=None):
+        self.max_tokens_per_run = max_tokens_per_run
+        self.max_tokens_per_sweep = max_tokens_per_sweep
+        self._lock = threading.Lock()
+
+        self.sweep_used = 0
+        self.run_used = defaultdict(int)
+        self.by_strategy = defaultdict(lambda: {"calls": 0, "projected": 0, "actual": 0, "cost": 0.0})
+        self.cached = {"calls": 0, "tokens": 0}
+
+    @staticmethod
+    def project(prompt, strategy_name, config_name):
+        return estimate_tokens(prompt) + (max_output_tokens(strategy_name, config_name) or 0)
+
+    def reserve(self, run_id, strategy_name, projected):
+        with self._lock:
+            if self.max_tokens_per_sweep is not None and self.sweep_used + projected > self.max_tokens_per_sweep:
+                raise BudgetExceeded(f"sweep token budget of {self.max_tokens_per_sweep} would be exceeded")
+            if self.max_tokens_per_run is not None and self.run_used[run_id] + projected > self.max_tokens_per_run:
+                raise BudgetExceeded(f"token budget of {self.max_tokens_per_run} for {run_id} would be exceeded")
+            self.sweep_used += projected
+            self.run_used[run_id] += projected
+
+    def release(self, run_id, projected):
+        # hands back a reservation whose call was never sent
+        with self._lock:
+            self.sweep_used -= projected
+            self.run_used[run_id] -= projected
+
+    def settle(self, run_id, strategy_name, config_name, projected, token_usage):
+        # swap the reservation for the real usage; a failed call without usage frees it entirely
+        token_usage = token_usage or {}
+        actual = token_usage.get("total_tokens") or 0
+        cost = estimate_cost(model_configs[config_name]["model_name"],
+                             token_usage.get("prompt_tokens"), token_usage.get("completion_tokens"))
+        with self._lock:
+            self.sweep_used += actual - projected
+            self.run_used[run_id] += actual - projected
+            stats = self.by_strategy[strategy_name]
+            stats["calls"] += 1
+            stats["projected"] += projected
+            stats["actual"] += actual
+            stats["cost"] += cost or 0.0
+        return cost
+
+    def settle_cached(self, run_id, projected, token_usage):
+        # a response cache hit costs nothing: hand back the reservation, if one was made, and count the replay
+        if projected is not None:
+            self.release(run_id, projected)
+        with self._lock:
+            self.cached["calls"] += 1
+            self.cached["tokens"] += (token_usage or {}).get("total_tokens") or 0
+
+    def report(self):
+        lines = [f"{'Strategy':20s} {'calls':>6s} {'projected':>10s} {'actual':>10s} {'cost ($)':>9s}"]
+        for strategy_name, stats in self.by_strategy.items():
+            lines.append(f"{strategy_name:20s} {stats['calls']:6d} {stats['projected']:10d} "
+                         f"{stats['actual']:10d} {stats['cost']:9.4f}")
+        if self.cached["calls"]:
+            lines.append(f"response cache: {self.cached['calls']} calls replayed {self.cached['tokens']} tokens, "
+                         f"not charged")
+        lines.append(f"sweep total: {self.sweep_used} tokens used of {self.max_tokens_per_sweep}")
+        return "\n".join(lines)
+
+
+class QueueTokenBudget(TokenBudget):
+    """
+    TokenBudget for workers sharing a work queue (see sharded_sweep.py): the per-run and per-sweep
+    totals are also kept in the queue database, so the caps hold across every worker process
+    instead of per process. a worker that dies mid-call leaves its reservation counted, which
+    errs on the side of the cap.
+    """
+
+    def __init__(self, queue, max_tokens_per_run=None, max_tokens_per_sweep=None):
+        super().__init__(max_tokens_per_run, max_tokens_per_sweep)
+        self.queue = queue
+
+    @staticmethod
+    def _counters(run_id, tokens):
+        return {"sweep": tokens, f"run/{run_id}": tokens}
+
+    def reserve(self, run_id, strategy_name, projected):
+        exceeded = self.queue.add_tokens(self._counters(run_id, projected),
+                                         {"sweep": self.max_tokens_per_sweep, f"run/{run_id}": self.max_tokens_per_run})
+        if exceeded == "sweep":
+            raise BudgetExceeded(f"sweep token budget of {self.max_tokens_per_sweep} would be exceeded")
+        if exceeded is not None:
+            raise BudgetExceeded(f"token budget of {self.max_tokens_per_run} for {run_id} would be exceeded")
+        # this worker's share, always within the shared totals checked above
+        super().reserve(run_id, strategy_name, projected)
+
+    def release(self, run_id, projected):
+        super().release(run_id, projected)
+        self.queue.add_tokens(self._counters(run_id, -projected))
+
+    def settle(self, run_id, strategy_name, config_name, projected, token_usage):
+        cost = super().settle(run_id, strategy_name, config_name, projected, token_usage)
+        actual = (token_usage or {}).get("total_tokens") or 0
+        self.queue.add_tokens(self._counters(run_id, actual - projected))
+        return cost
+
+    def report(self):
+        return (f"{super().report()}\n"
+                f"all workers: {self.queue.tokens('sweep')} tokens used of {self.max_tokens_per_sweep}")
+
+
+def project_sweep(stories, prompt_strategies, config_names=None):
+    """
+    upper-bound projection before a sweep: prompt estimate + max_output_tokens for every cell.
+    returns {strategy: {"prompt": tokens, "max_completion": tokens, "max_cost": usd}}.
+    """
+    projection = {}
+    for strategy_name, strategy_func in prompt_strategies.items():
+        totals = {"prompt": 0, "max_completion": 0, "max_cost": 0.0}
+        for story_data in stories.values():
+            prompt_tokens = estimate_tokens(strategy_func(story_data))
+            for config_name in config_names or model_configs:
+                completion_tokens = max_output_tokens(strategy_name, config_name) or 0
+                totals["prompt"] += prompt_tokens
+                totals["max_completion"] += completion_tokens
+                totals["max_cost"] += estimate_cost(model_configs[config_name]["model_name"],
+                                                    prompt_tokens, completion_tokens) or 0.0
+        projection[strategy_name] = totals
+    return projection
+
+
+def format_projection(projection):
+    lines = [f"{'Strategy':20s} {'prompt':>10s} {'max completion':>15s} {'max cost ($)':>13s}"]
+    for strategy_name, totals in projection.items():
+        lines.append(f"{strategy_name:20s} {totals['prompt']:10d} {totals['max_completion']:15d} "
+                     f"{totals['max_cost']:13.4f}")
+    total = sum(totals["prompt"] + totals["max_completion"] for totals in projection.values())
+    lines.append(f"projected upper bound: {total} tokens")
+    return "\n".join(lines)
+
+
+_shared_budget = None
+_shared_lock = threading.Lock()
+
+
+def get_token_budget():
+    global _shared_budget
+    with _shared_lock:
+        if _shared_budget is None:
+            _shared_budget = TokenBudget(token_budget["max_tokens_per_run"], token_budget["max_tokens_per_sweep"])
+        return _shared_budget
@@ -0,0 +1,205 @@
+import argparse
+import csv
+import glob
+import os
+import runpy
+import sys
+
+from config import judge_batch_size, max_concurrent_requests, model_configs, prompt_strategies
+
+RESULTS_DIR = "prompt_engineering_results"
+STORE_DIR = "results_store"
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+
+
+def parse_story_range(spec, last):
+    """
+    "1-20,40,200-" -> [1, ..., 20, 40, 200, ..., last]. story numbers are 1-based like the
+    row_story_N folders, an open end runs up to last.
+    """
+    stories = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, dash, end = part.partition("-")
+        start = int(start)
+        end = (int(end) if end else last) if dash else start
+        if start < 1 or end < start:
+            raise ValueError(f"invalid story range: {part}")
+        stories.update(range(start, end + 1))
+    return sorted(stories)
+
+
+def parse_names(spec, known, kind):
+    if spec is None:
+        return None
+    names = [name.strip() for name in spec.split(",") if name.strip()]
+    unknown = [name for name in names if name not in known]
+    if unknown:
+        raise ValueError(f"unknown {kind}: {', '.join(unknown)} (choose from {', '.join(known)})")
+    return names
+
+
+def stored_story_count(results_dir):
+    if not os.path.isdir(results_dir):
+        return 0
+    suffixes = [name[len("row_story_"):] for name in os.listdir(results_dir) if name.startswith("row_story_")]
+    return max((int(suffix) for suffix in suffixes if suffix.isdigit()), default=0)
+
+
+def generate(args, stories, strategies, configs):
+    from main import init_main, load_user_stories_from_csv, run_sweep
+
+    init_main()
+    all_stories = load_user_stories_from_csv(args.stories_file)
+    if stories is not None:
+        all_stories = {f"story_{n}": all_stories[f"story_{n}"] for n in stories if f"story_{n}" in all_stories}
+    run_sweep(all_stories, args.workers or max_concurrent_requests, strategies, configs, args.results_dir,
+              args.stories_per_call)
+
+
+def judge(args, stories, strategies, configs):
+    from ai_metrics_evaluation import process_all_rows
+
+    process_all_rows(stories, args.results_dir, strategies, configs, workers=args.workers or max_concurrent_requests,
+                     batch_size=args.batch_size or judge_batch_size, use_surrogate=args.surrogate or None)
+
+
+def rescore(args, stories, strategies, configs):
+    from rescore import rescore_all
+
+    rescore_all(args.results_dir, args.workers, stories, strategies, configs)
+
+
+def aggregate(args, stories, strategies, configs):
+    import ai_metrics
+    import process_results
+
+    # the columnar store is a snapshot of the default results tree only
+    store_dir = STORE_DIR if args.results_dir == RESULTS_DIR else None
+    os.makedirs(args.output_dir, exist_ok=True)
+    process_results.main(stories, strategies, configs, args.workers, args.output_dir, args.results_dir, store_dir)
+    ai_metrics.main(stories, strategies, configs, args.workers, args.output_dir, args.results_dir, store_dir,
+                    args.judge_source)
+
+
+def queue(args, stories, strategies, configs):
+    from sharded_sweep import GENERATE, fill_generation, fill_judging, work_generation, work_judging
+    from work_queue import make_worker_id, open_work_queue
+
+    work_queue = open_work_queue(args.queue)
+    workers = args.workers or max_concurrent_requests
+    if args.action == "fill":
+        if args.stage == GENERATE:
+            from main import load_user_stories_from_csv
+
+            story_ids = list(load_user_stories_from_csv(args.stories_file))
+            if stories is not None:
+                story_ids = [f"story_{n}" for n in stories if f"story_{n}" in story_ids]
+            added = fill_generation(work_queue, story_ids, args.results_dir, strategies, configs)
+        else:
+            added = fill_judging(work_queue, args.results_dir, stories, strategies, configs)
+        print(f"Queued {added} {args.stage} tasks")
+    elif args.action == "work":
+        worker_id = args.worker_id or make_worker_id()
+        print(f"Worker {worker_id}")
+        if args.stage == GENERATE:
+            from main import init_main, load_user_stories_from_csv
+
+            init_main()
+            merged = work_generation(work_queue, load_user_stories_from_csv(args.stories_file), worker_id,
+                                     args.results_dir, workers)
+        else:
+            merged = work_judging(work_queue, worker_id, args.results_dir, workers, args.batch_size or judge_batch_size)
+        print(f"Merged {merged} stories")
+    print(work_queue.summary())
+
+
+def benchmark(args):
+    script = os.path.join(BENCHMARK_DIR, f"bench_{args.name}.py")
+    sys.argv = [script] + args.args
+    runpy.run_path(script, run_name="__main__")
+
+
+def build_parser():
+    benchmarks = sorted(os.path.basename(path)[len("bench_"):-len(".py")]
+                        for path in glob.glob(os.path.join(BENCHMARK_DIR, "bench_*.py")))
+
+    selection = argparse.ArgumentParser(add_help=False)
+    selection.add_argument("--stories", help='story numbers, e.g. "1-20,40,200-" (default: all)')
+    selection.add_argument("--strategies", help='comma separated strategy names (default: all)')
+    selection.add_argument("--configs", help='comma separated config names (default: all)')
+    selection.add_argument("--workers", type=int, default=None,
+                           help="parallel calls or processes for the stage (default: the stage's own)")
+    selection.add_argument("--results-dir", default=RESULTS_DIR)
+
+    parser = argparse.ArgumentParser(description="Prompting techniques evaluation pipeline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = commands.add_parser("generate", parents=[selection], help="generate requirements")
+    generate_parser.add_argument("--stories-file", default="user_stories.csv")
+    generate_parser.add_argument("--stories-per-call", type=int, default=None,
+                                 help="stories packed into one call per cell (default: config story_packing)")
+    generate_parser.set_defaults(handler=generate)
+
+    judge_parser = commands.add_parser("judge", parents=[selection], help="fill in missing ai-* scores")
+    judge_parser.add_argument("--surrogate", action="store_true",
+                              help="score the rows the surrogate judge is confident about locally "
+                                   "(default: config surrogate_judge enabled)")
+    judge_parser.add_argument("--batch-size", type=int, default=None,
+                              help="outputs of one story scored per judge call (default: config judge_batch_size)")
+    judge_parser.set_defaults(handler=judge)
+    commands.add_parser("rescore", parents=[selection],
+                        help="recompute the heuristic metrics of stored outputs").set_defaults(handler=rescore)
+
+    aggregate_parser = commands.add_parser("aggregate", parents=[selection],
+                                           help="write the averages and statistics csv files")
+    aggregate_parser.add_argument("--output-dir", default=".")
+    aggregate_parser.add_argument("--judge-source", choices=["llm", "surrogate"], default=None,
+                                  help="average only the ai-* scores of that judge (default: all rows)")
+    aggregate_parser.set_defaults(handler=aggregate)
+
+    queue_parser = commands.add_parser("queue", parents=[selection],
+                                       help="sweep with several worker processes sharing a work queue")
+    queue_parser.add_argument("action", choices=["fill", "work", "status"])
+    queue_parser.add_argument("--stage", choices=["generate", "judge"], default="generate")
+    queue_parser.add_argument("--queue", default=None, help="work queue database (default: config work_queue path)")
+    queue_parser.add_argument("--worker-id", default=None, help="shard name of this worker (default: host-pid-random)")
+    queue_parser.add_argument("--stories-file", default="user_stories.csv")
+    queue_parser.add_argument("--batch-size", type=int, default=None,
+                              help="judge stage: outputs of one story scored per judge call "
+                                   "(default: config judge_batch_size)")
+    queue_parser.set_defaults(handler=queue)
+
+    benchmark_parser = commands.add_parser("benchmark", help="run one of the benchmarks/ scripts")
+    benchmark_parser.add_argument("name", choices=benchmarks)
+    benchmark_parser.add_argument("args", nargs=argparse.REMAINDER, help="arguments passed to the benchmark")
+    benchmark_parser.set_defaults(handler=benchmark)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "benchmark":
+        args.handler(args)
+        return
+
+    try:
+        if args.command == "generate" or (args.command == "queue" and args.stage == "generate"):
+            with open(args.stories_file, newline='') as f:
+                last = sum(1 for _ in csv.DictReader(f))
+        else:
+            last = stored_story_count(args.results_dir)
+        stories = parse_story_range(args.stories, last) if args.stories else None
+        strategies = parse_names(args.strategies, list(prompt_strategies), "strategies")
+        configs = parse_names(args.configs, list(model_configs), "configs")
+    except ValueError as e:
+        parser.error(str(e))
+
+    args.handler(args, stories, strategies, configs)
+
+
+if __name__ == "__main__":
+    main()
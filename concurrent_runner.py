@@ -0,0 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from config import model_configs, prompt_strategies
+from prompt_templates import templates
+from main import RESULTS_DIR, evaluate_cell, make_run_dir, write_results
+from run_ledger import RunLedger, merged_cells, story_already_finished
+from story_packing import evaluate_packed
+
+
+def run_evaluations_concurrently(stories, max_workers=8, model=None, results_dir=RESULTS_DIR, budget=None,
+                                 prefix_cache=None, strategies=None, configs=None, stories_per_call=1):
+    """
+    runs the strategies x configs grid (all of prompt_strategies x model_configs by default) for
+    every story through one thread pool. at most max_workers model calls are in flight at once.
+    every finished cell is journaled to the story's ledger right away, cells already in the ledger
+    are skipped, and each story's csv files are written as soon as its last cell of the grid
+    finishes, with every journaled cell in the same layout as run_evaluation.
+    with stories_per_call > 1 the same cell of that many consecutive stories goes out as one
+    packed call (see story_packing.py).
+    """
+    strategies = strategies or list(prompt_strategies)
+    configs = configs or list(model_configs)
+    required_cells = {(strategy_name, config_name) for strategy_name in strategies for config_name in configs}
+    pending = {}
+    ledgers = {}
+    outputs = {}
+    packable = {}
+
+    def finish_story(story_id):
+        cells = pending.pop(story_id)
+        run_dir = ledgers[story_id].run_dir
+        all_results, token_summary = write_results(stories[story_id], cells, run_dir)
+        outputs[story_id] = (all_results, run_dir, token_summary)
+        print(f"\nEvaluation complete for story {story_id}.")
+        print(f"- Results saved to {run_dir}")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for story_id, story_data in stories.items():
+            run_dir = make_run_dir(story_id, results_dir)
+            if story_already_finished(run_dir, required_cells):
+                continue
+
+            ledgers[story_id] = RunLedger(run_dir)
+            pending[story_id] = merged_cells(run_dir)
+
+            for strategy_name in strategies:
+                # Generate the prompt (same for all configs)
+                prompt = templates[strategy_name].render(story_data)
+                for config_name in configs:
+                    if (strategy_name, config_name) in pending[story_id]:
+                        continue
+                    if stories_per_call > 1:
+                        packable.setdefault((strategy_name, config_name), []).append(story_id)
+                        continue
+                    future = executor.submit(evaluate_cell, prompt, strategy_name, config_name, model,
+                                             budget=budget, run_id=story_id, prefix_cache=prefix_cache)
+                    futures[future] = (story_id, strategy_name, config_name)
+
+        # packed calls go out group by group, so the first stories still finish first
+        batches = [(start, key, story_ids[start:start + stories_per_call])
+                   for key, story_ids in packable.items() for start in range(0, len(story_ids), stories_per_call)]
+        for _, (strategy_name, config_name), group in sorted(batches, key=lambda batch: batch[0]):
+            future = executor.submit(evaluate_packed, {story_id: stories[story_id] for story_id in group},
+                                     strategy_name, config_name, model, budget=budget, prefix_cache=prefix_cache)
+            futures[future] = (None, strategy_name, config_name)
+        total_cells = sum(len(story_ids) for story_ids in packable.values()) + len(futures) - len(batches)
+
+        skipped = len(stories) - len(pending)
+        resumed = sum(len(cells) for cells in pending.values())
+        print(f"Skipping {skipped} finished stories and {resumed} journaled cells")
+
+        for story_id in [story_id for story_id, cells in pending.items() if required_cells <= cells.keys()]:
+            finish_story(story_id)
+
+        from tqdm import tqdm
+
+        progress = tqdm(total=total_cells, desc="Generating requirements")
+        for future in as_completed(futures):
+            story_id, strategy_name, config_name = futures[future]
+            # a packed call returns the cells of all its stories
+            results = future.result() if story_id is None else {story_id: future.result()}
+            for story_id, cell in results.items():
+                progress.update(1)
+
+                ledgers[story_id].append(strategy_name, config_name, cell)
+                cells = pending[story_id]
+                cells[(strategy_name, config_name)] = cell
+                if required_cells <= cells.keys():
+                    finish_story(story_id)
+
+        progress.close()
+
+    return outputs
@@ -1,4 +1,6 @@
-from prompt_techniques import *
+from prompt_techniques import (chain_of_thought_prompt, contextual_prompt, few_shot_prompt, react_prompt,
+                               role_prompt, self_consistency_prompt, system_prompt, tree_of_thoughts_prompt,
+                               zero_shot_prompt)
 
 # define model configurations for testing
 model_configs = {
@@ -6,19 +8,22 @@ model_configs = {
         "model_name": "gemini-2.0-flash-001",
         "temperature": 0.2,
         "top_p": 0.95,
-        "top_k": 40
+        "top_k": 40,
+        "max_output_tokens": 2048
     },
     "default": {
         "model_name": "gemini-2.0-flash-001",
         "temperature": 0.7,
         "top_p": 0.95,
-        "top_k": 40
+        "top_k": 40,
+        "max_output_tokens": 2048
     },
     "creative": {
         "model_name": "gemini-2.0-flash-001",
         "temperature": 1.0,
         "top_p": 0.95,
-        "top_k": 40
+        "top_k": 40,
+        "max_output_tokens": 2048
     }
 }
 
@@ -32,4 +37,167 @@ prompt_strategies = {
     "Contextual": contextual_prompt,
     "Tree of Thoughts": tree_of_thoughts_prompt,
     "ReAct": react_prompt
-}
\ No newline at end of file
+}
+
+# maximum number of generate_content calls in flight at once across all stories
+max_concurrent_requests = 8
+
+# shared quota for every generator and judge call (see rate_limiter.py)
+rate_limits = {
+    "requests_per_minute": 200,
+    "tokens_per_minute": 1000000,
+    "max_retries": 6,
+    "base_delay": 1.0,
+    "max_delay": 60.0
+}
+
+# every model call gets deadline_seconds to answer before it is retried; with enabled, a call
+# still running past the given percentile of its observed latency gets a duplicate request and
+# the first answer wins (see hedging.py)
+hedging = {
+    "deadline_seconds": 180,
+    "enabled": False,
+    "percentile": 95,
+    "min_samples": 20,
+    "window": 500
+}
+
+# persistent cache of model responses keyed on prompt and generation settings (see response_cache.py)
+# set RESPONSE_CACHE_BYPASS=1 to force fresh calls without touching the cache
+response_cache = {
+    "path": "response_cache.sqlite",
+    "max_bytes": 512 * 1024 * 1024,
+    "enabled": True
+}
+
+# number of outputs of the same user story scored per judge call (1 = one call per output).
+# the recorded ai-* scores were judged one output per call and scores judged in batches are not
+# marked, so batching is for judging a whole results tree afresh, e.g. python cli.py judge --batch-size 27
+judge_batch_size = 1
+
+# the judge answers in schema-constrained json of about judge_tokens_per_item tokens per output;
+# an output whose score does not validate is asked again on its own at most judge_max_retries
+# times, then left missing rather than scored
+judge_tokens_per_item = 64
+judge_max_retries = 2
+
+# local surrogate of the judge, trained on the rows the llm judged under training_dir (default:
+# the results being judged). rows it is confident about skip the llm; the confidence cut-off is
+# the one where held-out rows agree with the judge on target_agreement of their cells, and
+# audit_share of the confident rows are judged anyway to track agreement (see surrogate_judge.py).
+# it predicts from the strategy and config among other features, so its scores lean towards the
+# averages being compared: off unless enabled here or with python cli.py judge --surrogate, and
+# python cli.py aggregate --judge-source llm leaves the rows it scored out
+surrogate_judge = {
+    "enabled": False,
+    "training_dir": None,
+    "target_agreement": 0.95,
+    "audit_share": 0.05,
+    "holdout_share": 0.2,
+    "min_training_rows": 500
+}
+
+# send the same strategy x config cell of stories_per_call stories as one request, answered in
+# delimited per-story blocks; a story whose block is missing or malformed is asked again on its
+# own. packed calls may answer up to max_output_tokens in total, and the Packed With column of
+# complete_results.csv names the other stories of a row's call. a packed sweep's quality is
+# compared with an unpacked one by python story_packing.py, which flags metrics that moved by
+# more than parity_tolerance (see story_packing.py)
+story_packing = {
+    "enabled": False,
+    "stories_per_call": 4,
+    "max_output_tokens": 8192,
+    "parity_tolerance": 0.05
+}
+
+# stream generate_content responses to record time to first token and chunk gaps
+stream_generation = True
+
+# stop streamed generations once the FR/NFR list is followed by a block of other text,
+# or once a strategy passes its completion token budget (see stop_policy.py).
+# off by default: replaying the recorded outputs (python benchmarks/bench_early_stop.py) cuts short
+# about a quarter of the Few-shot ones, one before its last requirement, which changes the stored
+# outputs and heuristic scores
+early_stop = {
+    "enabled": False,
+    "trailing_lines": 3,
+    "trailing_chars": 300,
+    # these prompts ask for several requirement sets with prose in between, so only the budget applies
+    "keep_trailing_text": ["Self-Consistency", "Tree of Thoughts"],
+    "strategy_token_budgets": {
+        "Self-Consistency": 2000,
+        "Tree of Thoughts": 2000,
+        "ReAct": 2000
+    }
+}
+
+# token and cost budgets enforced by the generation runners (see budget.py)
+# max_tokens_per_run caps one story's 27 calls, max_tokens_per_sweep caps a whole run of main.py, or
+# every worker sharing a work queue together (the totals are kept in the queue database);
+# calls are reserved at prompt estimate + max_output_tokens and settled with usage_metadata
+token_budget = {
+    "max_tokens_per_run": 100000,
+    "max_tokens_per_sweep": 8000000,
+    # optional per-strategy max_output_tokens, applied on top of the model_configs value
+    "strategy_max_output_tokens": {},
+    # USD per million tokens
+    "prices": {
+        "gemini-2.0-flash-001": {"prompt": 0.10, "completion": 0.40}
+    }
+}
+
+# offline forecast of a sweep before any call is made (see prompt_templates.py)
+# latency ~ overhead + completion tokens / decode rate, fitted on the recorded gemini-2.0-flash results
+prompt_forecast = {
+    "request_overhead_seconds": 0.9,
+    "completion_tokens_per_second": 180,
+    # mean completion tokens per strategy in the recorded results
+    "expected_completion_tokens": {
+        "Zero-shot": 346,
+        "Few-shot": 749,
+        "Chain-of-Thought": 424,
+        "Self-Consistency": 574,
+        "System Prompt": 581,
+        "Role Prompt": 628,
+        "Contextual": 501,
+        "Tree of Thoughts": 367,
+        "ReAct": 269
+    }
+}
+
+# reuse the static preamble of each prompt (the text before the first story field) through context caching
+# vertex only caches contents of at least min_prefix_tokens, shorter preambles are sent in full (see prefix_cache.py)
+prefix_cache = {
+    "enabled": True,
+    "min_prefix_tokens": 32768,
+    "ttl_seconds": 3600
+}
+
+# where generate_content calls go: "vertex", or "simulated" to load test offline (see backends.py)
+# the MODEL_BACKEND environment variable overrides the name
+model_backend = {
+    "name": "vertex",
+    "simulated": {
+        "seed": 0,
+        "median_latency": 0.9,
+        "latency_sigma": 0.4,
+        "completion_tokens_per_second": 180,
+        "completion_tokens_mean": 500,
+        "completion_tokens_sd": 150,
+        "error_rate": 0.01,
+        "malformed_rate": 0.02,
+        # multiplies every simulated sleep, e.g. 0.01 runs a full sweep a hundred times faster
+        "time_scale": 1.0,
+        "min_prefix_tokens": 0
+    }
+}
+
+# shared task queue for sweeps spread over several worker processes or hosts (see work_queue.py)
+# journal_mode "WAL" is faster when every worker runs on one host, but does not work over a network filesystem
+work_queue = {
+    "path": "work_queue.sqlite",
+    "lease_seconds": 120,
+    "heartbeat_seconds": 30,
+    "max_attempts": 5,
+    "journal_mode": "DELETE"
+}
@@ -1,10 +1,125 @@
 import re
+
+SENTENCE_SPLIT_PATTERN = re.compile(r'[.!?]+')
+
+specificity_terms = {
+    'high_value': [
+        'exactly', 'precisely', 'specifically', 'equal to',
+        'must be', 'within', 'between', 'no more than', 'no less than'
+    ],
+    'medium_value': [
+        'at least', 'at most', 'maximum', 'minimum', 'less than',
+        'greater than', 'up to', 'from', 'to', 'range'
+    ],
+    'low_value': [
+        'during', 'if', 'unless', 'when', 'while', 'only',
+        'about', 'approximately', 'around', 'estimated'
+    ]
+}
+
+measurability_patterns = [
+    r'\d+\s*(?:second|minute|hour|day|percent|%)',
+    r'\d+\s*(?:kb|mb|gb|tb|byte|bytes)',
+    r'\d+\s*(?:kg|g|m|cm|km|meter|meters)',
+    r'\d+\s*(?:hz|mhz|ghz)',
+    r'(?:response time|latency)\s*(?:of|under|less than)?\s*\d+',
+    r'(?:accuracy|precision|error rate)\s*(?:of|at)?\s*\d+(?:\.\d+)?\s*%',
+    r'(?:availability|uptime)\s*(?:of|at)?\s*\d+(?:\.\d+)?\s*%',
+    r'(?:capacity|throughput|bandwidth)\s*(?:of|at)?\s*\d+'
+]
+
+testability_terms = {
+    'strong_verbs': [
+        'validate', 'verify', 'test', 'measure', 'confirm',
+        'demonstrate', 'check', 'assert', 'prove', 'audit'
+    ],
+    'action_verbs': [
+        'display', 'calculate', 'store', 'retrieve', 'send',
+        'receive', 'generate', 'create', 'update', 'process',
+        'execute', 'run', 'perform', 'log', 'monitor'
+    ]
+}
+
+
+def _compile_term_pattern(term_groups):
+    """
+    compiles every term into one zero-width alternation so a single findall reports each
+    whole-word term found in a sentence, even where matches overlap (e.g. 'up to' and 'to').
+    """
+    term_to_group = {}
+    for group, terms in term_groups.items():
+        for term in terms:
+            term_to_group[term] = group
+
+    # a term that is a whole-word prefix of another could hide it at the same position
+    for term in term_to_group:
+        for other in term_to_group:
+            if other != term and other.startswith(term) and not re.match(r'\w', other[len(term)]):
+                raise ValueError(f"term '{term}' is a word prefix of '{other}'")
+
+    alternatives = sorted(term_to_group, key=len, reverse=True)
+    pattern = re.compile(r'\b(?=(' + '|'.join(re.escape(term) for term in alternatives) + r')\b)')
+    return pattern, term_to_group
+
+
+TERM_PATTERN, TERM_GROUPS = _compile_term_pattern({**specificity_terms, **testability_terms})
+
+
+def _compile_measurability_patterns(patterns):
+    """
+    compiles the measurability patterns into as few searches as possible. patterns of the form
+    \\d+\\s*(?:units) share a prefix and collapse into one alternation; patterns that open with a
+    (?:keyword|...) group only run when one of those keywords is in the sentence.
+    """
+    units = []
+    keyword_patterns = []
+    for pattern in patterns:
+        unit_match = re.fullmatch(r'\\d\+\\s\*\(\?:([^()]*)\)', pattern)
+        keyword_match = re.match(r'\(\?:([^()]*)\)', pattern)
+        if unit_match:
+            units.extend(unit_match.group(1).split('|'))
+        elif keyword_match and all(re.escape(k) == k for k in keyword_match.group(1).split('|')):
+            keyword_patterns.append((tuple(keyword_match.group(1).split('|')), re.compile(pattern)))
+        else:
+            keyword_patterns.append(((), re.compile(pattern)))
+
+    unit_pattern = re.compile(r'\d+\s*(?:' + '|'.join(units) + ')') if units else None
+    return unit_pattern, keyword_patterns
+
+
+UNIT_PATTERN, KEYWORD_PATTERNS = _compile_measurability_patterns(measurability_patterns)
+
+
+def is_measurable(sentence):
+    if UNIT_PATTERN is not None and UNIT_PATTERN.search(sentence):
+        return True
+    for keywords, pattern in KEYWORD_PATTERNS:
+        if keywords and not any(keyword in sentence for keyword in keywords):
+            continue
+        if pattern.search(sentence):
+            return True
+    return False
+
+
+FR_PATTERN = re.compile(r'FR-\d+:', re.IGNORECASE)
+NFR_PATTERN = re.compile(r'NFR-\d+:', re.IGNORECASE)
+
+
+# helper function to extract requirements counts using regex
+def count_requirements(text):
+    # pattern for FR-n: style requirements
+    fr_matches = FR_PATTERN.findall(text)
+    nfr_matches = NFR_PATTERN.findall(text)
+
+    return len(fr_matches), len(nfr_matches)
+
+
 def evaluate_requirements_quality(text):
     """
     evaluates the quality of requirements based on specificity, measurability, and testability.
     """
     text_lower = text.lower()
-    sentences = re.split(r'[.!?]+', text_lower)
+    sentences = SENTENCE_SPLIT_PATTERN.split(text_lower)
     sentences = [s.strip() for s in sentences if s.strip()]
 
     # empty text handling
@@ -15,80 +130,30 @@ def evaluate_requirements_quality(text):
             "testability_score": 1
         }
 
-    specificity_terms = {
-        'high_value': [
-            'exactly', 'precisely', 'specifically', 'equal to',
-            'must be', 'within', 'between', 'no more than', 'no less than'
-        ],
-        'medium_value': [
-            'at least', 'at most', 'maximum', 'minimum', 'less than',
-            'greater than', 'up to', 'from', 'to', 'range'
-        ],
-        'low_value': [
-            'during', 'if', 'unless', 'when', 'while', 'only',
-            'about', 'approximately', 'around', 'estimated'
-        ]
-    }
-
-    # count sentences with specificity terms, with weighted values
     specificity_sentence_count = 0
+    measurable_sentence_count = 0
+    testable_sentence_count = 0
+
+    # one scan per sentence finds every term; each distinct term counts once per sentence
     for sentence in sentences:
-        high_matches = sum(
-            1 for term in specificity_terms['high_value'] if re.search(r'\b{}\b'.format(re.escape(term)), sentence))
-        medium_matches = sum(
-            1 for term in specificity_terms['medium_value'] if re.search(r'\b{}\b'.format(re.escape(term)), sentence))
-        low_matches = sum(
-            1 for term in specificity_terms['low_value'] if re.search(r'\b{}\b'.format(re.escape(term)), sentence))
+        group_counts = dict.fromkeys(TERM_GROUPS.values(), 0)
+        for term in set(TERM_PATTERN.findall(sentence)):
+            group_counts[TERM_GROUPS[term]] += 1
 
         # weight: high=1.0, medium=0.6, low=0.3
         specificity_sentence_count += (
-                high_matches * 1.0 +
-                medium_matches * 0.6 +
-                low_matches * 0.3
+                group_counts['high_value'] * 1.0 +
+                group_counts['medium_value'] * 0.6 +
+                group_counts['low_value'] * 0.3
         )
 
-    measurability_patterns = [
-        r'\d+\s*(?:second|minute|hour|day|percent|%)',
-        r'\d+\s*(?:kb|mb|gb|tb|byte|bytes)',
-        r'\d+\s*(?:kg|g|m|cm|km|meter|meters)',
-        r'\d+\s*(?:hz|mhz|ghz)',
-        r'(?:response time|latency)\s*(?:of|under|less than)?\s*\d+',
-        r'(?:accuracy|precision|error rate)\s*(?:of|at)?\s*\d+(?:\.\d+)?\s*%',
-        r'(?:availability|uptime)\s*(?:of|at)?\s*\d+(?:\.\d+)?\s*%',
-        r'(?:capacity|throughput|bandwidth)\s*(?:of|at)?\s*\d+'
-    ]
-
-    measurable_sentence_count = 0
-    for sentence in sentences:
-        for pattern in measurability_patterns:
-            if re.search(pattern, sentence):
-                measurable_sentence_count += 1
-                break
-
-
-    testability_terms = {
-        'strong_verbs': [
-            'validate', 'verify', 'test', 'measure', 'confirm',
-            'demonstrate', 'check', 'assert', 'prove', 'audit'
-        ],
-        'action_verbs': [
-            'display', 'calculate', 'store', 'retrieve', 'send',
-            'receive', 'generate', 'create', 'update', 'process',
-            'execute', 'run', 'perform', 'log', 'monitor'
-        ]
-    }
-
-    testable_sentence_count = 0
-    for sentence in sentences:
-        strong_matches = sum(
-            1 for term in testability_terms['strong_verbs'] if re.search(r'\b{}\b'.format(re.escape(term)), sentence))
-        action_matches = sum(
-            1 for term in testability_terms['action_verbs'] if re.search(r'\b{}\b'.format(re.escape(term)), sentence))
+        if is_measurable(sentence):
+            measurable_sentence_count += 1
 
         # weight strong verbs higher
-        if strong_matches > 0:
+        if group_counts['strong_verbs'] > 0:
             testable_sentence_count += 1.0
-        elif action_matches > 0:
+        elif group_counts['action_verbs'] > 0:
             testable_sentence_count += 0.7
 
     # calculate percentages of sentences with each quality
@@ -0,0 +1,208 @@
+import json
+import random
+import re
+import threading
+import time
+
+from prefix_cache import PrefixCacheBackend
+
+
+FAKE_REQUIREMENTS = """FR-1: The system shall display the requested information within 2 seconds.
+FR-2: The system shall validate all user input before processing it.
+FR-3: The system shall store every transaction in the audit log.
+NFR-1: The system shall respond within 3 seconds for 95% of requests.
+NFR-2: The system shall maintain 99.9% availability per month.
+"""
+
+
+class FakeUsageMetadata:
+    def __init__(self, prompt_token_count, candidates_token_count, cached_content_token_count=0):
+        self.prompt_token_count = prompt_token_count
+        self.cached_content_token_count = cached_content_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class FakeResponse:
+    def __init__(self, text, prompt_token_count, candidates_token_count):
+        self.text = text
+        self.usage_metadata = FakeUsageMetadata(prompt_token_count, candidates_token_count)
+
+
+class FakeGenerativeModel:
+    """
+    local stand-in for GenerativeModel that sleeps for a random latency instead of calling the api.
+    """
+
+    def __init__(self, min_latency=0.05, max_latency=0.5, seed=None, text=FAKE_REQUIREMENTS):
+        self.min_latency = min_latency
+        self.max_latency = max_latency
+        self.text = text
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        with self._lock:
+            latency = self._rng.uniform(self.min_latency, self.max_latency)
+
+        # rough 4 characters per token estimate
+        response = FakeResponse(self.text, len(prompt) // 4, len(self.text) // 4)
+        if stream:
+            return self._stream(response, latency)
+        time.sleep(latency)
+        return response
+
+    def _stream(self, response, latency, chunk_lines=2):
+        # the first chunk takes half the latency, the rest is spread over the remaining chunks
+        lines = response.text.splitlines(keepends=True)
+        chunks = ["".join(lines[i:i + chunk_lines]) for i in range(0, len(lines), chunk_lines)] or [""]
+        time.sleep(latency / 2)
+        for i, text in enumerate(chunks):
+            if i:
+                time.sleep(latency / 2 / max(1, len(chunks) - 1))
+            last = i == len(chunks) - 1
+            chunk = FakeResponse(text, 0, 0)
+            chunk.usage_metadata = response.usage_metadata if last else None
+            yield chunk
+
+
+SIMULATED_SENTENCES = [
+    "The system shall display the requested information within {n} seconds.",
+    "The system shall validate all user input before processing it.",
+    "The system shall store every transaction in the audit log for {n} days.",
+    "The system shall notify the user by email within {n} minutes of a status change.",
+    "The system shall allow the user to export the results in CSV format.",
+    "The system shall respond within {n} seconds for 95% of requests.",
+    "The system shall maintain 99.9% availability per month.",
+    "The system shall support at least {n}00 concurrent users."
+]
+JUDGE_SET_PATTERN = re.compile(r'REQUIREMENTS SET "([^"]+)"')
+PACKED_STORY_PATTERN = re.compile(r"^--- STORY (\S+) ---$", re.MULTILINE)
+
+
+class SimulatedAPIError(Exception):
+    def __init__(self, message, code=429):
+        super().__init__(message)
+        self.code = code
+
+
+class SimulatedGenerativeModel(FakeGenerativeModel):
+    """
+    deterministic stand-in with production-like behaviour: lognormal latency plus decode time,
+    configurable rates of errors and of cut-off json answers, and outputs whose length and content follow from the prompt, so
+    the same prompt always gets the same text and token counts. judge prompts get json scores,
+    packed prompts one delimited block per story, cut off as a whole at max_output_tokens.
+    time_scale shrinks every sleep so full-size sweeps can be load tested in seconds.
+    """
+
+    def __init__(self, model_name, generation_config=None, seed=0, median_latency=0.9, latency_sigma=0.4,
+                 completion_tokens_per_second=180, completion_tokens_mean=500, completion_tokens_sd=150,
+                 error_rate=0.0, malformed_rate=0.0, time_scale=1.0):
+        super().__init__(seed=seed)
+        self.model_name = model_name
+        self.generation_config = generation_config or {}
+        self.seed = seed
+        self.median_latency = median_latency
+        self.latency_sigma = latency_sigma
+        self.completion_tokens_per_second = completion_tokens_per_second
+        self.completion_tokens_mean = completion_tokens_mean
+        self.completion_tokens_sd = completion_tokens_sd
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.time_scale = time_scale
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        generation_config = generation_config or self.generation_config
+        # latency and failures vary between attempts, the answer itself only depends on the request
+        with self._lock:
+            failed = self._rng.random() < self.error_rate
+            malformed = self._rng.random() < self.malformed_rate
+            overhead = self.median_latency * self._rng.lognormvariate(0, self.latency_sigma)
+        if failed:
+            time.sleep(overhead * self.time_scale / 2)
+            raise SimulatedAPIError("429 Resource exhausted (simulated)")
+
+        rng = random.Random(f"{self.seed}:{self.model_name}:{sorted(generation_config.items())}:{prompt}")
+        text = self._answer(prompt, generation_config, rng)
+        if malformed and text.startswith(("[", "{", "=== STORY")):
+            # a json or packed answer cut off halfway, as a response that fails to parse
+            text = text[:len(text) // 2]
+        completion_tokens = max(1, len(text) // 4)
+        latency = (overhead + completion_tokens / self.completion_tokens_per_second) * self.time_scale
+
+        response = FakeResponse(text, len(prompt) // 4, completion_tokens)
+        if stream:
+            return self._stream(response, latency)
+        time.sleep(latency)
+        return response
+
+    def _answer(self, prompt, generation_config, rng):
+        item_ids = JUDGE_SET_PATTERN.findall(prompt)
+        if item_ids:
+            return json.dumps([dict(id=item_id, **self._scores(rng)) for item_id in item_ids])
+        if "JSON object" in prompt:
+            return json.dumps(self._scores(rng))
+
+        max_tokens = generation_config.get("max_output_tokens")
+        story_ids = PACKED_STORY_PATTERN.findall(prompt)
+        if story_ids:
+            text = "".join(f"=== STORY {story_id} ===\n{self._requirements(rng)}=== END STORY {story_id} ===\n"
+                           for story_id in story_ids)
+            return text[:4 * max_tokens] if max_tokens else text
+        return self._requirements(rng, max_tokens)
+
+    def _requirements(self, rng, max_tokens=None):
+        target_chars = 4 * max(20, int(rng.gauss(self.completion_tokens_mean, self.completion_tokens_sd)))
+        if max_tokens:
+            target_chars = min(target_chars, 4 * max_tokens)
+        lines, fr, nfr = [], 0, 0
+        while sum(len(line) + 1 for line in lines) < target_chars:
+            if rng.random() < 0.65:
+                fr += 1
+                label = f"FR-{fr}"
+            else:
+                nfr += 1
+                label = f"NFR-{nfr}"
+            lines.append(f"{label}: " + rng.choice(SIMULATED_SENTENCES).format(n=rng.randint(1, 9)))
+        return "\n".join(lines)[:target_chars] + "\n"
+
+    @staticmethod
+    def _scores(rng):
+        return {"specificity": rng.randint(2, 5), "measurability": rng.randint(2, 5),
+                "accuracy": rng.randint(3, 5), "completeness": rng.randint(2, 5)}
+
+
+class FakePrefixCacheBackend(PrefixCacheBackend):
+    """
+    local stand-in for context caching: the prefix is kept in memory and prepended on every call,
+    and usage_metadata reports it as cached content.
+    """
+
+    def create(self, model_name, prefix, ttl_seconds):
+        return prefix
+
+    def bind(self, handle, model_name, model):
+        return FakeCachedModel(model, handle)
+
+
+class FakeCachedModel:
+    def __init__(self, model, prefix):
+        self.model = model
+        self.prefix = prefix
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        response = self.model.generate_content(self.prefix + prompt, generation_config=generation_config,
+                                               stream=stream)
+        if stream:
+            return self._mark_stream(response)
+        self._mark(response)
+        return response
+
+    def _mark(self, response):
+        if getattr(response, "usage_metadata", None) is not None:
+            response.usage_metadata.cached_content_token_count = len(self.prefix) // 4
+
+    def _mark_stream(self, chunks):
+        for chunk in chunks:
+            self._mark(chunk)
+            yield chunk
@@ -0,0 +1,205 @@
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+from config import hedging
+from rate_limiter import get_rate_limiter
+
+PERCENTILES = (50, 95, 99)
+
+
+class DeadlineExceeded(Exception):
+    # retried by the rate limiter like a gateway timeout
+    code = 504
+
+
+class CallCancelled(Exception):
+    # raised inside a streamed call whose answer is no longer wanted
+    pass
+
+
+def percentile(values, p):
+    # nearest-rank percentile of a non-empty list
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))]
+
+
+def response_tokens(response):
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None)
+
+
+class Hedger:
+    """
+    runs model calls with a deadline and, when enabled, hedges them: once a call has run longer
+    than the given percentile of the latencies seen for its key (after min_samples calls), a
+    duplicate request is sent if the rate limiter has spare capacity right now, and whichever
+    answers first wins. the other request is cancelled when it streams, otherwise left to finish
+    in the background; either way its tokens are counted as extra. calls that pass the deadline
+    raise DeadlineExceeded, which the rate limiter retries.
+    unhedged latency is how long the first request took (or ran until it was cancelled),
+    effective latency is how long the caller waited.
+    """
+
+    def __init__(self, deadline_seconds=None, enabled=False, percentile=95, min_samples=20, window=500):
+        self.deadline_seconds = deadline_seconds
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window = window
+        self.unhedged = {}
+        self.effective = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "hedges": 0, "hedge_wins": 0, "deadlines": 0, "extra_tokens": 0,
+                      "tokens": 0}
+
+    def _record(self, samples, key, latency):
+        with self._lock:
+            samples.setdefault(key, deque(maxlen=self.window)).append(latency)
+
+    def hedge_delay(self, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            samples = list(self.unhedged.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return percentile(samples, self.percentile)
+
+    @staticmethod
+    def _launch(fn, branches):
+        # a daemon thread per request, so a call stuck past its deadline never blocks the pool or exit
+        future = Future()
+        cancel = threading.Event()
+
+        def run():
+            try:
+                future.set_result(fn(cancel))
+            except BaseException as e:
+                future.set_exception(e)
+
+        branches[future] = cancel
+        threading.Thread(target=run, daemon=True).start()
+        return future
+
+    def _count_extra(self, future, estimated_tokens, reserved, response_of):
+        # a losing request still costs its tokens; when it was cancelled mid-stream only the prompt is known,
+        # and one that failed outright (e.g. a 429 or a dropped connection) costs nothing.
+        # reserved is what the limiter still holds for it: estimated_tokens, or 0 once its attempt was refunded
+        error = future.exception()
+        if error is None:
+            tokens = response_tokens(response_of(future.result()))
+            charged = tokens if tokens is not None else estimated_tokens
+        else:
+            charged = estimated_tokens if isinstance(error, CallCancelled) else 0
+        get_rate_limiter().record_usage(reserved, charged)
+        with self._lock:
+            self.stats["extra_tokens"] += charged
+
+    def call(self, key, fn, estimated_tokens=0, response_of=lambda result: result):
+        """
+        fn(cancel) makes one request and returns its result; a streaming fn should stop reading
+        and raise CallCancelled once cancel is set. response_of picks the response with the
+        usage metadata out of the result.
+        """
+        start = time.monotonic()
+        with self._lock:
+            self.stats["calls"] += 1
+        deadline = start + self.deadline_seconds if self.deadline_seconds else None
+        hedge_delay = self.hedge_delay(key)
+        hedge_at = start + hedge_delay if hedge_delay is not None else None
+
+        branches = {}
+        primary = self._launch(fn, branches)
+        primary_state = {"settled": False}
+
+        def record_primary(future):
+            # a request that failed outright says nothing about how long an answer takes
+            failed = future.done() and not isinstance(future.exception(), (type(None), CallCancelled))
+            with self._lock:
+                settled, primary_state["settled"] = primary_state["settled"], True
+            if not settled and not failed:
+                self._record(self.unhedged, key, time.monotonic() - start)
+
+        primary.add_done_callback(record_primary)
+        errors = []
+        while True:
+            wake = min((t for t in (deadline, hedge_at) if t is not None), default=None)
+            timeout = None if wake is None else max(0.0, wake - time.monotonic())
+            done, _ = wait(list(branches), timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                branches.pop(future)
+                if future.exception() is not None:
+                    errors.append(future.exception())
+                    continue
+
+                result = future.result()
+                self._record(self.effective, key, time.monotonic() - start)
+                tokens = response_tokens(response_of(result))
+                with self._lock:
+                    self.stats["tokens"] += tokens or 0
+                    if future is not primary:
+                        self.stats["hedge_wins"] += 1
+                for loser, cancel in branches.items():
+                    cancel.set()
+                    loser.add_done_callback(
+                        lambda f: self._count_extra(f, estimated_tokens, estimated_tokens, response_of))
+                return result
+
+            if not branches:
+                raise errors[0]
+
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                # the limiter refunds the primary's reservation when DeadlineExceeded fails the attempt,
+                # so whatever the abandoned requests end up costing is charged here
+                for future, cancel in branches.items():
+                    cancel.set()
+                    reserved = 0 if future is primary else estimated_tokens
+                    future.add_done_callback(
+                        lambda f, reserved=reserved: self._count_extra(f, estimated_tokens, reserved, response_of))
+                record_primary(primary)
+                self._record(self.effective, key, now - start)
+                with self._lock:
+                    self.stats["deadlines"] += 1
+                raise DeadlineExceeded(f"no response from {key} within {self.deadline_seconds}s")
+
+            if hedge_at is not None and now >= hedge_at:
+                hedge_at = None
+                if primary in branches and get_rate_limiter().try_acquire(estimated_tokens):
+                    self._launch(fn, branches)
+                    with self._lock:
+                        self.stats["hedges"] += 1
+
+    def latency_percentiles(self, samples):
+        with self._lock:
+            return {key: [percentile(list(values), p) for p in PERCENTILES] for key, values in samples.items()}
+
+    def report(self):
+        unhedged = self.latency_percentiles(self.unhedged)
+        effective = self.latency_percentiles(self.effective)
+        lines = [f"{'Call':40s} {'unhedged p50/p95/p99 (s)':>26s} {'effective p50/p95/p99 (s)':>26s}"]
+        for key in sorted(effective):
+            before = "/".join(f"{value:.2f}" for value in unhedged.get(key, ())) or "-"
+            after = "/".join(f"{value:.2f}" for value in effective[key])
+            lines.append(f"{key:40s} {before:>26s} {after:>26s}")
+        stats = self.stats
+        extra_share = stats["extra_tokens"] / stats["tokens"] if stats["tokens"] else 0.0
+        lines.append(f"{stats['calls']} calls, {stats['hedges']} hedged ({stats['hedge_wins']} won by the hedge), "
+                     f"{stats['deadlines']} past the {self.deadline_seconds}s deadline, "
+                     f"{stats['extra_tokens']} extra tokens ({extra_share:.1%} of the tokens used)")
+        return "\n".join(lines)
+
+
+_shared_hedger = None
+_shared_lock = threading.Lock()
+
+
+def get_hedger():
+    global _shared_hedger
+    with _shared_lock:
+        if _shared_hedger is None:
+            _shared_hedger = Hedger(**hedging)
+        return _shared_hedger
@@ -1,13 +1,24 @@
-from vertexai.preview.generative_models import GenerativeModel
-from vertexai import init
-from config import *
-from dotenv import load_dotenv
+from config import max_concurrent_requests, model_configs, prompt_strategies, story_packing, stream_generation
 import csv
+from functools import partial
 import time as process_time
-from tqdm import tqdm
-from evaluation import *
+from evaluation import count_requirements, evaluate_requirements_quality
+from budget import BudgetExceeded, format_projection, get_token_budget, max_output_tokens, project_sweep
+from prefix_cache import get_prefix_cache
+from prompt_templates import templates
+from stop_policy import make_stop_policy
+from streaming import STREAM_COLUMNS, consume_stream, stream_metrics
+from run_ledger import RunLedger, merged_cells, story_already_finished
+from backends import get_backend
+from hedging import get_hedger
+from model_pool import get_model, get_model_pool
+from response_cache import get_response_cache
+from rate_limiter import estimate_tokens, get_rate_limiter
 import os
 
+RESULTS_DIR = "prompt_engineering_results"
+
+
 def make_dir(path):
     os.makedirs(path, exist_ok=True)
 
@@ -20,34 +31,94 @@ def autolabel(ax, rects, fmt='{:.0f}', offset=3):
 
 
 def init_main():
-    load_dotenv()
+    backend = get_backend()
+    print(f"Using the {backend.name} model backend")
+    backend.init()
 
-    project_id = os.getenv("PROJECT_ID")
-    location = os.getenv("LOCATION")
+    # create base results directory
+    os.makedirs(RESULTS_DIR, exist_ok=True)
 
-    init(project=project_id, location=location)
-    model = GenerativeModel("gemini-2.0-flash-001")
+def make_generation_config(config, max_output_tokens=None):
+    generation_config = {
+        "temperature": config["temperature"],
+        "top_p": config["top_p"],
+        "top_k": config["top_k"]
+    }
+    max_output_tokens = max_output_tokens or config.get("max_output_tokens")
+    if max_output_tokens:
+        generation_config["max_output_tokens"] = max_output_tokens
+    return generation_config
+
+
+def cached_requirements(prompt_text, config_name="default", max_output_tokens=None):
+    # the generate_requirements result stored in the response cache for this prompt and config, or None
+    config = model_configs[config_name]
+    cache = get_response_cache()
+    cached = cache.get(cache.make_key(prompt_text, config["model_name"],
+                                      **make_generation_config(config, max_output_tokens)))
+    if cached is None:
+        return None
+    return {
+        "text": cached["text"],
+        "latency": cached["latency"] or 0,
+        "config": config_name,
+        "config_details": config,
+        "token_usage": cached["token_usage"],
+        "stream_metrics": stream_metrics(None, cached["latency"],
+                                         (cached["token_usage"] or {}).get("completion_tokens")),
+        "cached": True
+    }
 
-    # create base results directory
-    results_dir = "prompt_engineering_results"
-    os.makedirs(results_dir, exist_ok=True)
 
 # generate requirements with different model configurations
-def generate_requirements(prompt_text, config_name="default"):
+def generate_requirements(prompt_text, config_name="default", model=None, stream=False, stop_policy=None,
+                          max_output_tokens=None, strategy_name=None, prefix_cache=None, hedge_key=None,
+                          lookup_cache=True):
+    # stop_policy, when given, is a factory called once per streamed request (see stop_policy.py);
+    # lookup_cache=False when the caller already looked the call up with cached_requirements
+    config = model_configs[config_name]
     try:
-        config = model_configs[config_name]
-        model = GenerativeModel(config["model_name"])
-
-        generation_config = {
-            "temperature": config["temperature"],
-            "top_p": config["top_p"],
-            "top_k": config["top_k"]
-        }
-
-        start_time = process_time.time()
-        response = model.generate_content(prompt_text, generation_config=generation_config)
-        end_time = process_time.time()
-        latency = end_time - start_time
+        generation_config = make_generation_config(config, max_output_tokens)
+        if model is None:
+            model = get_model(config["model_name"], generation_config)
+            # an explicitly passed model is called as is unless a prefix cache is passed with it
+            prefix_cache = prefix_cache or get_prefix_cache()
+
+        cached = cached_requirements(prompt_text, config_name, max_output_tokens) if lookup_cache else None
+        if cached is not None:
+            return cached
+        cache = get_response_cache()
+        cache_key = cache.make_key(prompt_text, config["model_name"], **generation_config)
+
+        call_model_with, call_text = model, prompt_text
+        if prefix_cache is not None:
+            call_model_with, call_text = prefix_cache.prepare(strategy_name, config["model_name"], model, prompt_text)
+
+        limiter = get_rate_limiter()
+        hedger = get_hedger()
+        estimated_tokens = estimate_tokens(prompt_text)
+
+        def call_model():
+            # time only the attempt that succeeds, not the throttling or backoff around it
+            start_time = process_time.time()
+
+            def request(cancel):
+                # every request, retries and hedged duplicates included, gets a stop policy of its own,
+                # so no buffered text of a failed attempt leaks into the next; chunk times run from
+                # the start of the first request
+                if stream:
+                    return consume_stream(
+                        call_model_with.generate_content(call_text, generation_config=generation_config,
+                                                         stream=True),
+                        start_time, stop_policy() if stop_policy is not None else None, cancel)
+                return call_model_with.generate_content(call_text, generation_config=generation_config), None, False
+
+            # hedge_key keeps calls with their own latency profile (e.g. packed ones) apart
+            key = hedge_key or f"{config['model_name']}/{strategy_name or config_name}"
+            response, chunk_times, truncated = hedger.call(key, request, estimated_tokens, lambda result: result[0])
+            return response, process_time.time() - start_time, chunk_times, truncated
+
+        response, latency, chunk_times, truncated = limiter.call(call_model, estimated_tokens=estimated_tokens)
 
         response_text = response.text
 
@@ -58,21 +129,30 @@ def generate_requirements(prompt_text, config_name="default"):
             "total_tokens": None
         }
 
-        if hasattr(response, "usage_metadata"):
+        if getattr(response, "usage_metadata", None) is not None:
             token_usage = {
                 "prompt_tokens": response.usage_metadata.prompt_token_count,
                 "completion_tokens": response.usage_metadata.candidates_token_count,
-                "total_tokens": response.usage_metadata.total_token_count
+                "total_tokens": response.usage_metadata.total_token_count,
+                "cached_prompt_tokens": getattr(response.usage_metadata, "cached_content_token_count", None) or 0
             }
         else:
             print("⚠️ No usage metadata found. Cannot calculate actual token usage.")
+        limiter.record_usage(estimated_tokens, token_usage["total_tokens"])
+        if prefix_cache is not None:
+            prefix_cache.record(strategy_name, token_usage)
+        # a cut-short text depends on the stop policy, not just the key, so it is not cached
+        if not truncated:
+            cache.put(cache_key, response_text, token_usage, latency)
 
         return {
             "text": response_text,
             "latency": latency,
             "config": config_name,
             "config_details": config,
-            "token_usage": token_usage
+            "token_usage": token_usage,
+            "stream_metrics": stream_metrics(chunk_times, latency, token_usage["completion_tokens"]),
+            "truncated": truncated
         }
 
     except Exception as e:
@@ -82,248 +162,224 @@ def generate_requirements(prompt_text, config_name="default"):
             "config": config_name,
             "config_details": config,
             "error": str(e),
-            "token_usage": None
+            "token_usage": None,
+            "stream_metrics": None
         }
 
-# helper function to extract requirements counts using regex
-def count_requirements(text):
-    # pattern for FR-n: style requirements
-    fr_pattern = re.compile(r'FR-\d+:', re.IGNORECASE)
-    nfr_pattern = re.compile(r'NFR-\d+:', re.IGNORECASE)
-
-    fr_matches = fr_pattern.findall(text)
-    nfr_matches = nfr_pattern.findall(text)
+def evaluate_cell(prompt, strategy_name, config_name, model=None, stream=stream_generation, budget=None,
+                  run_id=None, prefix_cache=None):
+    # generate requirements with this config and score the output
+    estimated_cost = None
+    projected = None
+    # a response cache hit sends nothing, so it is neither reserved nor charged
+    result = cached_requirements(prompt, config_name, max_output_tokens(strategy_name, config_name))
+    if result is None and budget is not None:
+        projected = budget.project(prompt, strategy_name, config_name)
+        try:
+            budget.reserve(run_id, strategy_name, projected)
+        except BudgetExceeded as e:
+            # refused before sending, the cell stays unfinished in the ledger and is retried later
+            result = {"text": f"Error generating requirements: {str(e)}", "latency": 0, "error": str(e)}
+
+    if result is None:
+        stop_policy = partial(make_stop_policy, strategy_name) if stream else None
+        result = generate_requirements(prompt, config_name, model=model, stream=stream, stop_policy=stop_policy,
+                                       max_output_tokens=max_output_tokens(strategy_name, config_name),
+                                       strategy_name=strategy_name, prefix_cache=prefix_cache, lookup_cache=False)
+        if budget is not None:
+            estimated_cost = budget.settle(run_id, strategy_name, config_name, projected, result.get("token_usage"))
+    elif budget is not None and result.get("cached"):
+        budget.settle_cached(run_id, None, result.get("token_usage"))
+
+    return make_cell(prompt, config_name, result, estimated_cost)
+
+
+def make_cell(prompt, config_name, result, estimated_cost=None):
+    # scores one generate_requirements result into the cell dict journaled and written per story
+    output = result["text"]
+    token_usage = result.get("token_usage") or {}
+
+    fr_count, nfr_count = count_requirements(output)
+    quality_metrics = evaluate_requirements_quality(output)
+
+    return {
+        "prompt": prompt,
+        "output": output,
+        "prompt_length": len(prompt),
+        "output_length": len(output),
+        "fr_count": fr_count,
+        "nfr_count": nfr_count,
+        "latency": result["latency"],
+        "quality_metrics": quality_metrics,
+        "config_details": model_configs[config_name],
+        "token_usage": token_usage,
+        "stream_metrics": result.get("stream_metrics") or {},
+        "truncated": result.get("truncated", False),
+        "estimated_cost": estimated_cost,
+        "error": result.get("error")
+    }
 
-    return len(fr_matches), len(nfr_matches)
 
+def format_stream_metrics(metrics):
+    # empty cells when a metric was not measured (blocking calls have no ttft or chunk gaps)
+    keys = ["ttft", "mean_chunk_gap", "max_chunk_gap", "tokens_per_second"]
+    return [f"{metrics[key]:.3f}" if metrics.get(key) is not None else "" for key in keys]
 
-def run_evaluation(user_story, row_number):
-    results_dir = "prompt_engineering_results"
-    run_dir = os.path.join(results_dir, f"row_{row_number}")
 
-    if not os.path.exists(results_dir):
-        os.makedirs(results_dir)
-    os.makedirs(run_dir)
-
-    # For storing all results
+def write_results(user_story, cells, run_dir):
+    """
+    writes results_summary.csv and complete_results.csv for one story.
+    cells maps (strategy_name, config_name) to the dict returned by evaluate_cell,
+    rows are always written in prompt_strategies x model_configs order.
+    """
     all_results = {
         "user_story": user_story,
         "results": {}
     }
 
-    # For storing aggregate metrics
-    aggregated_metrics = {
-        "by_strategy": {},
-        "by_config": {},
-        "overall": {
-            "fr_count": [],
-            "nfr_count": [],
-            "specificity_score": [],
-            "testability_score": [],
-            "measurability_score": [],
-            "latency": [],
-            "prompt_tokens": [],
-            "completion_tokens": [],
-            "total_tokens": [],
-            "output_length": []
-        }
-    }
-
-    # CSV for quick comparison
-    csv_file = os.path.join(run_dir, "results_summary.csv")
-    with open(csv_file, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            "Strategy", "Config", "Prompt Length", "Response Length",
-            "FR Count", "NFR Count", "Specificity Score", "Testability Score",
-            "Measurability Score", "Latency (seconds)",
-            "Prompt Tokens ", "Completion Tokens ", "Total Tokens "
-        ])
-
-
-    # Loop through all prompt strategies and model configurations
-    total_runs = len(prompt_strategies) * len(model_configs)
-    progress = tqdm(total=total_runs, desc="Generating requirements")
-
     # Token tracking summaries
     total_tokens = 0
     token_usage_by_strategy = {}
     token_usage_by_config = {}
 
-    for strategy_name, strategy_func in prompt_strategies.items():
-        all_results["results"][strategy_name] = {}
-        token_usage_by_strategy[strategy_name] = {
-            "prompt_tokens": 0,
-            "completion_tokens": 0,
-            "total_tokens": 0
-        }
-
-        # Initialize strategy-level metrics aggregation
-        if strategy_name not in aggregated_metrics["by_strategy"]:
-            aggregated_metrics["by_strategy"][strategy_name] = {
-                "fr_count": [],
-                "nfr_count": [],
-                "specificity_score": [],
-                "testability_score": [],
-                "measurability_score": [],
-                "latency": [],
-                "prompt_tokens": [],
-                "completion_tokens": [],
-                "total_tokens": [],
-                "output_length": []
-            }
-
-        # Generate the prompt (same for all configs)
-        prompt = strategy_func(user_story)
+    csv_file = os.path.join(run_dir, "results_summary.csv")
+    complete_csv_file = os.path.join(run_dir, "complete_results.csv")
 
-        for config_name in model_configs:
-            if config_name not in token_usage_by_config:
-                token_usage_by_config[config_name] = {
-                    "prompt_tokens": 0,
-                    "completion_tokens": 0,
-                    "total_tokens": 0
-                }
-
-            # Initialize config-level metrics aggregation
-            if config_name not in aggregated_metrics["by_config"]:
-                aggregated_metrics["by_config"][config_name] = {
-                    "fr_count": [],
-                    "nfr_count": [],
-                    "specificity_score": [],
-                    "testability_score": [],
-                    "measurability_score": [],
-                    "latency": [],
-                    "prompt_tokens": [],
-                    "completion_tokens": [],
-                    "total_tokens": [],
-                    "output_length": []
-                }
-
-            # Generate requirements with this config
-            result = generate_requirements(prompt, config_name)
-            output = result["text"]
-            latency = result["latency"]
-            token_usage = result.get("token_usage", {})
-
-            # Update token tracking
-            prompt_tokens = token_usage.get("prompt_tokens", 0)
-            completion_tokens = token_usage.get("completion_tokens", 0)
-            total_run_tokens = token_usage.get("total_tokens", 0)
-
-            # Update token totals
-            total_tokens += total_run_tokens
-            token_usage_by_strategy[strategy_name]["prompt_tokens"] += prompt_tokens
-            token_usage_by_strategy[strategy_name]["completion_tokens"] += completion_tokens
-            token_usage_by_strategy[strategy_name]["total_tokens"] += total_run_tokens
-
-            token_usage_by_config[config_name]["prompt_tokens"] += prompt_tokens
-            token_usage_by_config[config_name]["completion_tokens"] += completion_tokens
-            token_usage_by_config[config_name]["total_tokens"] += total_run_tokens
-
-            # Extract metrics
-            fr_count, nfr_count = count_requirements(output)
-            quality_metrics = evaluate_requirements_quality(output)
-
-            # Add metrics to aggregated data
-            metrics_to_track = {
-                "fr_count": fr_count,
-                "nfr_count": nfr_count,
-                "specificity_score": quality_metrics["specificity_score"],
-                "testability_score": quality_metrics["testability_score"],
-                "measurability_score": quality_metrics["measurability_score"],
-                "latency": latency,
-                "prompt_tokens": prompt_tokens,
-                "completion_tokens": completion_tokens,
-                "total_tokens": total_run_tokens,
-                "output_length": len(output)
-            }
+    with open(csv_file, 'w', newline='') as summary_f, open(complete_csv_file, 'w', newline='') as complete_f:
+        summary_writer = csv.writer(summary_f)
+        complete_writer = csv.writer(complete_f)
 
-            # Update all aggregation levels
-            for metric, value in metrics_to_track.items():
-                aggregated_metrics["overall"][metric].append(value)
-                aggregated_metrics["by_strategy"][strategy_name][metric].append(value)
-                aggregated_metrics["by_config"][config_name][metric].append(value)
-
-            # Add to results dictionary
-            all_results["results"][strategy_name][config_name] = {
-                "prompt": prompt,
-                "output": output,
-                "prompt_length": len(prompt),
-                "output_length": len(output),
-                "fr_count": fr_count,
-                "nfr_count": nfr_count,
-                "latency": latency,
-                "quality_metrics": quality_metrics,
-                "config_details": model_configs[config_name],
-                "token_usage": token_usage
-            }
+        summary_writer.writerow([
+            "Strategy", "Config", "Prompt Length", "Response Length",
+            "FR Count", "NFR Count", "Specificity Score", "Testability Score",
+            "Measurability Score", "Latency (seconds)",
+            "Prompt Tokens ", "Completion Tokens ", "Total Tokens ",
+            *STREAM_COLUMNS
+        ])
+        complete_writer.writerow([
+            "User Story", "Strategy", "Config",
+            "Prompt", "Output", "Prompt Length", "Output Length",
+            "FR Count", "NFR Count", "Specificity Score", "Testability Score",
+            "Measurability Score", "Latency (seconds)", "Prompt Tokens ",
+            "Completion Tokens ", "Total Tokens ", "Config Details",
+            *STREAM_COLUMNS, "Packed With"
+        ])
 
-            # Write to CSV
-            with open(csv_file, 'a', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow([
+        for strategy_name in prompt_strategies:
+            for config_name in model_configs:
+                cell = cells.get((strategy_name, config_name))
+                if cell is None:
+                    continue
+
+                all_results["results"].setdefault(strategy_name, {})[config_name] = cell
+
+                token_usage = cell["token_usage"]
+                prompt_tokens = token_usage.get("prompt_tokens", 0)
+                completion_tokens = token_usage.get("completion_tokens", 0)
+                total_run_tokens = token_usage.get("total_tokens", 0)
+
+                # Update token totals
+                strategy_usage = token_usage_by_strategy.setdefault(
+                    strategy_name, {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0})
+                config_usage = token_usage_by_config.setdefault(
+                    config_name, {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0})
+                total_tokens += total_run_tokens or 0
+                for usage in (strategy_usage, config_usage):
+                    usage["prompt_tokens"] += prompt_tokens or 0
+                    usage["completion_tokens"] += completion_tokens or 0
+                    usage["total_tokens"] += total_run_tokens or 0
+
+                quality_metrics = cell["quality_metrics"]
+                stream_values = format_stream_metrics(cell.get("stream_metrics") or {})
+                stream_values.append(int(cell.get("truncated", False)))
+                summary_writer.writerow([
                     strategy_name,
                     config_name,
-                    len(prompt),
-                    len(output),
-                    fr_count,
-                    nfr_count,
+                    cell["prompt_length"],
+                    cell["output_length"],
+                    cell["fr_count"],
+                    cell["nfr_count"],
                     quality_metrics["specificity_score"],
                     quality_metrics["testability_score"],
                     quality_metrics["measurability_score"],
-                    f"{latency:.2f}",
+                    f"{cell['latency']:.2f}",
                     prompt_tokens,
                     completion_tokens,
-                    total_run_tokens
+                    total_run_tokens,
+                    *stream_values
                 ])
-
-            progress.update(1)
-
-    progress.close()
-
-    # Save complete results as CSV
-    complete_csv_file = os.path.join(run_dir, "complete_results.csv")
-    with open(complete_csv_file, 'w', newline='') as f:
-        writer = csv.writer(f)
-        # Write header row
-        writer.writerow([
-            "User Story", "Strategy", "Config",
-            "Prompt", "Output", "Prompt Length", "Output Length",
-            "FR Count", "NFR Count", "Specificity Score", "Testability Score",
-            "Measurability Score", "Latency (seconds)", "Prompt Tokens ",
-            "Completion Tokens ", "Total Tokens ", "Config Details"
-        ])
-
-        # Write data rows
-        for strategy_name, strategy_data in all_results["results"].items():
-            for config_name, config_data in strategy_data.items():
-                writer.writerow([
-                    all_results["user_story"],
+                complete_writer.writerow([
+                    user_story,
                     strategy_name,
                     config_name,
-                    config_data["prompt"],
-                    config_data["output"],
-                    config_data["prompt_length"],
-                    config_data["output_length"],
-                    config_data["fr_count"],
-                    config_data["nfr_count"],
-                    config_data["quality_metrics"]["specificity_score"],
-                    config_data["quality_metrics"]["testability_score"],
-                    config_data["quality_metrics"]["measurability_score"],
-                    f"{config_data['latency']:.2f}",
-                    config_data["token_usage"].get("prompt_tokens", 0),
-                    config_data["token_usage"].get("completion_tokens", 0),
-                    config_data["token_usage"].get("total_tokens", 0),
-                    str(config_data["config_details"])
+                    cell["prompt"],
+                    cell["output"],
+                    cell["prompt_length"],
+                    cell["output_length"],
+                    cell["fr_count"],
+                    cell["nfr_count"],
+                    quality_metrics["specificity_score"],
+                    quality_metrics["testability_score"],
+                    quality_metrics["measurability_score"],
+                    f"{cell['latency']:.2f}",
+                    prompt_tokens,
+                    completion_tokens,
+                    total_run_tokens,
+                    str(cell["config_details"]),
+                    *stream_values,
+                    # the other stories answered in the same packed call, empty for a call of its own
+                    ";".join(cell.get("packed_with", []))
                 ])
 
-
     token_summary = {
         "total_tokens": total_tokens,
         "by_strategy": token_usage_by_strategy,
         "by_config": token_usage_by_config
     }
 
+    return all_results, token_summary
+
+
+def make_run_dir(row_number, results_dir=RESULTS_DIR):
+    run_dir = os.path.join(results_dir, f"row_{row_number}")
+    os.makedirs(run_dir, exist_ok=True)
+    return run_dir
+
+
+def run_evaluation(user_story, row_number, model=None, results_dir=RESULTS_DIR, budget=None):
+    run_dir = make_run_dir(row_number, results_dir)
+    # rewriting a finished story would drop the judge columns added to it since
+    if story_already_finished(run_dir, [(strategy_name, config_name) for strategy_name in prompt_strategies
+                                        for config_name in model_configs]):
+        print(f"Skipping finished story {row_number}")
+        return None, run_dir, None
+
+    # resume from the journal: finished cells are not paid for again
+    ledger = RunLedger(run_dir)
+    cells = merged_cells(run_dir)
+
+    # Loop through all prompt strategies and model configurations
+    total_runs = len(prompt_strategies) * len(model_configs)
+    # deferred so that importing main for scoring or story loading stays cheap
+    from tqdm import tqdm
+
+    progress = tqdm(total=total_runs, initial=len(cells), desc="Generating requirements")
+
+    for strategy_name in prompt_strategies:
+        # Generate the prompt (same for all configs)
+        prompt = templates[strategy_name].render(user_story)
+
+        for config_name in model_configs:
+            if (strategy_name, config_name) in cells:
+                continue
+            cell = evaluate_cell(prompt, strategy_name, config_name, model=model, budget=budget, run_id=row_number)
+            ledger.append(strategy_name, config_name, cell)
+            cells[(strategy_name, config_name)] = cell
+            progress.update(1)
+
+    progress.close()
+
+    all_results, token_summary = write_results(user_story, cells, run_dir)
 
     return all_results, run_dir, token_summary
 
@@ -341,21 +397,50 @@ def load_user_stories_from_csv(filepath):
     return stories
 
 
+def run_sweep(stories, max_workers=max_concurrent_requests, strategies=None, configs=None, results_dir=RESULTS_DIR,
+              stories_per_call=None):
+    # the projected, budgeted and cached sweep over the given stories and strategy x config grid
+    from concurrent_runner import run_evaluations_concurrently
+
+    if stories_per_call is None:
+        stories_per_call = story_packing["stories_per_call"] if story_packing["enabled"] else 1
+
+    strategies = strategies or list(prompt_strategies)
+    budget = get_token_budget()
+    projection = project_sweep(stories, {name: prompt_strategies[name] for name in strategies}, configs)
+    print("\nProjected token usage (upper bound):")
+    print(format_projection(projection))
+    if sum(totals["prompt"] + totals["max_completion"] for totals in projection.values()) > budget.max_tokens_per_sweep:
+        print(f"⚠️ Upper bound exceeds the sweep budget of {budget.max_tokens_per_sweep} tokens; "
+              f"calls that would go over it are refused.")
+
+    # the whole strategy x config grid for every story goes through one bounded pool
+    run_evaluations_concurrently(stories, max_workers=max_workers, results_dir=results_dir, budget=budget,
+                                 strategies=strategies, configs=configs, stories_per_call=stories_per_call)
+
+    print("\nProjected vs actual token usage:")
+    print(budget.report())
+
+    prefix_cache = get_prefix_cache()
+    print("\nCached vs uncached prompt tokens:")
+    print(prefix_cache.report())
+    prefix_cache.close()
+    if stories_per_call > 1:
+        from story_packing import get_packing_stats
+
+        print(f"\nStory packing ({stories_per_call} stories per call):")
+        print(get_packing_stats().report())
+    print("\nLatency and hedging:")
+    print(get_hedger().report())
+    print(get_response_cache().summary())
+    print(get_model_pool().summary())
+
+
 # main execution function
 if __name__ == "__main__":
 
     print("Starting requirements generation evaluation...")
     init_main()
-    stories = load_user_stories_from_csv("user_stories.csv")
-
-    for i, (story_id, story_data) in enumerate(stories.items()):
-        # if i != 159:
-        #     continue
-
-        print(f"\nProcessing story {story_id}...")
-        results, output_dir, token_summary = run_evaluation(story_data, story_id)
-
-        print(f"Evaluation complete for story {story_id}.")
-        print(f"- Results saved to {output_dir}")
+    run_sweep(load_user_stories_from_csv("user_stories.csv"))
 
-    print("\nEvaluation complete.")
\ No newline at end of file
+    print("\nEvaluation complete.")
@@ -0,0 +1,62 @@
+import threading
+import time
+
+from backends import get_backend
+
+
+class ModelPool:
+    """
+    process-wide pool of model instances keyed by model name and generation config, so client
+    setup is paid once per key instead of once per call. models come from the configured backend
+    unless a factory is given.
+    """
+
+    def __init__(self, factory=None):
+        self.factory = factory
+        self._models = {}
+        self._lock = threading.Lock()
+        self.stats = {"created": 0, "reused": 0, "setup_seconds": 0.0}
+
+    @staticmethod
+    def make_key(model_name, generation_config=None):
+        return model_name, tuple(sorted((generation_config or {}).items()))
+
+    def get(self, model_name, generation_config=None):
+        key = self.make_key(model_name, generation_config)
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self.stats["reused"] += 1
+                return model
+
+            start_time = time.perf_counter()
+            factory = self.factory or get_backend().make_model
+            if generation_config:
+                model = factory(model_name, generation_config=generation_config)
+            else:
+                model = factory(model_name)
+            self.stats["setup_seconds"] += time.perf_counter() - start_time
+            self.stats["created"] += 1
+            self._models[key] = model
+            return model
+
+    def saved_seconds(self):
+        # every reuse skips one construction, estimated at the average cost of the ones we paid for
+        if not self.stats["created"]:
+            return 0.0
+        return self.stats["setup_seconds"] / self.stats["created"] * self.stats["reused"]
+
+    def summary(self):
+        return (f"model pool: {self.stats['created']} models created, {self.stats['reused']} reuses, "
+                f"{self.stats['setup_seconds']:.3f}s spent on setup, ~{self.saved_seconds():.3f}s setup saved")
+
+
+_shared_pool = ModelPool()
+
+
+def get_model(model_name, generation_config=None):
+    return _shared_pool.get(model_name, generation_config)
+
+
+def get_model_pool():
+    return _shared_pool
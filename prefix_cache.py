@@ -0,0 +1,162 @@
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+
+from backends import get_backend
+from config import prefix_cache as prefix_cache_config
+from prompt_templates import count_tokens, templates
+
+
+class PrefixCacheBackend(ABC):
+    """
+    what the prefix cache needs from a model provider: store a prompt prefix once and hand out a
+    model whose calls continue after it. min_prefix_tokens is the smallest prefix worth storing.
+    """
+
+    min_prefix_tokens = 0
+
+    @abstractmethod
+    def create(self, model_name, prefix, ttl_seconds):
+        pass
+
+    @abstractmethod
+    def bind(self, handle, model_name, model):
+        pass
+
+    def delete(self, handle):
+        pass
+
+
+class VertexPrefixCacheBackend(PrefixCacheBackend):
+    # vertex context caching through CachedContent; the model built from a cached content is kept
+    # per handle, like model_pool does for plain models, instead of being rebuilt on every call
+
+    def __init__(self, min_prefix_tokens):
+        self.min_prefix_tokens = min_prefix_tokens
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def create(self, model_name, prefix, ttl_seconds):
+        import datetime
+        from vertexai.generative_models import Content, Part
+        from vertexai.preview.caching import CachedContent
+
+        return CachedContent.create(model_name=model_name,
+                                    contents=[Content(role="user", parts=[Part.from_text(prefix)])],
+                                    ttl=datetime.timedelta(seconds=ttl_seconds))
+
+    def bind(self, handle, model_name, model):
+        from vertexai.preview.generative_models import GenerativeModel
+
+        # the prefix cache holds on to every handle until delete(), so its id stays unique
+        with self._lock:
+            bound = self._models.get(id(handle))
+            if bound is None:
+                bound = self._models[id(handle)] = GenerativeModel.from_cached_content(cached_content=handle)
+            return bound
+
+    def delete(self, handle):
+        with self._lock:
+            self._models.pop(id(handle), None)
+        handle.delete()
+
+
+class PrefixCache:
+    """
+    splits each prompt into the static preamble of its strategy template and the per-story rest.
+    the preamble is stored once per model through the backend and only the rest is sent on every
+    call. cached and uncached prompt tokens are tallied per strategy from usage_metadata.
+    """
+
+    def __init__(self, backend, ttl_seconds=3600, enabled=True):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._handles = {}
+        self._lock = threading.Lock()
+        self.by_strategy = defaultdict(lambda: {"calls": 0, "cached": 0, "uncached": 0})
+        self.stats = {"created": 0, "reused": 0, "too_short": 0, "failed": 0}
+
+    def split(self, strategy_name, prompt):
+        template = templates.get(strategy_name)
+        prefix = template.segments[0] if template is not None else ""
+        if not prefix or not prompt.startswith(prefix):
+            return "", prompt
+        return prefix, prompt[len(prefix):]
+
+    def prepare(self, strategy_name, model_name, model, prompt):
+        """
+        returns (model, text) to call: a model bound to the cached preamble and the rest of the prompt,
+        or the given model and the full prompt when the preamble is not cached.
+        """
+        if not self.enabled or strategy_name is None:
+            return model, prompt
+        prefix, rest = self.split(strategy_name, prompt)
+        if count_tokens(prefix) < max(1, self.backend.min_prefix_tokens):
+            with self._lock:
+                self.stats["too_short"] += 1
+            return model, prompt
+
+        key = (model_name, hashlib.sha256(prefix.encode("utf-8")).hexdigest())
+        with self._lock:
+            handle = self._handles.get(key)
+            if handle is None:
+                try:
+                    handle = self.backend.create(model_name, prefix, self.ttl_seconds)
+                except Exception as e:
+                    # caching is an optimisation only, fall back to sending the whole prompt
+                    print(f"⚠️ Could not cache the {strategy_name} preamble: {e}")
+                    self.stats["failed"] += 1
+                    return model, prompt
+                self._handles[key] = handle
+                self.stats["created"] += 1
+            else:
+                self.stats["reused"] += 1
+        return self.backend.bind(handle, model_name, model), rest
+
+    def record(self, strategy_name, token_usage):
+        if strategy_name is None or not token_usage or token_usage.get("prompt_tokens") is None:
+            return
+        cached = token_usage.get("cached_prompt_tokens") or 0
+        with self._lock:
+            stats = self.by_strategy[strategy_name]
+            stats["calls"] += 1
+            stats["cached"] += cached
+            stats["uncached"] += token_usage["prompt_tokens"] - cached
+
+    def close(self):
+        with self._lock:
+            handles, self._handles = list(self._handles.values()), {}
+        for handle in handles:
+            try:
+                self.backend.delete(handle)
+            except Exception as e:
+                print(f"⚠️ Could not delete cached prefix: {e}")
+
+    def report(self):
+        lines = [f"{'Strategy':20s} {'calls':>6s} {'cached':>10s} {'uncached':>10s} {'cached %':>9s}"]
+        for strategy_name, stats in self.by_strategy.items():
+            total = stats["cached"] + stats["uncached"]
+            share = stats["cached"] / total if total else 0.0
+            lines.append(f"{strategy_name:20s} {stats['calls']:6d} {stats['cached']:10d} "
+                         f"{stats['uncached']:10d} {share:9.1%}")
+        lines.append(f"prefixes created: {self.stats['created']}, reused: {self.stats['reused']}, "
+                     f"below {self.backend.min_prefix_tokens} tokens: {self.stats['too_short']}, "
+                     f"failed: {self.stats['failed']}")
+        return "\n".join(lines)
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_prefix_cache():
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            backend = get_backend().prefix_cache_backend(prefix_cache_config["min_prefix_tokens"])
+            _shared_cache = PrefixCache(backend,
+                                        ttl_seconds=prefix_cache_config["ttl_seconds"],
+                                        enabled=prefix_cache_config["enabled"])
+        return _shared_cache
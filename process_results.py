@@ -1,101 +1,57 @@
 import os
+
 import pandas as pd
-import glob
-
-
-def process_results(base_folder="prompt_engineering_results"):
-    # get all CSV files
-    pattern = os.path.join(base_folder, "row_story_*", "results_summary.csv")
-    csv_files = glob.glob(pattern)
-
-    print(f"Found {len(csv_files)} CSV files to process")
-
-    # initialize a dictionary to store aggregated data
-    aggregated_data = {}
-
-    # initialize counters for each strategy-config combination
-    counters = {}
-
-    # process each CSV file
-    for file_path in csv_files:
-        try:
-            # read the CSV file
-            df = pd.read_csv(file_path)
-
-            # process each row in the CSV
-            for _, row in df.iterrows():
-                strategy = row['Strategy']
-                config = row['Config']
-                key = (strategy, config)
-
-                # skip header rows or rows with missing strategy/config
-                if pd.isna(strategy) or pd.isna(config):
-                    continue
-
-                # initialize data structure if this is the first time seeing this combination
-                if key not in aggregated_data:
-                    aggregated_data[key] = {col: 0 for col in df.columns if col not in ['Strategy', 'Config']}
-                    counters[key] = 0
-
-                # add the values for this row to the aggregated data
-                for col in df.columns:
-                    if col not in ['Strategy', 'Config']:
-                        aggregated_data[key][col] += row[col]
-
-                # increment the counter for this strategy-config combination
-                counters[key] += 1
-
-        except Exception as e:
-            print(f"Error processing file {file_path}: {e}")
-
-    # calculate averages
-    result_rows = []
-    for key, data in aggregated_data.items():
-        strategy, config = key
-        count = counters[key]
-
-        # skip if no valid data was found
-        if count == 0:
-            continue
-
-        # calculate averages
-        avg_data = {col: value / count for col, value in data.items()}
-
-        # create a row for the results
-        result_row = {
-            'Strategy': strategy,
-            'Config': config,
-            **avg_data
-        }
-        result_rows.append(result_row)
-
-    # create a DataFrame from the results
-    results_df = pd.DataFrame(result_rows)
-
-    # sort the DataFrame to match the expected order
-    strategy_order = [
-        "Zero-shot", "Few-shot", "Chain-of-Thought", "Self-Consistency",
-        "System Prompt", "Role Prompt", "Contextual", "Tree of Thoughts", "ReAct"
-    ]
-    config_order = ["precise", "default", "creative"]
-
-    # create a custom sorting key
-    def custom_sort(row):
-        strategy_idx = strategy_order.index(row['Strategy']) if row['Strategy'] in strategy_order else len(
-            strategy_order)
-        config_idx = config_order.index(row['Config']) if row['Config'] in config_order else len(config_order)
-        return (strategy_idx, config_idx)
-
-    # sort the results
-    results_df['sort_key'] = results_df.apply(custom_sort, axis=1)
-    results_df = results_df.sort_values('sort_key').drop('sort_key', axis=1)
 
+from aggregation import KEY_COLUMNS, aggregate_metrics, flatten_stats, load_csv_tree, select_cells
+from streaming import STREAM_COLUMNS
+
+STORE_DIR = "results_store"
+SUMMARY_COLUMNS = [
+    "Strategy", "Config", "Prompt Length", "Response Length",
+    "FR Count", "NFR Count", "Specificity Score", "Testability Score",
+    "Measurability Score", "Latency (seconds)",
+    "Prompt Tokens ", "Completion Tokens ", "Total Tokens ",
+    *STREAM_COLUMNS
+]
+
+
+def load_summaries(base_folder="prompt_engineering_results", store_dir=STORE_DIR, stories=None, workers=None):
+    # the columnar store holds the same metrics without the prompt/output text, so prefer it
+    # while it is not older than any of the csv files it was imported from
+    if store_dir and os.path.isdir(store_dir):
+        from results_store import load_metrics, store_is_current
+
+        if not store_is_current(store_dir, base_folder, stories):
+            print(f"{store_dir} is older than the csv files in {base_folder}, reading those instead "
+                  f"(python results_store.py import refreshes it)")
+            return load_csv_tree(base_folder, "results_summary.csv", stories=stories, workers=workers)
+
+        df = load_metrics(store_dir, stories).rename(columns={"Output Length": "Response Length"})
+        return df[["story"] + [col for col in SUMMARY_COLUMNS if col in df.columns]]
+    return load_csv_tree(base_folder, "results_summary.csv", stories=stories, workers=workers)
+
+
+def process_results(base_folder="prompt_engineering_results", store_dir=STORE_DIR, with_stats=False,
+                    stories=None, strategies=None, configs=None, workers=None):
+    df = select_cells(load_summaries(base_folder, store_dir, stories, workers), strategies, configs)
+    print(f"Loaded {len(df)} result rows from {df['story'].nunique() if 'story' in df else 0} stories")
+
+    value_columns = [col for col in df.columns if col not in KEY_COLUMNS + ["story"]]
+    stats = aggregate_metrics(df, value_columns)
+
+    # calculate averages, in the same layout as before
+    results_df = stats.xs("mean", axis=1, level=1).reset_index()
+
+    if with_stats:
+        return results_df, flatten_stats(stats)
     return results_df
 
 
-def main():
+def main(stories=None, strategies=None, configs=None, workers=None, output_dir=".",
+         base_folder="prompt_engineering_results", store_dir=STORE_DIR):
     # process the results
-    results = process_results()
+    results, stats = process_results(base_folder, store_dir, with_stats=True, stories=stories,
+                                     strategies=strategies, configs=configs, workers=workers)
 
     # display the results
     pd.set_option('display.max_columns', None)
@@ -103,10 +59,14 @@ def main():
     print(results)
 
     # save the results to a CSV file
-    output_file = "prompt_engineering_averages.csv"
+    output_file = os.path.join(output_dir, "prompt_engineering_averages.csv")
     results.to_csv(output_file, index=False)
     print(f"Results saved to {output_file}")
 
+    stats_file = os.path.join(output_dir, "prompt_engineering_statistics.csv")
+    stats.to_csv(stats_file, index=False)
+    print(f"Mean, std, median and percentiles saved to {stats_file}")
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,183 @@
+import random
+import re
+import threading
+import time
+
+from config import rate_limits
+
+RETRYABLE_STATUS_CODES = (429, 500, 503, 504)
+RETRY_AFTER_PATTERNS = [
+    re.compile(r'retry[ _-]?(?:after|in)\D{0,5}(\d+(?:\.\d+)?)\s*s', re.IGNORECASE),
+    re.compile(r'"?retryDelay"?\s*[:=]\s*"?(\d+(?:\.\d+)?)s', re.IGNORECASE),
+    re.compile(r'retry_delay\s*\{\s*seconds:\s*(\d+)', re.IGNORECASE)
+]
+
+
+class TokenBucket:
+    """
+    bucket refilled continuously at capacity per minute. reserve() debits immediately and returns
+    how long the caller has to wait, so concurrent callers queue up fairly without busy waiting.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.fill_rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        with self.lock:
+            self._refill()
+            self.tokens -= min(amount, self.capacity)
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.fill_rate
+
+    def try_reserve(self, amount):
+        # debits only when the amount is there right now, never makes the caller wait
+        with self.lock:
+            self._refill()
+            if self.tokens < min(amount, self.capacity):
+                return False
+            self.tokens -= min(amount, self.capacity)
+            return True
+
+    def adjust(self, amount):
+        # correct an earlier reservation once the real usage is known (negative amounts refund)
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+def is_retryable(error):
+    code = getattr(error, "code", None)
+    if callable(code):
+        code = code()
+    code = getattr(code, "value", code)
+    if isinstance(code, tuple):
+        code = code[0]
+    if code in RETRYABLE_STATUS_CODES:
+        return True
+
+    message = str(error).lower()
+    return "429" in message or "resource exhausted" in message or "quota" in message
+
+
+def retry_after_seconds(error):
+    # explicit attribute, http header, then whatever hint the error message carries
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is not None:
+        return float(retry_after)
+
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    if "Retry-After" in headers:
+        try:
+            return float(headers["Retry-After"])
+        except (TypeError, ValueError):
+            pass
+
+    message = str(error)
+    for pattern in RETRY_AFTER_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute, tokens_per_minute, max_retries=6, base_delay=1.0, max_delay=60.0):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "retries": 0, "failures": 0, "throttled_seconds": 0.0, "backoff_seconds": 0.0}
+
+    def _wait_for_capacity(self, estimated_tokens):
+        # a 429 anywhere pauses every caller, otherwise wait only as long as the buckets require
+        pause = self._paused_until - time.monotonic()
+        wait = max(pause, self.request_bucket.reserve(1), self.token_bucket.reserve(estimated_tokens))
+        if wait > 0:
+            with self._lock:
+                self.stats["throttled_seconds"] += wait
+            time.sleep(wait)
+
+    def _backoff(self, attempt, error):
+        delay = retry_after_seconds(error)
+        if delay is None:
+            # exponential backoff with full jitter
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        else:
+            delay += random.uniform(0, self.base_delay)
+
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self.stats["retries"] += 1
+            self.stats["backoff_seconds"] += delay
+
+    def call(self, fn, estimated_tokens=0):
+        """
+        runs fn() once the request and token buckets allow it, retrying rate-limit and
+        transient server errors with backoff. non-retryable errors are raised straight away.
+        every attempt reserves estimated_tokens; failed attempts refund theirs, so only the
+        attempt that succeeds is left for the caller to settle with record_usage.
+        """
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_capacity(estimated_tokens)
+            with self._lock:
+                self.stats["calls"] += 1
+            try:
+                return fn()
+            except Exception as e:
+                # only the successful attempt is settled by record_usage, a failed one gives its estimate back
+                self.token_bucket.adjust(-estimated_tokens)
+                if not is_retryable(e) or attempt == self.max_retries:
+                    with self._lock:
+                        self.stats["failures"] += 1
+                    raise
+                self._backoff(attempt, e)
+
+    def try_acquire(self, estimated_tokens=0):
+        # capacity for an optional extra request (e.g. a hedge), only if it is free right now
+        if self._paused_until > time.monotonic() or not self.request_bucket.try_reserve(1):
+            return False
+        if not self.token_bucket.try_reserve(estimated_tokens):
+            self.request_bucket.adjust(-1)
+            return False
+        with self._lock:
+            self.stats["calls"] += 1
+        return True
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        if actual_tokens is not None:
+            self.token_bucket.adjust(actual_tokens - estimated_tokens)
+
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    # rough 4 characters per token estimate, used until usage_metadata is known
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter(**rate_limits)
+        return _shared_limiter
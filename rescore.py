@@ -0,0 +1,94 @@
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from evaluation import count_requirements, evaluate_requirements_quality
+
+HEURISTIC_COLUMNS = ["FR Count", "NFR Count", "Specificity Score", "Testability Score", "Measurability Score"]
+
+
+def score_output(output):
+    fr_count, nfr_count = count_requirements(output)
+    quality_metrics = evaluate_requirements_quality(output)
+    return [
+        fr_count,
+        nfr_count,
+        quality_metrics["specificity_score"],
+        quality_metrics["testability_score"],
+        quality_metrics["measurability_score"]
+    ]
+
+
+def rescore_story(complete_file, strategies=None, configs=None):
+    """
+    recomputes the heuristic columns of one story's complete_results.csv (only the rows of the
+    given strategies and configs, all rows by default) and mirrors them into results_summary.csv.
+    files are only rewritten when a value actually changed. cells are read and written as text,
+    so every other column comes back exactly as it was stored.
+    """
+    import pandas as pd
+
+    from aggregation import select_cells, write_csv_atomically
+
+    df = pd.read_csv(complete_file, dtype=str, keep_default_na=False)
+    selected = select_cells(df, strategies, configs)
+    scores = pd.DataFrame(
+        [score_output(output) for output in selected["Output"]],
+        columns=HEURISTIC_COLUMNS, index=selected.index
+    ).astype(str)
+
+    changed = (selected[HEURISTIC_COLUMNS].apply(pd.to_numeric, errors="coerce")
+               != scores.apply(pd.to_numeric)).any(axis=1)
+    changed_rows = int(changed.sum())
+    if changed_rows == 0:
+        return complete_file, 0
+
+    df.loc[changed[changed].index, HEURISTIC_COLUMNS] = scores[changed]
+    write_csv_atomically(df, complete_file)
+
+    summary_file = os.path.join(os.path.dirname(complete_file), "results_summary.csv")
+    if os.path.exists(summary_file):
+        summary = pd.read_csv(summary_file, dtype=str, keep_default_na=False)
+        by_cell = scores[changed].set_index([selected.loc[changed, "Strategy"], selected.loc[changed, "Config"]])
+        by_cell = by_cell[~by_cell.index.duplicated(keep="last")]
+        keys = pd.MultiIndex.from_frame(summary[["Strategy", "Config"]])
+        matched = keys.isin(by_cell.index)
+        summary.loc[matched, HEURISTIC_COLUMNS] = by_cell.loc[keys[matched]].to_numpy()
+        write_csv_atomically(summary, summary_file)
+
+    return complete_file, changed_rows
+
+
+def rescore_all(base_folder="prompt_engineering_results", workers=None, stories=None, strategies=None, configs=None):
+    if stories is None:
+        csv_files = sorted(glob.glob(os.path.join(base_folder, "row_story_*", "complete_results.csv")))
+    else:
+        csv_files = [os.path.join(base_folder, f"row_story_{story}", "complete_results.csv") for story in stories]
+        csv_files = [file_path for file_path in csv_files if os.path.exists(file_path)]
+    print(f"Rescoring {len(csv_files)} files with {workers or os.cpu_count()} workers")
+
+    start_time = time.time()
+    files_changed = 0
+    rows_changed = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        rescore = partial(rescore_story, strategies=strategies, configs=configs)
+        for file_path, changed in executor.map(rescore, csv_files, chunksize=8):
+            if changed:
+                files_changed += 1
+                rows_changed += changed
+                print(f"Updated {changed} rows in {file_path}")
+
+    print(f"Rescored {len(csv_files)} files in {time.time() - start_time:.2f}s: "
+          f"{rows_changed} rows changed across {files_changed} files")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute heuristic metrics for all stored outputs.")
+    parser.add_argument("--base-folder", default="prompt_engineering_results")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    rescore_all(args.base_folder, args.workers)
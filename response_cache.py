@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from backends import get_backend
+from config import response_cache as response_cache_config
+
+
+class ResponseCache:
+    """
+    content-addressed sqlite store of model responses. entries are keyed on a hash of the prompt,
+    model name and sampling settings, and the least recently used ones are evicted once the
+    stored text exceeds max_bytes.
+    """
+
+    def __init__(self, path, max_bytes, enabled=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if self.enabled:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    token_usage TEXT,
+                    latency REAL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed_at ON responses (accessed_at)")
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(prompt, model_name, temperature=None, top_p=None, top_k=None, max_output_tokens=None):
+        key_fields = [prompt, model_name, temperature, top_p, top_k]
+        # only part of the key when set, so entries stored without an output cap keep their keys
+        if max_output_tokens is not None:
+            key_fields.append(max_output_tokens)
+        payload = json.dumps(key_fields, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, token_usage, latency FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+
+            self.stats["hits"] += 1
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+
+        text, token_usage, latency = row
+        return {
+            "text": text,
+            "token_usage": json.loads(token_usage) if token_usage else None,
+            "latency": latency
+        }
+
+    def put(self, key, text, token_usage=None, latency=None):
+        if not self.enabled:
+            return
+
+        now = time.time()
+        size = len(text.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, text, json.dumps(token_usage) if token_usage else None, latency, size, now, now)
+            )
+            self.stats["writes"] += 1
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # drop least recently used entries until the store fits again
+        for key, size in self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.stats["evictions"] += 1
+
+    def size_bytes(self):
+        if not self.enabled:
+            return 0
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def summary(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        hit_rate = self.stats["hits"] / lookups * 100 if lookups else 0
+        return (f"response cache: {self.stats['hits']} hits, {self.stats['misses']} misses "
+                f"({hit_rate:.1f}% hit rate), {self.stats['writes']} writes, "
+                f"{self.stats['evictions']} evictions, {self.size_bytes() / 1024 / 1024:.1f} MB stored")
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_response_cache():
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            enabled = response_cache_config["enabled"] and os.getenv("RESPONSE_CACHE_BYPASS") != "1"
+            path = response_cache_config["path"]
+            backend_name = get_backend().name
+            if backend_name != "vertex":
+                # responses of other backends never mix with the real ones
+                root, ext = os.path.splitext(path)
+                path = f"{root}.{backend_name}{ext}"
+            _shared_cache = ResponseCache(path, response_cache_config["max_bytes"], enabled=enabled)
+        return _shared_cache
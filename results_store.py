@@ -0,0 +1,139 @@
+import argparse
+import glob
+import os
+import re
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from streaming import STREAM_COLUMNS
+
+STORE_DIR = "results_store"
+
+TEXT_COLUMNS = ["User Story", "Prompt", "Output", "Config Details"]
+KEY_COLUMNS = ["Strategy", "Config"]
+METRIC_COLUMNS = [
+    "Prompt Length", "Output Length", "FR Count", "NFR Count",
+    "Specificity Score", "Testability Score", "Measurability Score", "Latency (seconds)",
+    "Prompt Tokens ", "Completion Tokens ", "Total Tokens ", *STREAM_COLUMNS,
+    "ai-specificity", "ai-measurability", "ai-accuracy", "ai-completeness"
+]
+# "surrogate" or "llm" when the ai-* scores came from a pass with the surrogate judge
+SOURCE_COLUMNS = ["ai-source"]
+
+
+def story_number(folder_name):
+    match = re.fullmatch(r'row_story_(\d+)', folder_name)
+    return int(match.group(1)) if match else None
+
+
+def to_table(df):
+    """
+    converts one story's complete_results frame to the store schema. metric columns are always
+    float64 so partitions stay compatible; unparseable judge scores become nulls.
+    """
+    fields = [pa.field(col, pa.string()) for col in KEY_COLUMNS + TEXT_COLUMNS + SOURCE_COLUMNS]
+    fields += [pa.field(col, pa.float64()) for col in METRIC_COLUMNS]
+    schema = pa.schema(fields)
+
+    columns = {}
+    for col in KEY_COLUMNS + TEXT_COLUMNS + SOURCE_COLUMNS:
+        columns[col] = df[col].astype("string") if col in df else pd.Series(pd.NA, index=df.index, dtype="string")
+    for col in METRIC_COLUMNS:
+        columns[col] = pd.to_numeric(df[col], errors="coerce") if col in df else pd.Series(float("nan"), index=df.index)
+
+    return pa.Table.from_pandas(pd.DataFrame(columns), schema=schema, preserve_index=False)
+
+
+def import_story(csv_file, story, store_dir=STORE_DIR):
+    partition_dir = os.path.join(store_dir, f"story={story}")
+    os.makedirs(partition_dir, exist_ok=True)
+    # one file per story, so a re-import simply replaces the partition
+    pq.write_table(to_table(pd.read_csv(csv_file)), os.path.join(partition_dir, "part-0.parquet"))
+
+
+def import_results_tree(base_folder="prompt_engineering_results", store_dir=STORE_DIR):
+    pattern = os.path.join(base_folder, "row_story_*", "complete_results.csv")
+    csv_files = glob.glob(pattern)
+    print(f"Importing {len(csv_files)} stories into {store_dir}")
+
+    start_time = time.time()
+    for csv_file in csv_files:
+        story = story_number(os.path.basename(os.path.dirname(csv_file)))
+        if story is None:
+            continue
+        try:
+            import_story(csv_file, story, store_dir)
+        except Exception as e:
+            print(f"Error importing {csv_file}: {e}")
+
+    print(f"Import complete in {time.time() - start_time:.2f}s")
+
+
+def open_store(store_dir=STORE_DIR):
+    return ds.dataset(store_dir, format="parquet", partitioning="hive")
+
+
+def load_results(store_dir=STORE_DIR, columns=None, stories=None):
+    """
+    loads the requested columns for the requested stories. only those columns are read from
+    disk, so metric queries never touch the prompt and output text.
+    """
+    if columns is None:
+        columns = ["story"] + KEY_COLUMNS + METRIC_COLUMNS
+
+    dataset = open_store(store_dir)
+    # stores imported before a column was added simply lack it
+    columns = [col for col in columns if col in dataset.schema.names]
+    row_filter = ds.field("story").isin(list(stories)) if stories is not None else None
+    return dataset.to_table(columns=columns, filter=row_filter).to_pandas()
+
+
+def load_metrics(store_dir=STORE_DIR, stories=None):
+    return load_results(store_dir, ["story"] + KEY_COLUMNS + METRIC_COLUMNS, stories)
+
+
+def store_is_current(store_dir=STORE_DIR, base_folder="prompt_engineering_results", stories=None):
+    """
+    true when every story folder of base_folder (only the given stories, when passed) has a
+    partition written after its csv files last changed. generation, rescoring and judging only
+    touch the csv files, so after any of them the snapshot is stale until the next import.
+    """
+    if not os.path.isdir(store_dir):
+        return False
+    folders = glob.glob(os.path.join(base_folder, "row_story_*")) if stories is None else \
+        [os.path.join(base_folder, f"row_story_{story}") for story in stories]
+    for folder in folders:
+        csv_times = [os.path.getmtime(os.path.join(folder, name))
+                     for name in ("complete_results.csv", "results_summary.csv")
+                     if os.path.exists(os.path.join(folder, name))]
+        if not csv_times:
+            continue
+        partition = os.path.join(store_dir, f"story={story_number(os.path.basename(folder))}", "part-0.parquet")
+        if not os.path.exists(partition) or os.path.getmtime(partition) < max(csv_times):
+            return False
+    return True
+
+
+def store_exists(store_dir=STORE_DIR):
+    return os.path.isdir(store_dir) and any(name.startswith("story=") for name in os.listdir(store_dir))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Columnar store of all prompt engineering results.")
+    parser.add_argument("command", choices=["import", "query"])
+    parser.add_argument("--base-folder", default="prompt_engineering_results")
+    parser.add_argument("--store-dir", default=STORE_DIR)
+    args = parser.parse_args()
+
+    if args.command == "import":
+        import_results_tree(args.base_folder, args.store_dir)
+    else:
+        start_time = time.time()
+        metrics = load_metrics(args.store_dir)
+        averages = metrics.groupby(KEY_COLUMNS, sort=False)[METRIC_COLUMNS].mean()
+        print(averages)
+        print(f"\nLoaded {len(metrics)} rows and aggregated in {(time.time() - start_time) * 1000:.0f}ms")
@@ -0,0 +1,112 @@
+import glob
+import json
+import os
+import threading
+
+LEDGER_FILE = "ledger.jsonl"
+
+
+class RunLedger:
+    """
+    append-only jsonl journal of finished (strategy, config) cells for one story.
+    every record is flushed and fsynced before append() returns, so a crash loses at most the
+    call that was in flight. queue workers each write their own shard, <name>.<shard>.jsonl,
+    so no two processes ever append to the same file.
+    """
+
+    def __init__(self, run_dir, shard=None, name="ledger"):
+        self.run_dir = run_dir
+        self.path = os.path.join(run_dir, f"{name}.jsonl" if shard is None else f"{name}.{shard}.jsonl")
+        self._lock = threading.Lock()
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def records(self):
+        # (strategy, config, cell) in write order
+        if not self.exists():
+            return
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # a torn last line from a crash mid-write
+                    continue
+                yield record["strategy"], record["config"], record["cell"]
+
+    def completed_cells(self):
+        # later records win; cells that ended in an error are not complete and get retried
+        cells = {}
+        for strategy_name, config_name, cell in self.records():
+            if cell.get("error"):
+                cells.pop((strategy_name, config_name), None)
+            else:
+                cells[(strategy_name, config_name)] = cell
+        return cells
+
+    def failed_cells(self):
+        # the last error of every cell that never succeeded in this ledger
+        failed = {}
+        for strategy_name, config_name, cell in self.records():
+            if cell.get("error"):
+                failed[(strategy_name, config_name)] = cell
+            else:
+                failed.pop((strategy_name, config_name), None)
+        return failed
+
+    def append(self, strategy_name, config_name, cell):
+        line = json.dumps({"strategy": strategy_name, "config": config_name, "cell": cell}, ensure_ascii=False)
+        data = (line + "\n").encode("utf-8")
+        with self._lock:
+            with open(self.path, 'a+b') as f:
+                # a torn last line from a crash has no newline; end it first, so this record is not glued onto it
+                end = f.seek(0, os.SEEK_END)
+                if end:
+                    f.seek(end - 1)
+                    if f.read(1) != b"\n":
+                        data = b"\n" + data
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def ledger_shards(run_dir, name="ledger"):
+    # the story's main ledger and every worker shard, in file name order
+    paths = [os.path.join(run_dir, f"{name}.jsonl")] + sorted(glob.glob(os.path.join(run_dir, f"{name}.*.jsonl")))
+    return [RunLedger(run_dir, shard=os.path.basename(path)[len(name) + 1:-len(".jsonl")] or None, name=name)
+            for path in paths if os.path.exists(path)]
+
+
+def merged_cells(run_dir, name="ledger", include_failed=False):
+    """
+    completed cells across the main ledger and all worker shards. when a lease ran out and two
+    workers finished the same cell, the shard that sorts first wins, so merging the same shards
+    always gives the same result. with include_failed, cells that never succeeded keep their
+    last error so they still get a row.
+    """
+    cells = {}
+    failed = {}
+    for ledger in ledger_shards(run_dir, name):
+        for key, cell in ledger.completed_cells().items():
+            cells.setdefault(key, cell)
+        if include_failed:
+            failed.update(ledger.failed_cells())
+    if include_failed:
+        cells.update({key: cell for key, cell in failed.items() if key not in cells})
+    return cells
+
+
+def story_already_finished(run_dir, required_cells):
+    """
+    a story is finished once its complete_results.csv is written and none of required_cells,
+    the (strategy, config) pairs of the sweep, is missing from the journal.
+    stories written before the ledger existed have complete results but no journal.
+    rewriting a finished story would drop any judge columns added to it since, so callers skip it.
+    """
+    if not os.path.exists(os.path.join(run_dir, "complete_results.csv")):
+        return False
+    if not ledger_shards(run_dir):
+        return True
+    return set(required_cells) <= merged_cells(run_dir).keys()
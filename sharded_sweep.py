@@ -0,0 +1,232 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import judge_batch_size, model_configs, prompt_strategies, work_queue as work_queue_config
+from run_ledger import RunLedger, merged_cells, story_already_finished
+from work_queue import LeaseKeeper
+
+GENERATE = "generate"
+JUDGE = "judge"
+# one merge task per story and stage, leased like any other task so exactly one worker writes the csv files
+MERGE = {GENERATE: "generate-merge", JUDGE: "judge-merge"}
+STORY_TASK = ("", "")
+POLL_SECONDS = 2.0
+
+
+def fill_generation(queue, stories, results_dir, strategies=None, configs=None):
+    # one task per cell that no ledger or shard of the story has finished yet
+    strategies = strategies or list(prompt_strategies)
+    configs = configs or list(model_configs)
+    required_cells = {(strategy_name, config_name) for strategy_name in strategies for config_name in configs}
+
+    tasks = []
+    for story_id in stories:
+        run_dir = os.path.join(results_dir, f"row_{story_id}")
+        if story_already_finished(run_dir, required_cells):
+            continue
+        done = merged_cells(run_dir) if os.path.isdir(run_dir) else {}
+        tasks += [(story_id, *cell) for cell in sorted(required_cells - done.keys())]
+    return enqueue_stage(queue, GENERATE, tasks)
+
+
+def fill_judging(queue, results_dir, stories=None, strategies=None, configs=None):
+    # one task per cell that still misses an ai-* score
+    from ai_metrics_evaluation import build_score_index
+
+    index = build_score_index(results_dir, stories, strategies, configs)
+    tasks = [(f"story_{row_num}", strategy_name, config_name)
+             for cells in index.values() for _, row_num, strategy_name, config_name in cells]
+    return enqueue_stage(queue, JUDGE, tasks)
+
+
+def enqueue_stage(queue, kind, tasks):
+    # every task passed here is a cell still missing, so one that is done or failed is tried again;
+    # stories that get new work have to be merged again once it is done
+    queue.forget(MERGE[kind], sorted({task[0] for task in tasks}))
+    return queue.enqueue(kind, tasks, requeue=True)
+
+
+def drain(queue, owner, kind, handle, max_workers, lease_size=1):
+    """
+    runs max_workers threads that lease tasks of kind and pass them to handle(tasks) until none
+    are left, including tasks still leased by other workers that might expire. handle returns
+    {task: error or None}. a settled story gets its merge task queued.
+    """
+    with LeaseKeeper(queue, owner, kind, work_queue_config["heartbeat_seconds"]) as keeper:
+        def work():
+            while True:
+                tasks = queue.lease(owner, kind, lease_size, same_story=lease_size > 1)
+                if not tasks:
+                    if queue.remaining(kind) == 0:
+                        return
+                    time.sleep(POLL_SECONDS)
+                    continue
+
+                keeper.hold(tasks)
+                try:
+                    results = handle(tasks)
+                except Exception as e:
+                    results = {task: e for task in tasks}
+                for task in tasks:
+                    keeper.release(task)
+                    if results.get(task) is None:
+                        queue.complete(owner, kind, task)
+                    else:
+                        queue.fail(owner, kind, task, results[task])
+                for story_id in {task[0] for task in tasks}:
+                    if queue.story_settled(kind, story_id):
+                        queue.enqueue(MERGE[kind], [(story_id, *STORY_TASK)])
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for future in [executor.submit(work) for _ in range(max_workers)]:
+                future.result()
+
+    # stories settled by a lease that expired on its last attempt, or by a worker that stopped early
+    queue.enqueue(MERGE[kind], [(story_id, *STORY_TASK) for story_id in queue.settled_stories(kind)])
+
+
+def run_merges(queue, owner, kind, merge_story):
+    merged = 0
+    while True:
+        tasks = queue.lease(owner, MERGE[kind])
+        if not tasks:
+            return merged
+        story_id = tasks[0][0]
+        try:
+            merge_story(story_id)
+        except Exception as e:
+            print(f"Error merging {story_id}: {e}")
+            queue.fail(owner, MERGE[kind], tasks[0], e)
+            continue
+        queue.complete(owner, MERGE[kind], tasks[0])
+        merged += 1
+
+
+def work_generation(queue, stories, worker_id, results_dir, max_workers=8, model=None):
+    """
+    drains the generation tasks of the queue. every finished cell goes to this worker's shard of
+    the story ledger, and the worker that settles a story's last cell queues its merge, which
+    writes results_summary.csv and complete_results.csv from all shards in the usual layout.
+    """
+    import pandas as pd
+
+    from budget import QueueTokenBudget
+    from config import token_budget
+    from main import evaluate_cell, make_run_dir, write_results
+    from prompt_templates import templates
+    from aggregation import write_csv_atomically
+
+    # the caps hold across every worker of the queue, not per process
+    budget = QueueTokenBudget(queue, token_budget["max_tokens_per_run"], token_budget["max_tokens_per_sweep"])
+    ledgers = {}
+    ledgers_lock = threading.Lock()
+
+    def shard(story_id):
+        with ledgers_lock:
+            if story_id not in ledgers:
+                ledgers[story_id] = RunLedger(make_run_dir(story_id, results_dir), shard=worker_id)
+            return ledgers[story_id]
+
+    def generate(tasks):
+        results = {}
+        for story_id, strategy_name, config_name in tasks:
+            prompt = templates[strategy_name].render(stories[story_id])
+            cell = evaluate_cell(prompt, strategy_name, config_name, model, budget=budget, run_id=story_id)
+            shard(story_id).append(strategy_name, config_name, cell)
+            results[(story_id, strategy_name, config_name)] = cell.get("error")
+        return results
+
+    def merge_story(story_id):
+        run_dir = make_run_dir(story_id, results_dir)
+        complete_file = os.path.join(run_dir, "complete_results.csv")
+        judged = read_judge_scores(complete_file)
+        write_results(stories[story_id], merged_cells(run_dir, include_failed=True), run_dir)
+        if judged:
+            # a story filled again after it was judged keeps the scores of every unchanged output
+            df = pd.read_csv(complete_file, dtype=str, keep_default_na=False)
+            for idx in df.index:
+                scores = judged.get((df.at[idx, "Strategy"], df.at[idx, "Config"], df.at[idx, "Output"]))
+                if scores is not None:
+                    for col, score in scores.items():
+                        df.at[idx, col] = score
+            write_csv_atomically(df, complete_file)
+        print(f"Merged {story_id} into {run_dir}")
+
+    drain(queue, worker_id, GENERATE, generate, max_workers)
+    return run_merges(queue, worker_id, GENERATE, merge_story)
+
+
+def read_judge_scores(complete_file):
+    # {(strategy, config, output): {ai column: score}} of the judged rows of a story, as stored
+    import pandas as pd
+
+    from ai_metrics_evaluation import AI_COLUMNS
+
+    if not os.path.exists(complete_file):
+        return {}
+    df = pd.read_csv(complete_file, dtype=str, keep_default_na=False)
+    columns = [col for col in AI_COLUMNS if col in df.columns]
+    return {(row["Strategy"], row["Config"], row["Output"]): {col: row[col] for col in columns}
+            for _, row in df.iterrows() if columns and any(row[col] != "" for col in columns)}
+
+
+def work_judging(queue, worker_id, results_dir, max_workers=8, batch_size=judge_batch_size):
+    """
+    drains the judge tasks of the queue, leasing up to batch_size cells of one story at a time so
+    they share one batched judge call. scores go to this worker's judge shard of the story, and
+    the story's merge writes them into complete_results.csv.
+    """
+    import pandas as pd
+
+    from ai_metrics_evaluation import AI_COLUMNS, check_judge_backend, evaluate_requirements_batch, is_error_output
+    from aggregation import write_csv_atomically
+
+    check_judge_backend()
+
+    def judge(tasks):
+        story_id = tasks[0][0]
+        run_dir = os.path.join(results_dir, f"row_{story_id}")
+        df = pd.read_csv(os.path.join(run_dir, "complete_results.csv"),
+                         usecols=["User Story", "Strategy", "Config", "Output"])
+        outputs = {(row.Strategy, row.Config): row.Output for row in df.itertuples()}
+        # failed generations are never sent, their tasks are done without scores
+        results = {task: None for task in tasks if is_error_output(outputs[task[1:]])}
+        items = [(f"{task[1]}/{task[2]}", outputs[task[1:]]) for task in tasks if task not in results]
+
+        scores = evaluate_requirements_batch(df["User Story"].iloc[0], items, chunk_size=batch_size) if items else {}
+        ledger = RunLedger(run_dir, shard=worker_id, name="judge")
+        for task in tasks:
+            if task in results:
+                continue
+            _, strategy_name, config_name = task
+            cell_scores = scores[f"{strategy_name}/{config_name}"]
+            if any(score is None for score in cell_scores.values()):
+                # unresolved cells go back to the queue instead of into the judge shard
+                results[task] = "unresolved judge scores"
+                continue
+            ledger.append(strategy_name, config_name, cell_scores)
+            results[task] = None
+        return results
+
+    def merge_story(story_id):
+        run_dir = os.path.join(results_dir, f"row_{story_id}")
+        complete_file = os.path.join(run_dir, "complete_results.csv")
+        # read as text, so the columns the merge does not touch are written back unchanged
+        df = pd.read_csv(complete_file, dtype=str, keep_default_na=False)
+        for col in AI_COLUMNS:
+            if col not in df.columns:
+                df[col] = ""
+
+        scores = merged_cells(run_dir, name="judge")
+        for idx in df.index[(df[AI_COLUMNS] == "").any(axis=1)]:
+            cell_scores = scores.get((df.at[idx, "Strategy"], df.at[idx, "Config"]))
+            if cell_scores is not None:
+                for col in AI_COLUMNS:
+                    df.at[idx, col] = str(cell_scores[col])
+        write_csv_atomically(df, complete_file)
+        print(f"Merged judge scores into {complete_file}")
+
+    drain(queue, worker_id, JUDGE, judge, max_workers, lease_size=batch_size)
+    return run_merges(queue, worker_id, JUDGE, merge_story)
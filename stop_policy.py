@@ -0,0 +1,89 @@
+import re
+
+from config import early_stop
+from rate_limiter import CHARS_PER_TOKEN
+
+REQUIREMENT_LINE_PATTERN = re.compile(r'N?FR-\d+:', re.IGNORECASE)
+NFR_LINE_PATTERN = re.compile(r'NFR-\d+:', re.IGNORECASE)
+
+
+class RequirementsStopPolicy:
+    """
+    watches a streamed completion line by line and decides when the FR-n/NFR-n list is over.
+    the stream is stopped once, after at least one NFR, a trailing block of non-requirement text
+    reaches trailing_lines lines or trailing_chars characters, or once the completion passes the
+    token budget. indented lines directly under a requirement count as part of it.
+    text() is what the row keeps: everything up to the trailing block.
+    """
+
+    def __init__(self, token_budget=None, trailing_lines=3, trailing_chars=300, stop_on_trailing_text=True):
+        self.token_budget = token_budget
+        self.stop_on_trailing_text = stop_on_trailing_text
+        self.trailing_lines = trailing_lines
+        self.trailing_chars = trailing_chars
+
+        self.buffer = ""
+        self.received_chars = 0
+        self.kept = []
+        self.trailing = []
+        self.seen_nfr = False
+        self.reason = None
+
+    def _complete_line(self, line):
+        if self.trailing == [] and self.kept and line[:1] in (" ", "\t") and line.strip():
+            # indented lines right under a requirement (sub-bullets, rationale) belong to it
+            self.kept.append(line)
+        elif REQUIREMENT_LINE_PATTERN.search(line):
+            # a requirement after some prose means the prose was a heading, keep it
+            self.kept.extend(self.trailing)
+            self.trailing = []
+            self.kept.append(line)
+            self.seen_nfr = self.seen_nfr or bool(NFR_LINE_PATTERN.search(line))
+        elif self.seen_nfr and (line.strip() or self.trailing):
+            self.trailing.append(line)
+        else:
+            self.kept.append(line)
+
+    def update(self, chunk_text):
+        """
+        feeds the next chunk, returns True when the stream should be cancelled.
+        """
+        self.received_chars += len(chunk_text)
+        self.buffer += chunk_text
+        *lines, self.buffer = self.buffer.split("\n")
+        for line in lines:
+            self._complete_line(line + "\n")
+
+        # an unfinished line only counts once it is long enough to rule out a requirement label
+        pending = self.buffer if len(self.buffer.lstrip()) >= 40 and not REQUIREMENT_LINE_PATTERN.search(
+            self.buffer) else ""
+        trailing_text = "".join(self.trailing) + (pending if self.seen_nfr else "")
+        trailing_line_count = sum(1 for line in self.trailing if line.strip())
+        trailing_done = trailing_line_count >= self.trailing_lines or len(trailing_text.strip()) >= self.trailing_chars
+        if self.stop_on_trailing_text and self.seen_nfr and trailing_done:
+            self.reason = "trailing_text"
+            return True
+
+        if self.token_budget is not None and self.received_chars // CHARS_PER_TOKEN > self.token_budget:
+            self.reason = "token_budget"
+            return True
+        return False
+
+    def raw_text(self):
+        return "".join(self.kept) + "".join(self.trailing) + self.buffer
+
+    def text(self):
+        if self.reason == "trailing_text":
+            return "".join(self.kept).rstrip() + "\n"
+        return self.raw_text()
+
+
+def make_stop_policy(strategy_name):
+    if not early_stop["enabled"]:
+        return None
+    return RequirementsStopPolicy(
+        token_budget=early_stop["strategy_token_budgets"].get(strategy_name),
+        trailing_lines=early_stop["trailing_lines"],
+        trailing_chars=early_stop["trailing_chars"],
+        stop_on_trailing_text=strategy_name not in early_stop["keep_trailing_text"]
+    )
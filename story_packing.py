@@ -0,0 +1,309 @@
+import argparse
+import re
+import threading
+from collections import Counter
+
+from budget import BudgetExceeded, max_output_tokens
+from config import model_configs, prompt_strategies, story_packing, stream_generation
+from evaluation import count_requirements
+from main import RESULTS_DIR, evaluate_cell, generate_requirements, make_cell
+from prompt_templates import count_tokens, templates
+
+# what a packed prompt shows where a single prompt has the story's own fields
+PLACEHOLDERS = {"text": "(given separately for each story below)",
+                "context": "(given separately for each story below)"}
+FIELD_LABELS = {"text": "USER STORY", "context": "BUSINESS CONTEXT"}
+STORY_HEADER = "--- STORY {} ---"
+PACKING_INSTRUCTIONS = """
+PACKED REQUEST:
+The instructions above apply to each of the {count} user stories below on its own. Answer the stories in the order given. Start the answer to a story with the line "=== STORY <story id> ===" and end it with the line "=== END STORY <story id> ===", using the id from the story's "--- STORY <story id> ---" header, and number its requirements from FR-1 and NFR-1 again. Write nothing outside these blocks.
+"""
+# markers may come wrapped in markdown emphasis or headings
+BLOCK_START = re.compile(r"^[ \t*#`]*=== STORY (\S+) ===[ \t*`]*$", re.MULTILINE)
+BLOCK_END = r"^[ \t*#`]*=== END STORY {} ===[ \t*`]*$"
+
+QUALITY_COLUMNS = ["FR Count", "NFR Count", "Specificity Score", "Testability Score", "Measurability Score"]
+USAGE_COLUMNS = ["Output Length", "Prompt Tokens ", "Completion Tokens ", "Total Tokens "]
+
+
+def story_block(template, story_id, story):
+    lines = [STORY_HEADER.format(story_id)]
+    for field in dict.fromkeys(template.fields):
+        lines += [f"{FIELD_LABELS[field]}:", story[field], ""]
+    return "\n".join(lines)
+
+
+def pack_prompt(template, stories):
+    """
+    one prompt for the same strategy over several stories: the template with its story fields
+    pointing at the stories below, the packing instructions, then one block per story.
+    the prompt starts with the same preamble as the single one, so the prefix cache still applies.
+    """
+    pieces = [template.render(PLACEHOLDERS), PACKING_INSTRUCTIONS.format(count=len(stories))]
+    pieces += [story_block(template, story_id, story) for story_id, story in stories.items()]
+    return "\n".join(pieces)
+
+
+def split_packed(text, story_ids):
+    """
+    ({story_id: requirements}, {story_id: problem}) for a packed answer. a story's requirements
+    are kept when its block appears once, is closed by its end marker before the next block
+    starts and has at least one FR/NFR line; every other story gets the reason it was rejected.
+    """
+    starts = [match for match in BLOCK_START.finditer(text) if match.group(1) in story_ids]
+    seen = Counter(match.group(1) for match in starts)
+    blocks, problems = {}, {}
+    for i, match in enumerate(starts):
+        story_id = match.group(1)
+        if seen[story_id] > 1:
+            problems[story_id] = "repeated block"
+            continue
+        stop = starts[i + 1].start() if i + 1 < len(starts) else len(text)
+        end = re.compile(BLOCK_END.format(re.escape(story_id)), re.MULTILINE).search(text, match.end(), stop)
+        if end is None:
+            problems[story_id] = "unterminated block"
+            continue
+        block = text[match.end():end.start()].strip() + "\n"
+        if sum(count_requirements(block)) == 0:
+            problems[story_id] = "no requirements"
+            continue
+        blocks[story_id] = block
+    for story_id in story_ids:
+        if story_id not in blocks and story_id not in problems:
+            problems[story_id] = "missing block"
+    return blocks, problems
+
+
+def apportion(total, weights):
+    # splits an integer total in proportion to weights, the last share takes the rounding remainder
+    if total is None:
+        return {key: None for key in weights}
+    weight_sum = sum(weights.values())
+    if not weight_sum:
+        weights, weight_sum = {key: 1 for key in weights}, len(weights)
+    shares, left = {}, total
+    for key in list(weights)[:-1]:
+        shares[key] = int(total * weights[key] / weight_sum)
+        left -= shares[key]
+    shares[list(weights)[-1]] = left
+    return shares
+
+
+def share_usage(token_usage, prompt_weights, completion_weights):
+    # per-story token usage of one packed call, so budgets and per-story results still add up
+    token_usage = token_usage or {}
+    prompt = apportion(token_usage.get("prompt_tokens"), prompt_weights)
+    completion = apportion(token_usage.get("completion_tokens"), completion_weights)
+    cached = apportion(token_usage.get("cached_prompt_tokens"), prompt_weights)
+    usage = {}
+    for story_id in prompt_weights:
+        total = None if prompt[story_id] is None and completion[story_id] is None else \
+            (prompt[story_id] or 0) + (completion[story_id] or 0)
+        usage[story_id] = {"prompt_tokens": prompt[story_id], "completion_tokens": completion[story_id],
+                           "total_tokens": total, "cached_prompt_tokens": cached[story_id] or 0}
+    return usage
+
+
+def packed_max_output_tokens(strategy_name, config_name, count):
+    limit = max_output_tokens(strategy_name, config_name)
+    limits = [value for value in (limit * count if limit else None, story_packing["max_output_tokens"]) if value]
+    return min(limits) if limits else None
+
+
+class PackingStats:
+    """
+    what packing saved in a sweep: packed calls against the calls and prompt tokens the same
+    stories would have needed one by one (both counted with the offline tokenizer), and which
+    stories had to be asked again on their own and why.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.problems = Counter()
+        self.stats = {"calls": 0, "stories": 0, "answered": 0, "fallbacks": 0,
+                      "packed_prompt_tokens": 0, "fallback_prompt_tokens": 0, "unpacked_prompt_tokens": 0}
+
+    def record(self, packed_prompt, prompts, problems):
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["stories"] += len(prompts)
+            self.stats["answered"] += len(prompts) - len(problems)
+            self.stats["fallbacks"] += len(problems)
+            self.stats["packed_prompt_tokens"] += count_tokens(packed_prompt)
+            self.stats["fallback_prompt_tokens"] += sum(count_tokens(prompts[story_id]) for story_id in problems)
+            self.stats["unpacked_prompt_tokens"] += sum(count_tokens(prompt) for prompt in prompts.values())
+            self.problems.update(problems.values())
+
+    def report(self):
+        stats = self.stats
+        if not stats["calls"]:
+            return "no packed calls"
+        sent = stats["packed_prompt_tokens"] + stats["fallback_prompt_tokens"]
+        unpacked = stats["unpacked_prompt_tokens"]
+        calls = stats["calls"] + stats["fallbacks"]
+        lines = [f"{stats['calls']} packed calls carried {stats['stories']} story cells: {stats['answered']} "
+                 f"answered in their block, {stats['fallbacks']} asked again on their own"
+                 + (f" ({', '.join(f'{count} {problem}' for problem, count in self.problems.most_common())})"
+                    if self.problems else ""),
+                 f"requests: {calls} instead of {stats['stories']} ({calls / stats['stories'] - 1:+.1%})",
+                 f"prompt tokens: {sent} instead of {unpacked} ({sent / unpacked - 1:+.1%})"]
+        return "\n".join(lines)
+
+
+def evaluate_packed(stories, strategy_name, config_name, model=None, stream=stream_generation, budget=None,
+                    prefix_cache=None, stats=None):
+    """
+    evaluate_cell for the same strategy and config of several stories ({story_id: story}) with
+    one request. returns {story_id: cell}; stories the packed answer does not cover, or that
+    the budget refuses, are evaluated on their own. cells answered in a packed call keep their
+    story's own prompt, the packed call's latency and stream metrics and a share of its tokens.
+    """
+    stats = stats or get_packing_stats()
+    template = templates[strategy_name]
+    prompts = {story_id: template.render(story) for story_id, story in stories.items()}
+
+    # every packed story reserves its own worst case, which bounds the packed call's
+    projected = {}
+    for story_id, prompt in prompts.items():
+        if budget is None:
+            projected[story_id] = None
+            continue
+        projection = budget.project(prompt, strategy_name, config_name)
+        try:
+            budget.reserve(story_id, strategy_name, projection)
+            projected[story_id] = projection
+        except BudgetExceeded:
+            # refused again and recorded by evaluate_cell below
+            pass
+    if len(projected) < 2:
+        for story_id, projection in projected.items():
+            if projection is not None:
+                budget.release(story_id, projection)
+        projected = {}
+
+    cells = {}
+    if projected:
+        packed = {story_id: stories[story_id] for story_id in projected}
+        packed_prompt = pack_prompt(template, packed)
+        model_name = model_configs[config_name]["model_name"]
+        result = generate_requirements(packed_prompt, config_name, model=model, stream=stream,
+                                       max_output_tokens=packed_max_output_tokens(strategy_name, config_name,
+                                                                                  len(packed)),
+                                       strategy_name=strategy_name, prefix_cache=prefix_cache,
+                                       hedge_key=f"{model_name}/{strategy_name} x{len(packed)}")
+        if result.get("error"):
+            blocks, problems = {}, {story_id: "failed call" for story_id in packed}
+        else:
+            blocks, problems = split_packed(result["text"], list(packed))
+
+        shared = count_tokens(packed_prompt) - sum(count_tokens(story_block(template, story_id, story))
+                                                   for story_id, story in packed.items())
+        prompt_weights = {story_id: count_tokens(story_block(template, story_id, story)) + shared / len(packed)
+                          for story_id, story in packed.items()}
+        usage = share_usage(result.get("token_usage"), prompt_weights,
+                            {story_id: len(blocks.get(story_id, "")) for story_id in packed})
+        for story_id in packed:
+            estimated_cost = None
+            if budget is not None and result.get("cached"):
+                budget.settle_cached(story_id, projected[story_id], usage[story_id])
+            elif budget is not None:
+                estimated_cost = budget.settle(story_id, strategy_name, config_name, projected[story_id],
+                                               usage[story_id])
+            if story_id in blocks:
+                cell = make_cell(prompts[story_id], config_name,
+                                 dict(result, text=blocks[story_id], token_usage=usage[story_id]), estimated_cost)
+                cell["packed_with"] = [other for other in packed if other != story_id]
+                cells[story_id] = cell
+        stats.record(packed_prompt, {story_id: prompts[story_id] for story_id in packed}, problems)
+
+    for story_id, prompt in prompts.items():
+        if story_id not in cells:
+            cells[story_id] = evaluate_cell(prompt, strategy_name, config_name, model=model, stream=stream,
+                                            budget=budget, run_id=story_id, prefix_cache=prefix_cache)
+    return cells
+
+
+def relative_change(packed, baseline):
+    return (packed - baseline) / abs(baseline) if baseline else float("nan")
+
+
+def parity_report(packed_dir, baseline_dir=RESULTS_DIR, stories=None, tolerance=None, workers=8):
+    """
+    compares a packed sweep with an unpacked baseline on the cells both have (same story,
+    strategy and config): mean heuristic scores, ai-* scores where both sides are judged, and
+    tokens, overall and per strategy. quality means that moved by more than tolerance, relative
+    to the baseline, are flagged.
+    """
+    import pandas as pd
+
+    from ai_metrics_evaluation import AI_COLUMNS
+    from aggregation import load_csv_tree
+
+    tolerance = story_packing["parity_tolerance"] if tolerance is None else tolerance
+    columns = ["Strategy", "Config", *QUALITY_COLUMNS, *AI_COLUMNS, *USAGE_COLUMNS]
+    packed = load_csv_tree(packed_dir, "complete_results.csv", columns, stories, workers)
+    baseline = load_csv_tree(baseline_dir, "complete_results.csv", columns, stories, workers)
+    metrics = [col for col in [*QUALITY_COLUMNS, *AI_COLUMNS, *USAGE_COLUMNS]
+               if col in packed.columns and col in baseline.columns]
+    quality = [col for col in metrics if col not in USAGE_COLUMNS]
+    both = packed.merge(baseline, on=["story", "Strategy", "Config"], suffixes=(" packed", " baseline"))
+    if both.empty:
+        return f"no cells in both {packed_dir} and {baseline_dir}"
+    for col in metrics:
+        for side in (" packed", " baseline"):
+            both[col + side] = pd.to_numeric(both[col + side], errors="coerce")
+
+    lines = [f"{len(both)} cells of {both['story'].nunique()} stories in both sweeps "
+             f"(packed {packed_dir} vs baseline {baseline_dir})",
+             f"{'Metric':22s} {'packed':>10s} {'baseline':>10s} {'change':>8s}"]
+    flagged = 0
+    for col in metrics:
+        # ai-* means over the cells judged on both sides only
+        judged = both[[col + " packed", col + " baseline"]].dropna()
+        after, before = judged[col + " packed"].mean(), judged[col + " baseline"].mean()
+        change = relative_change(after, before)
+        flag = col in quality and abs(change) > tolerance
+        flagged += flag
+        lines.append(f"{col.strip():22s} {after:10.2f} {before:10.2f} {change:+8.1%}" + (" ⚠️" if flag else ""))
+
+    lines.append(f"\n{'Strategy':20s} {'cells':>6s} {'largest quality change':>32s} {'tokens':>8s}")
+    for strategy_name in [name for name in prompt_strategies if name in set(both["Strategy"])]:
+        rows = both[both["Strategy"] == strategy_name]
+        changes = {col: relative_change(rows[col + " packed"].mean(), rows[col + " baseline"].mean())
+                   for col in quality if rows[[col + " packed", col + " baseline"]].notna().all(axis=1).any()}
+        if not changes:
+            # no quality column scored on both sides for this strategy
+            continue
+        col, change = max(changes.items(), key=lambda item: abs(item[1]) if item[1] == item[1] else -1)
+        tokens = relative_change(rows["Total Tokens  packed"].sum(), rows["Total Tokens  baseline"].sum()) \
+            if "Total Tokens " in metrics else float("nan")
+        flag = abs(change) > tolerance
+        flagged += flag
+        lines.append(f"{strategy_name:20s} {len(rows):6d} {col.strip() + f' {change:+.1%}':>32s} {tokens:+8.1%}"
+                     + (" ⚠️" if flag else ""))
+    lines.append(f"{flagged} quality changes beyond {tolerance:.0%}" if flagged else
+                 f"every quality mean within {tolerance:.0%} of the baseline")
+    return "\n".join(lines)
+
+
+_shared_stats = None
+_shared_lock = threading.Lock()
+
+
+def get_packing_stats():
+    global _shared_stats
+    with _shared_lock:
+        if _shared_stats is None:
+            _shared_stats = PackingStats()
+        return _shared_stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quality parity of a packed sweep against an unpacked one.")
+    parser.add_argument("packed_dir")
+    parser.add_argument("--baseline-dir", default=RESULTS_DIR)
+    parser.add_argument("--tolerance", type=float, default=None)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    print(parity_report(args.packed_dir, args.baseline_dir, tolerance=args.tolerance, workers=args.workers))
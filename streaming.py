@@ -0,0 +1,87 @@
+import time
+
+from hedging import CallCancelled
+
+# result columns written by main.write_results, after the token columns
+STREAM_COLUMNS = ["TTFT (seconds)", "Mean Chunk Gap (seconds)", "Max Chunk Gap (seconds)", "Tokens per Second",
+                  "Truncated"]
+
+
+class StreamedResponse:
+    """
+    the pieces of a streamed generate_content call that the rest of the pipeline reads,
+    so streamed and blocking responses are handled the same way.
+    """
+
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+def chunk_text(chunk):
+    # chunks without candidate parts (e.g. a final usage-only chunk) raise on .text
+    try:
+        return chunk.text
+    except (ValueError, AttributeError, IndexError):
+        return ""
+
+
+def close_stream(stream):
+    # closing the generator cancels the underlying request, no further tokens are read
+    close = getattr(stream, "close", None)
+    if close is not None:
+        close()
+
+
+def consume_stream(stream, start_time, stop_policy=None, cancel=None):
+    """
+    reads a streamed response until it ends or stop_policy asks to cancel it. returns the
+    response, the arrival time of every chunk in seconds since start_time, and whether the
+    stream was cut short. once the cancel event is set (e.g. a hedged duplicate answered first)
+    the stream is closed and CallCancelled raised.
+    """
+
+    parts = []
+    chunk_times = []
+    usage_metadata = None
+    truncated = False
+    for chunk in stream:
+        if cancel is not None and cancel.is_set():
+            close_stream(stream)
+            raise CallCancelled("stream cancelled")
+        chunk_times.append(time.time() - start_time)
+        parts.append(chunk_text(chunk))
+        # every chunk may carry usage, the last one has the totals
+        if getattr(chunk, "usage_metadata", None) is not None:
+            usage_metadata = chunk.usage_metadata
+        if stop_policy is not None and stop_policy.update(parts[-1]):
+            truncated = True
+            break
+
+    if truncated:
+        close_stream(stream)
+        return StreamedResponse(stop_policy.text(), usage_metadata), chunk_times, True
+    return StreamedResponse("".join(parts), usage_metadata), chunk_times, False
+
+
+def stream_metrics(chunk_times, latency, completion_tokens):
+    """
+    time to first token, gaps between chunks and overall completion throughput.
+    chunk_times is None for blocking calls, which only get the throughput.
+    """
+    metrics = {
+        "ttft": None,
+        "mean_chunk_gap": None,
+        "max_chunk_gap": None,
+        "chunk_count": None,
+        "tokens_per_second": completion_tokens / latency if completion_tokens and latency else None
+    }
+    if chunk_times:
+        gaps = [later - earlier for earlier, later in zip(chunk_times, chunk_times[1:])]
+        metrics.update({
+            "ttft": chunk_times[0],
+            "mean_chunk_gap": sum(gaps) / len(gaps) if gaps else 0.0,
+            "max_chunk_gap": max(gaps) if gaps else 0.0,
+            "chunk_count": len(chunk_times)
+        })
+    return metrics
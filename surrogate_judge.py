@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+
+from ai_metrics_evaluation import AI_COLUMNS, SOURCE_COLUMN, is_error_output
+from config import model_configs, prompt_strategies, surrogate_judge as surrogate_config
+
+# heuristic columns every complete_results.csv row already has, next to Strategy and Config
+FEATURE_COLUMNS = ["Prompt Length", "Output Length", "FR Count", "NFR Count", "Specificity Score",
+                   "Testability Score", "Measurability Score", "Completion Tokens "]
+TEMPERATURES = np.linspace(0.5, 3.0, 26)
+
+
+def softmax(logits):
+    logits = logits - logits.max(axis=1, keepdims=True)
+    probabilities = np.exp(logits)
+    return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+
+def training_labels(df):
+    """
+    the ai-* scores usable as labels: integers 1-5 in all four columns. rows scored 3 across the
+    board are left out, since the old judge wrote exactly that whenever it failed to parse, and so
+    are rows the surrogate scored itself.
+    """
+    labels = df[AI_COLUMNS].apply(pd.to_numeric, errors="coerce")
+    valid = labels.isin([1, 2, 3, 4, 5]).all(axis=1) & ~(labels == 3).all(axis=1)
+    valid &= ~df["Output"].map(is_error_output)
+    if SOURCE_COLUMN in df:
+        valid &= df[SOURCE_COLUMN] != "surrogate"
+    return labels[valid].astype(int)
+
+
+class SurrogateJudge:
+    """
+    local stand-in for the llm judge: one softmax regression per ai-* column over the
+    heuristic features of a row (log lengths and counts, heuristic scores, completion tokens,
+    one-hot strategy and config), temperature-scaled on a held-out split. a row's confidence is
+    the product of its four top class probabilities. threshold is the lowest confidence at which
+    the held-out rows at or above it still agree with the judge on target_agreement of their
+    cells, so the rows the surrogate keeps are about as reliable as that.
+    """
+
+    def __init__(self, target_agreement=0.95, audit_share=0.05, l2=1e-3, learning_rate=0.5, epochs=500, seed=0):
+        self.target_agreement = target_agreement
+        self.audit_share = audit_share
+        self.l2 = l2
+        self.learning_rate = learning_rate
+        self.epochs = epochs
+        self._rng = np.random.default_rng(seed)
+        self.weights = {}
+        self.temperatures = {}
+        self.threshold = np.inf
+        self.holdout = {}
+        self.stats = {"rows": 0, "kept": 0, "audited": 0, "audited_cells": 0, "agreed_cells": 0, "agreed_rows": 0}
+
+    @staticmethod
+    def features(df):
+        numeric = df.reindex(columns=FEATURE_COLUMNS).apply(pd.to_numeric, errors="coerce").fillna(0).clip(lower=0)
+        columns = [np.log1p(numeric.to_numpy(float))]
+        for column, names in (("Strategy", prompt_strategies), ("Config", model_configs)):
+            columns.append((df[column].to_numpy()[:, None] == np.array(list(names))[None, :]).astype(float))
+        return np.hstack(columns)
+
+    def _design(self, df):
+        x = (self.features(df) - self.mean) / self.scale
+        return np.hstack([x, np.ones((len(x), 1))])
+
+    def fit(self, df, holdout_share=0.2):
+        labels = training_labels(df)
+        df = df.loc[labels.index]
+        order = self._rng.permutation(len(df))
+        split = int(len(df) * (1 - holdout_share))
+        train, held = order[:split], order[split:]
+
+        raw = self.features(df)
+        self.mean = raw[train].mean(axis=0)
+        self.scale = raw[train].std(axis=0) + 1e-9
+        x = self._design(df)
+        for col in AI_COLUMNS:
+            y = labels[col].to_numpy() - 1
+            targets = np.eye(5)[y]
+            weights = np.zeros((x.shape[1], 5))
+            for _ in range(self.epochs):
+                gradient = x[train].T @ (softmax(x[train] @ weights) - targets[train]) / len(train)
+                weights -= self.learning_rate * (gradient + self.l2 * weights)
+            self.weights[col] = weights
+
+            # the temperature that minimises the held-out negative log likelihood
+            logits = x[held] @ weights
+            self.temperatures[col] = min(TEMPERATURES, key=lambda t: -np.log(
+                softmax(logits / t)[np.arange(len(held)), y[held]] + 1e-12).mean())
+
+        self._choose_threshold(df.iloc[held], labels.iloc[held])
+        return self
+
+    def _choose_threshold(self, df, labels):
+        predicted, confidence = self.predict(df)
+        agreed = (predicted.to_numpy() == labels.to_numpy()).sum(axis=1)
+        order = np.argsort(-confidence)
+        running = np.cumsum(agreed[order]) / (len(AI_COLUMNS) * np.arange(1, len(order) + 1))
+        passing = np.nonzero(running >= self.target_agreement)[0]
+        if len(passing):
+            kept = passing.max() + 1
+            self.threshold = confidence[order][kept - 1]
+            self.holdout = {"rows": len(order), "coverage": kept / len(order), "cell_agreement": running[kept - 1],
+                            "row_agreement": (agreed[order][:kept] == len(AI_COLUMNS)).mean()}
+        else:
+            self.holdout = {"rows": len(order), "coverage": 0.0, "cell_agreement": None, "row_agreement": None}
+
+    def predict(self, df):
+        # (predicted ai-* scores, confidence) for every row of df
+        x = self._design(df)
+        scores = {}
+        confidence = np.ones(len(df))
+        for col in AI_COLUMNS:
+            probabilities = softmax(x @ self.weights[col] / self.temperatures[col])
+            scores[col] = probabilities.argmax(axis=1) + 1
+            confidence *= probabilities.max(axis=1)
+        return pd.DataFrame(scores, index=df.index), confidence
+
+    def triage(self, rows):
+        """
+        splits the pending rows of one file (a slice of its dataframe) into {idx: scores} the
+        surrogate is confident about, and {idx: scores} of those confident rows that still go to
+        the judge as an audit of the surrogate. every other row goes to the judge as usual.
+        """
+        predicted, confidence = self.predict(rows)
+        kept, audits = {}, {}
+        for idx, row_confidence in zip(rows.index, confidence):
+            if row_confidence < self.threshold:
+                continue
+            scores = {col: int(predicted.at[idx, col]) for col in AI_COLUMNS}
+            if self._rng.random() < self.audit_share:
+                audits[idx] = scores
+            else:
+                kept[idx] = scores
+        self.stats["rows"] += len(rows)
+        self.stats["kept"] += len(kept)
+        return kept, audits
+
+    def record_audit(self, predicted, judged):
+        if any(judged[col] is None for col in AI_COLUMNS):
+            return
+        agreed = sum(predicted[col] == judged[col] for col in AI_COLUMNS)
+        self.stats["audited"] += 1
+        self.stats["audited_cells"] += len(AI_COLUMNS)
+        self.stats["agreed_cells"] += agreed
+        self.stats["agreed_rows"] += agreed == len(AI_COLUMNS)
+
+    def summary(self):
+        holdout = self.holdout
+        if holdout.get("cell_agreement") is None:
+            return (f"surrogate judge: no confidence level reaches {self.target_agreement:.0%} agreement on "
+                    f"{holdout.get('rows', 0)} held-out rows, every row goes to the judge")
+        return (f"surrogate judge: confidence >= {self.threshold:.3f} keeps {holdout['coverage']:.1%} of "
+                f"{holdout['rows']} held-out rows at {holdout['cell_agreement']:.1%} cell / "
+                f"{holdout['row_agreement']:.1%} row agreement with the judge")
+
+    def report(self):
+        stats = self.stats
+        lines = [self.summary(),
+                 f"scored {stats['kept']} of {stats['rows']} pending rows locally "
+                 f"({stats['kept'] / stats['rows'] if stats['rows'] else 0.0:.1%})"]
+        if stats["audited"]:
+            lines.append(f"audited {stats['audited']} confident rows with the judge: "
+                         f"{stats['agreed_cells'] / stats['audited_cells']:.1%} cell / "
+                         f"{stats['agreed_rows'] / stats['audited']:.1%} row agreement")
+        return "\n".join(lines)
+
+
+def train_surrogate(results_dir, workers=8):
+    """
+    fits a SurrogateJudge on every row the llm judged under results_dir, or returns None when there are
+    fewer than min_training_rows usable rows.
+    """
+    from aggregation import load_csv_tree
+
+    df = load_csv_tree(results_dir, "complete_results.csv",
+                       columns=["Strategy", "Config", "Output", *FEATURE_COLUMNS, *AI_COLUMNS, SOURCE_COLUMN],
+                       workers=workers)
+    rows = 0 if df is None or not set(AI_COLUMNS) <= set(df.columns) else len(training_labels(df))
+    if rows < surrogate_config["min_training_rows"]:
+        print(f"surrogate judge: {rows} usable judged rows, {surrogate_config['min_training_rows']} needed to train")
+        return None
+
+    surrogate = SurrogateJudge(surrogate_config["target_agreement"], surrogate_config["audit_share"])
+    surrogate.fit(df.reset_index(drop=True), surrogate_config["holdout_share"])
+    print(surrogate.summary())
+    return surrogate
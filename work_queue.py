@@ -0,0 +1,246 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from config import work_queue as work_queue_config
+
+# story ids look like story_<n>; ordering on the number leases story_2 before story_10
+STORY_ORDER = "CAST(SUBSTR(story, INSTR(story, '_') + 1) AS INTEGER), story"
+
+
+def make_worker_id():
+    # unique across hosts and processes, and safe to use in a file name
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}".replace(os.sep, "_")
+
+
+class WorkQueue:
+    """
+    sqlite table of (kind, story, strategy, config) tasks shared by worker processes. a worker
+    leases tasks for lease_seconds and keeps them with heartbeat(); tasks whose lease runs out
+    (a crashed or stalled worker) can be leased again, up to max_attempts times. every state
+    change is one transaction, so two workers never hold the same task at the same time.
+    workers on several hosts need the database on a filesystem with working file locks and the
+    DELETE journal mode: WAL is faster on one host but needs shared memory, which sqlite does not
+    support over network filesystems.
+    """
+
+    def __init__(self, path, lease_seconds=120, max_attempts=5, journal_mode="DELETE"):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._conn.execute(f"PRAGMA journal_mode={journal_mode}")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                kind TEXT NOT NULL,
+                story TEXT NOT NULL,
+                strategy TEXT NOT NULL,
+                config TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                owner TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (kind, story, strategy, config)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_kind_state ON tasks (kind, state)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, tokens INTEGER NOT NULL)")
+
+    def _transaction(self, fn):
+        # BEGIN IMMEDIATE takes the write lock up front, so a select-then-update cannot race
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+                self._conn.execute("COMMIT")
+                return result
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def enqueue(self, kind, tasks, requeue=False):
+        """
+        queues (story, strategy, config) tuples. tasks already queued are left alone, unless
+        requeue is set: then done or failed ones go back to pending with fresh attempts, for
+        when their cell is known to be missing still. leased tasks are never touched.
+        """
+        now = time.time()
+        rows = [(kind, story, strategy, config, now) for story, strategy, config in tasks]
+        conflict = ("ON CONFLICT DO UPDATE SET state = 'pending', owner = NULL, lease_expires = NULL, "
+                    "attempts = 0, error = NULL, updated_at = excluded.updated_at "
+                    "WHERE state IN ('done', 'failed')") if requeue else "ON CONFLICT DO NOTHING"
+        return self._transaction(lambda conn: conn.executemany(
+            f"INSERT INTO tasks (kind, story, strategy, config, updated_at) VALUES (?, ?, ?, ?, ?) {conflict}",
+            rows).rowcount)
+
+    def lease(self, owner, kind, limit=1, same_story=False):
+        """
+        leases up to limit pending or expired tasks of kind, in story order. with same_story the
+        tasks all belong to the first available story, e.g. to judge them in one batched call.
+        """
+        def take(conn):
+            now = time.time()
+            # a lease that ran out on the last attempt will not be retried
+            conn.execute("UPDATE tasks SET state = 'failed', error = 'lease expired', updated_at = ? "
+                         "WHERE kind = ? AND state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                         (now, kind, now, self.max_attempts))
+            available = """kind = ? AND attempts < ? AND
+                           (state = 'pending' OR (state = 'leased' AND lease_expires < ?))"""
+            params = [kind, self.max_attempts, now]
+            if same_story:
+                first = conn.execute(f"SELECT story FROM tasks WHERE {available} ORDER BY {STORY_ORDER} LIMIT 1",
+                                     params).fetchone()
+                if first is None:
+                    return []
+                available += " AND story = ?"
+                params.append(first[0])
+
+            tasks = conn.execute(f"SELECT story, strategy, config FROM tasks WHERE {available} "
+                                 f"ORDER BY {STORY_ORDER}, strategy, config LIMIT ?", params + [limit]).fetchall()
+            conn.executemany(
+                "UPDATE tasks SET state = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE kind = ? AND story = ? AND strategy = ? AND config = ?",
+                [(owner, now + self.lease_seconds, now, kind, *task) for task in tasks])
+            return tasks
+
+        return self._transaction(take)
+
+    def heartbeat(self, owner, kind, tasks):
+        # extends the leases this owner still holds, returns how many it still holds
+        def extend(conn):
+            now = time.time()
+            return conn.executemany(
+                "UPDATE tasks SET lease_expires = ?, updated_at = ? WHERE kind = ? AND story = ? AND strategy = ? "
+                "AND config = ? AND state = 'leased' AND owner = ?",
+                [(now + self.lease_seconds, now, kind, *task, owner) for task in tasks]).rowcount
+
+        return self._transaction(extend)
+
+    def complete(self, owner, kind, task):
+        # False when the lease was lost to another worker, whose result then counts instead
+        return self._transaction(lambda conn: conn.execute(
+            "UPDATE tasks SET state = 'done', lease_expires = NULL, error = NULL, updated_at = ? "
+            "WHERE kind = ? AND story = ? AND strategy = ? AND config = ? AND state = 'leased' AND owner = ?",
+            (time.time(), kind, *task, owner)).rowcount == 1)
+
+    def fail(self, owner, kind, task, error):
+        # back to pending for another attempt, or failed for good once max_attempts are used up
+        return self._transaction(lambda conn: conn.execute(
+            "UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "lease_expires = NULL, error = ?, updated_at = ? "
+            "WHERE kind = ? AND story = ? AND strategy = ? AND config = ? AND state = 'leased' AND owner = ?",
+            (self.max_attempts, str(error), time.time(), kind, *task, owner)).rowcount == 1)
+
+    def forget(self, kind, stories):
+        # drops the finished tasks of kind for these stories, e.g. a merge that has to run again
+        return self._transaction(lambda conn: conn.executemany(
+            "DELETE FROM tasks WHERE kind = ? AND story = ? AND state != 'leased'",
+            [(kind, story) for story in stories]).rowcount)
+
+    def add_tokens(self, counters, limits=None):
+        """
+        adds {name: tokens} to token counters shared by every worker of the queue, e.g. a sweep
+        budget, in one transaction. when a positive amount would take a counter past its entry in
+        limits, nothing is added and that counter's name is returned; None otherwise.
+        """
+        def add(conn):
+            for name, tokens in counters.items():
+                limit = (limits or {}).get(name)
+                if limit is None or tokens <= 0:
+                    continue
+                row = conn.execute("SELECT tokens FROM counters WHERE name = ?", (name,)).fetchone()
+                if (row[0] if row else 0) + tokens > limit:
+                    return name
+            conn.executemany("INSERT INTO counters (name, tokens) VALUES (?, ?) "
+                             "ON CONFLICT DO UPDATE SET tokens = tokens + excluded.tokens", list(counters.items()))
+            return None
+
+        return self._transaction(add)
+
+    def tokens(self, name):
+        rows = self._query("SELECT tokens FROM counters WHERE name = ?", (name,))
+        return rows[0][0] if rows else 0
+
+    def _query(self, sql, params=()):
+        # reads share the connection with the transactions, so they take the same lock
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def story_settled(self, kind, story):
+        # every task of the story is done or failed for good
+        rows = self._query(
+            "SELECT COUNT(*) FROM tasks WHERE kind = ? AND story = ? AND state NOT IN ('done', 'failed')",
+            (kind, story))
+        return rows[0][0] == 0
+
+    def settled_stories(self, kind):
+        return [row[0] for row in self._query(
+            "SELECT story FROM tasks WHERE kind = ? GROUP BY story "
+            f"HAVING SUM(state NOT IN ('done', 'failed')) = 0 ORDER BY {STORY_ORDER}", (kind,))]
+
+    def remaining(self, kind):
+        # pending tasks and leases that are still running or may expire and be retried
+        return self._query("SELECT COUNT(*) FROM tasks WHERE kind = ? AND state IN ('pending', 'leased')",
+                           (kind,))[0][0]
+
+    def counts(self):
+        rows = self._query("SELECT kind, state, COUNT(*) FROM tasks GROUP BY kind, state ORDER BY kind, state")
+        counts = {}
+        for kind, state, count in rows:
+            counts.setdefault(kind, {})[state] = count
+        return counts
+
+    def summary(self):
+        return "\n".join(f"{kind}: " + ", ".join(f"{count} {state}" for state, count in states.items())
+                         for kind, states in self.counts().items()) or "work queue is empty"
+
+
+class LeaseKeeper:
+    """
+    background thread that heartbeats the tasks a worker is busy with, so long model calls
+    keep their lease while a crashed worker's leases run out.
+    """
+
+    def __init__(self, queue, owner, kind, interval):
+        self.queue = queue
+        self.owner = owner
+        self.kind = kind
+        self.interval = interval
+        self.tasks = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def hold(self, tasks):
+        with self._lock:
+            self.tasks.update(tasks)
+
+    def release(self, task):
+        with self._lock:
+            self.tasks.discard(task)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                tasks = list(self.tasks)
+            if tasks:
+                self.queue.heartbeat(self.owner, self.kind, tasks)
+
+
+def open_work_queue(path=None):
+    return WorkQueue(path or work_queue_config["path"], work_queue_config["lease_seconds"],
+                     work_queue_config["max_attempts"], work_queue_config["journal_mode"])